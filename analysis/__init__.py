@@ -4,4 +4,9 @@
 
 """
 
-__all__ = ["core", "fom", "plot_tools"]
+__all__ = ["core", "fom", "plot_tools", "stats", "bootstrap",
+           "throughput", "projection", "optimize",
+           "convergence", "align", "export", "catalog",
+           "server", "shared", "decimate",
+           "memory", "derived", "shard",
+           "report", "tables"]
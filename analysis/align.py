@@ -0,0 +1,132 @@
+"""
+
+.. module:: align
+     :synopsis: Alignment of FOM series on a common cycle or CPU time grid
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+The snapshots of different data sets are usually written at different
+cycle numbers or CPU times. The tools here linearly interpolate the FOM
+or error of every group of every data set onto one grid, so that data
+sets can be compared point by point with array arithmetic.
+
+"""
+
+import numpy as np
+
+def common_grid(comparator, cycle = True, n = None, log = False):
+    """ Returns a grid covering the range shared by all data sets of an
+    :class:`analysis.fom.Comparator`.
+
+    :param comparator: data sets to be aligned.
+    :type comparator: :class:`analysis.fom.Comparator`
+
+    :param cycle: If True (default), the grid is in cycle numbers, \
+                  otherwise in CPU time.
+    :type cycle: bool
+
+    :param n: number of grid points. If None (default), the snapshots of \
+              the first data set within the shared range are used.
+    :type n: int, optional
+
+    :param log: If True, the `n` points are evenly spaced in logarithm.
+    :type log: bool
+
+    :rtype: :class:`numpy.ndarray`
+    """
+    xs = [d.get_x(cycle) for d in comparator.data]
+    lo = max(np.min(x) for x in xs)
+    hi = min(np.max(x) for x in xs)
+    assert lo <= hi, "The data sets do not overlap"
+
+    if n is None:
+        return xs[0][(xs[0] >= lo) & (xs[0] <= hi)]
+    elif log:
+        return np.logspace(np.log10(lo), np.log10(hi), n)
+    else:
+        return np.linspace(lo, hi, n)
+
+def interp(x, y, grid):
+    """ Returns the linear interpolation of every column of `y` at the
+    points of `grid`. Points outside the range of `x` are `nan`.
+
+    :param x: sorted abscissa, one value per row of `y`.
+    :type x: :class:`numpy.ndarray`
+
+    :param y: data with one row per value of `x`.
+    :type y: :class:`numpy.ndarray`
+
+    :param grid: points to interpolate at.
+    :type grid: :class:`numpy.ndarray`
+
+    :rtype: :class:`numpy.ndarray`
+    """
+    x = np.asarray(x, dtype = float)
+    y = np.asarray(y, dtype = float)
+    grid = np.asarray(grid, dtype = float)
+    assert len(x) > 1, "At least two points are needed to interpolate"
+
+    # Interval of each grid point, shared by all columns
+    i = np.clip(np.searchsorted(x, grid), 1, len(x) - 1)
+    dx = x[i] - x[i - 1]
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        w = np.where(dx > 0, (grid - x[i - 1])/dx, 1.0)[:,np.newaxis]
+    ans = (1 - w)*y[i - 1] + w*y[i]
+
+    outside = (grid < x[0]) | (grid > x[-1])
+    ans[outside] = np.nan
+    return ans
+
+def align(comparator, label, grid = None, cycle = True, fom = True):
+    """ Returns the FOM or error of every group of every data set,
+    interpolated onto a common grid.
+
+    :param comparator: data sets to be aligned.
+    :type comparator: :class:`analysis.fom.Comparator`
+
+    :param label: Serpent 2 output parameter
+    :type label: string
+
+    :param grid: points to align to. If None (default), uses \
+                 :func:`common_grid`.
+    :type grid: :class:`numpy.ndarray`, optional
+
+    :param cycle: If True (default), aligns on cycle number, otherwise on \
+                  CPU time.
+    :type cycle: bool
+
+    :param fom: If True (default), aligns the FOM, otherwise the error.
+    :type fom: bool
+
+    :returns: the grid, and an array with one entry per data set, one row \
+              per grid point and one column per group.
+    :rtype: tuple(:class:`numpy.ndarray`, :class:`numpy.ndarray`)
+    """
+    if grid is None:
+        grid = common_grid(comparator, cycle)
+
+    data = []
+    for d in comparator.data:
+        if fom:
+            y = d.get_fom_array(label)
+        else:
+            y = d.get_array(label, err = True)
+        data.append(interp(d.get_x(cycle), y, grid))
+    return grid, np.array(data)
+
+def ratio(comparator, label, base = 0, grid = None, cycle = True):
+    """ Returns the FOM of every data set relative to a base data set, at
+    matched cycle numbers or CPU times, see :func:`align`.
+
+    :param base: index or name of the data set the ratios are relative to.
+    :type base: int or string
+
+    :returns: the grid, and an array with one entry per data set, one row \
+              per grid point and one column per group.
+    :rtype: tuple(:class:`numpy.ndarray`, :class:`numpy.ndarray`)
+    """
+    if type(base) is not int:
+        base = [d.name for d in comparator.data].index(str(base))
+    grid, data = align(comparator, label, grid, cycle)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return grid, data/data[base]
@@ -0,0 +1,166 @@
+"""
+
+.. module:: bootstrap
+     :synopsis: Bootstrap confidence intervals for FOM and FOM ratios
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+The tail of each FOM series is resampled with a moving-block bootstrap,
+with blocks as long as the integrated autocorrelation time of the tail
+(see :mod:`analysis.stats`) so that the correlation between successive
+snapshots is kept. Resamples of every group are drawn at once, and data
+sets can be resampled in parallel in a process pool. Each data set and
+parameter has its own random stream derived from the seed, so results
+do not depend on the number of processes.
+
+"""
+
+import numpy as np
+import multiprocessing
+import stats
+
+def block_means(tail, n_boot, block, rng, chunk = 100):
+    """ Returns moving-block bootstrap resamples of the mean of each column
+    of `tail`.
+
+    :param tail: data with one row per snapshot and one column per series.
+    :type tail: :class:`numpy.ndarray`
+
+    :param n_boot: number of resamples.
+    :type n_boot: int
+
+    :param block: length of the blocks.
+    :type block: int
+
+    :param rng: random number generator.
+    :type rng: :class:`numpy.random.RandomState`
+
+    :param chunk: number of resamples drawn at once, to bound the memory used.
+    :type chunk: int
+
+    :returns: array with one row per resample and one column per series.
+    :rtype: :class:`numpy.ndarray`
+    """
+    m = np.shape(tail)[0]
+    block = int(min(max(block, 1), m))
+    n_blocks = int(np.ceil(float(m)/block))
+    offsets = np.arange(block)
+
+    means = np.zeros((n_boot, np.shape(tail)[1]))
+    for start in range(0, n_boot, chunk):
+        n = min(chunk, n_boot - start)
+        starts = rng.randint(0, m - block + 1, size = (n, n_blocks))
+        idx = (starts[:,:,np.newaxis] + offsets).reshape(n, -1)[:,:m]
+        means[start:start + n] = np.mean(tail[idx], axis = 1)
+    return means
+
+def batch_means(tail, n_batches = 10):
+    """ Returns the mean and the batch-means standard error of each column
+    of `tail`. The tail is split into `n_batches` contiguous batches, any
+    leading rows that do not fill a batch are dropped.
+
+    :param tail: data with one row per snapshot and one column per series.
+    :type tail: :class:`numpy.ndarray`
+
+    :param n_batches: number of batches.
+    :type n_batches: int
+
+    :returns: the mean and standard error arrays.
+    :rtype: tuple(:class:`numpy.ndarray`, :class:`numpy.ndarray`)
+    """
+    tail = np.asarray(tail, dtype = float)
+    size = np.shape(tail)[0]//n_batches
+    assert size > 0, "Not enough snapshots for " + str(n_batches) + " batches"
+    batches = tail[-size*n_batches:].reshape((n_batches, size) + np.shape(tail)[1:])
+    means = np.mean(batches, axis = 1)
+    return (np.mean(means, axis = 0),
+            np.std(means, axis = 0, ddof = 1)/np.sqrt(n_batches))
+
+def __resample__(task):
+    # Worker for one data set and parameter, must be picklable
+    tail, n_boot, seed = task
+    rng = np.random.RandomState(seed)
+    block = np.ceil(np.max(stats.int_time(tail)))
+    return block_means(tail, n_boot, block, rng)
+
+def bootstrap(comparator, labels, n_boot = 1000, frac = 0.5, base = 0,
+              level = 0.95, seed = 0, processes = 1, cpu = True):
+    """ Returns bootstrap confidence intervals for the average FOM of the
+    tail of each data set, and for its ratio to a base data set, for every
+    group or matrix entry of the parameters in `labels`.
+
+    :param comparator: data sets to be compared.
+    :type comparator: :class:`analysis.fom.Comparator`
+
+    :param labels: Serpent 2 output parameter(s)
+    :type labels: string or list(string)
+
+    :param n_boot: number of resamples.
+    :type n_boot: int
+
+    :param frac: fraction of each series skipped before the tail.
+    :type frac: float
+
+    :param base: index or name of the data set the ratios are relative to.
+    :type base: int or string
+
+    :param level: confidence level of the intervals.
+    :type level: float
+
+    :param seed: seed of the random streams.
+    :type seed: int
+
+    :param processes: number of worker processes, 1 (default) runs in \
+                      this process.
+    :type processes: int
+
+    :param cpu: If True (default), the FOM is calculated using the CPU \
+                time, otherwise the cycle number.
+    :type cpu: bool
+
+    :returns: dictionary with one entry per parameter, each a dictionary \
+              of arrays with one row per data set and one column per group: \
+              `fom`, `fom_lo`, `fom_hi`, `ratio`, `ratio_lo` and `ratio_hi`, \
+              and the list of data set `names`.
+    :rtype: dict
+    """
+    if type(labels) is not list:
+        labels = [labels]
+
+    names = [d.name for d in comparator.data]
+    if type(base) is not int:
+        base = names.index(str(base))
+
+    tasks = []
+    for j, label in enumerate(labels):
+        for i, d in enumerate(comparator.data):
+            tail = stats.tail(d.get_fom_array(label, cpu), frac)
+            tasks.append((np.array(tail), n_boot, [seed, j, i]))
+
+    if processes == 1:
+        boots = map(__resample__, tasks)
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            boots = pool.map(__resample__, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    boots = list(boots)
+
+    q = 100*np.array([(1 - level)/2, (1 + level)/2])
+    n = len(names)
+    ans = {}
+    for j, label in enumerate(labels):
+        fom = np.array([np.mean(t[0], axis = 0) for t in tasks[j*n:(j + 1)*n]])
+        boot = np.array(boots[j*n:(j + 1)*n])
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            ratio = fom/fom[base]
+            boot_ratio = boot/boot[base]
+        fom_lo, fom_hi = np.percentile(boot, q, axis = 1)
+        ratio_lo, ratio_hi = np.nanpercentile(boot_ratio, q, axis = 1)
+        ans[label] = {'names' : names,
+                      'fom' : fom, 'fom_lo' : fom_lo, 'fom_hi' : fom_hi,
+                      'ratio' : ratio, 'ratio_lo' : ratio_lo,
+                      'ratio_hi' : ratio_hi}
+    return ans
@@ -0,0 +1,226 @@
+"""
+
+.. module:: catalog
+     :synopsis: SQLite catalog of sweeps and their summary results
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+A :class:`Catalog` keeps a record of the data sets loaded in each study:
+the files of every data set with their cycle number and CPU time, the
+Serpent parameters they contain, and summary statistics of the FOM for
+the requested parameters and groups. Questions about past studies can
+then be answered from the catalog without reading any `_res.m` file.
+
+"""
+
+import numpy as np
+import os
+import sqlite3
+import fom
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (
+    id INTEGER PRIMARY KEY,
+    study TEXT NOT NULL,
+    name TEXT NOT NULL,
+    location TEXT,
+    n_files INTEGER,
+    UNIQUE (study, name));
+CREATE TABLE IF NOT EXISTS files (
+    sweep_id INTEGER NOT NULL REFERENCES sweeps(id),
+    filename TEXT NOT NULL,
+    cycle REAL,
+    cpu REAL,
+    size INTEGER,
+    mtime REAL);
+CREATE TABLE IF NOT EXISTS labels (
+    sweep_id INTEGER NOT NULL REFERENCES sweeps(id),
+    label TEXT NOT NULL,
+    size INTEGER);
+CREATE TABLE IF NOT EXISTS summaries (
+    sweep_id INTEGER NOT NULL REFERENCES sweeps(id),
+    label TEXT NOT NULL,
+    grp INTEGER NOT NULL,
+    n_pts INTEGER NOT NULL,
+    avg REAL,
+    var REAL,
+    ratio REAL);
+CREATE INDEX IF NOT EXISTS summaries_idx ON summaries (label, grp, ratio);
+"""
+
+class Catalog():
+    """ A catalog of studies stored in a SQLite database.
+
+    :param path: database file, created if it does not exist.
+    :type path: string
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """ Closes the database """
+        self.conn.close()
+
+    def load(self, dirs, names, study, summaries = [], n_pts = 0, verb = False):
+        """ Returns a :class:`analysis.fom.Comparator` for the data sets
+        and records it in the catalog, see :meth:`record`.
+
+        :param dirs: list of strings with the location of the data sets.
+        :type dirs: list(string)
+
+        :param names: list of strings that are the chosen names for the data sets
+        :type names: list(string)
+
+        :param study: name of the study.
+        :type study: string
+
+        :param summaries: pairs of Serpent 2 output parameter and group \
+                          to be summarized.
+        :type summaries: list(tuple(string, int))
+
+        :param n_pts: number of points used for the average FOM.
+        :type n_pts: int
+
+        :rtype: :class:`analysis.fom.Comparator`
+        """
+        comp = fom.Comparator(dirs, names, verb)
+        self.record(comp, study, summaries, n_pts)
+        return comp
+
+    def record(self, comparator, study, summaries = [], n_pts = 0):
+        """ Records the data sets of a :class:`analysis.fom.Comparator` in
+        the catalog, replacing any earlier record of the same study and data
+        set names. For each parameter and group in `summaries`, the average
+        FOM (:meth:`analysis.fom.Analyzer.get_avg`), its variance
+        (:meth:`analysis.fom.Analyzer.get_var`) and its ratio to the first
+        data set are stored.
+
+        :param comparator: data sets to be recorded.
+        :type comparator: :class:`analysis.fom.Comparator`
+
+        :param study: name of the study.
+        :type study: string
+
+        :param summaries: pairs of Serpent 2 output parameter and group \
+                          to be summarized.
+        :type summaries: list(tuple(string, int))
+
+        :param n_pts: number of points used for the average FOM.
+        :type n_pts: int
+        """
+        base = {}
+        with self.conn:
+            for d in comparator.data:
+                sweep = self.__sweep__(study, d)
+                self.conn.executemany(
+                    "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                    [(sweep, f.get_filename(), float(f.cycles),
+                      float(f.get_cpu())) + self.__stat__(f.get_filename())
+                      for f in d.data])
+                if d.data:
+                    first = d.data[0]
+                    self.conn.executemany(
+                        "INSERT INTO labels VALUES (?, ?, ?)",
+                        [(sweep, label, int(np.prod(first.get_shape(label))))
+                         for label in sorted(first.get_labels())])
+
+                rows = []
+                for label, grp in summaries:
+                    avg = float(d.get_avg(label, grp, n_pts))
+                    base.setdefault((label, grp), avg)
+                    ratio = None
+                    if base[(label, grp)] != 0:
+                        ratio = avg/base[(label, grp)]
+                    rows.append((sweep, label, grp, n_pts, avg,
+                                 float(d.get_var(label, grp)), ratio))
+                self.conn.executemany(
+                    "INSERT INTO summaries VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def studies(self):
+        """ Returns the names of all studies in the catalog
+
+        :rtype: list(string)
+        """
+        return [r[0] for r in self.conn.execute(
+            "SELECT DISTINCT study FROM sweeps ORDER BY study")]
+
+    def sweeps(self, study):
+        """ Returns the name, location and number of files of each data set
+        of a study.
+
+        :rtype: list(tuple)
+        """
+        return self.conn.execute(
+            "SELECT name, location, n_files FROM sweeps WHERE study = ? "
+            "ORDER BY id", (study,)).fetchall()
+
+    def labels(self, study, name):
+        """ Returns the Serpent parameters of a data set, with the number
+        of numbers stored for each (values and errors).
+
+        :rtype: list(tuple(string, int))
+        """
+        return self.conn.execute(
+            "SELECT label, size FROM labels JOIN sweeps ON id = sweep_id "
+            "WHERE study = ? AND name = ? ORDER BY label",
+            (study, name)).fetchall()
+
+    def query(self, label, grp, min_ratio = None, max_ratio = None, n_pts = None):
+        """ Returns the recorded summaries of a parameter and group, such as
+        every data set whose FOM ratio exceeds `min_ratio`.
+
+        :param label: Serpent 2 output parameter
+        :type label: string
+
+        :param grp: the energy group of interest
+        :type grp: int
+
+        :param min_ratio: smallest FOM ratio returned.
+        :type min_ratio: float, optional
+
+        :param max_ratio: largest FOM ratio returned.
+        :type max_ratio: float, optional
+
+        :param n_pts: only summaries using this number of points.
+        :type n_pts: int, optional
+
+        :returns: the study, data set name, number of points, average FOM, \
+                  variance and ratio of each summary.
+        :rtype: list(tuple)
+        """
+        sql = ("SELECT study, name, n_pts, avg, var, ratio FROM summaries "
+               "JOIN sweeps ON id = sweep_id WHERE label = ? AND grp = ?")
+        args = [label, grp]
+        if min_ratio is not None:
+            sql += " AND ratio >= ?"
+            args.append(min_ratio)
+        if max_ratio is not None:
+            sql += " AND ratio <= ?"
+            args.append(max_ratio)
+        if n_pts is not None:
+            sql += " AND n_pts = ?"
+            args.append(n_pts)
+        return self.conn.execute(sql + " ORDER BY study, sweeps.id", args).fetchall()
+
+    def __sweep__(self, study, analyzer):
+        # Replace any earlier record of the data set and return its id
+        for (old,) in self.conn.execute(
+                "SELECT id FROM sweeps WHERE study = ? AND name = ?",
+                (study, analyzer.name)).fetchall():
+            for table in ['files', 'labels', 'summaries']:
+                self.conn.execute("DELETE FROM " + table + " WHERE sweep_id = ?", (old,))
+            self.conn.execute("DELETE FROM sweeps WHERE id = ?", (old,))
+        location = getattr(analyzer, 'location', None)
+        return self.conn.execute(
+            "INSERT INTO sweeps (study, name, location, n_files) VALUES (?, ?, ?, ?)",
+            (study, analyzer.name, location, analyzer.n)).lastrowid
+
+    def __stat__(self, file_name):
+        try:
+            st = os.stat(file_name)
+            return (st.st_size, st.st_mtime)
+        except OSError:
+            return (None, None)
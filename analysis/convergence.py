@@ -0,0 +1,185 @@
+"""
+
+.. module:: convergence
+     :synopsis: Convergence detection for FOM series of running simulations
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+A FOM series is considered converged when the tail of the series (by
+default its second half) is stationary and the average is known
+precisely enough. Three tests are applied to every group at once:
+
+- a Geweke test comparing the mean of the start of the tail (first 10%)
+  with the mean of its end (last 50%),
+- a drift test on the slope of a linear fit of the tail against the
+  snapshot number,
+- the relative standard error of the tail average.
+
+A change in the mean or a drift that is statistically significant but
+smaller than the relative tolerance on the average is accepted, since
+it does not affect the FOM at the requested precision. Standard errors
+include the autocorrelation of the series (see :mod:`analysis.stats`).
+A :class:`Monitor` repeats the tests as new snapshots are written and
+can leave a flag file for a job script to poll.
+
+"""
+
+import numpy as np
+import os, time
+import fom
+import stats
+
+def check(analyzer, label, grps = None, frac = 0.5, z_max = 2.0,
+          t_max = 2.0, rtol = 0.01, min_pts = 10, cpu = True):
+    """ Returns the convergence tests of every group of a Serpent
+    parameter for an :class:`analysis.fom.Analyzer`.
+
+    :param analyzer: data set to be checked.
+    :type analyzer: :class:`analysis.fom.Analyzer`
+
+    :param label: Serpent 2 output parameter
+    :type label: string
+
+    :param grps: the groups or matrix entries (as flattened indices) of \
+                 interest. If None (default), all are checked.
+    :type grps: list(int), optional
+
+    :param frac: fraction of the series skipped before the tail.
+    :type frac: float
+
+    :param z_max: largest accepted absolute Geweke z-score.
+    :type z_max: float
+
+    :param t_max: largest accepted absolute t-statistic of the drift.
+    :type t_max: float
+
+    :param rtol: largest accepted relative standard error of the average.
+    :type rtol: float
+
+    :param min_pts: smallest number of snapshots in the tail.
+    :type min_pts: int
+
+    :param cpu: If True (default), the FOM is calculated using the CPU \
+                time, otherwise the cycle number.
+    :type cpu: bool
+
+    :returns: dictionary of arrays with one value per group: the tail \
+              average `fom`, its relative standard error `rel_err`, the \
+              Geweke `z` score, the drift `t` statistic, the relative \
+              `drift` over the tail and the `converged` verdict.
+    :rtype: dict
+    """
+    tail = stats.tail(analyzer.get_fom_array(label, cpu), frac)
+    if grps is not None:
+        tail = tail[:,np.array(grps) - 1]
+    n, k = np.shape(tail)
+    if n < max(min_pts, 4):
+        nan = np.full(k, np.nan)
+        return {'fom' : nan, 'rel_err' : nan, 'z' : nan, 't' : nan,
+                'drift' : nan, 'converged' : np.zeros(k, dtype = bool)}
+
+    whole = stats.series_stats(tail)
+    start = stats.series_stats(tail[:max(n//10, 2)])
+    end = stats.series_stats(tail[n//2:])
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        rel_err = whole['err']/np.abs(whole['mean'])
+        shift = (start['mean'] - end['mean'])/np.abs(whole['mean'])
+        z = (start['mean'] - end['mean'])/np.sqrt(start['err']**2 + end['err']**2)
+
+        # Least squares slope against the snapshot number
+        i = np.arange(n) - (n - 1)/2.0
+        slope = np.dot(i, tail - whole['mean'])/np.dot(i, i)
+        resid = tail - whole['mean'] - np.outer(i, slope)
+        tau = stats.int_time(resid)
+        se = np.sqrt(np.sum(resid**2, axis = 0)/(n - 2)*tau/np.dot(i, i))
+        t = slope/se
+        drift = slope*(n - 1)/np.abs(whole['mean'])
+
+    # Constant series are converged, while a change without noise, such as
+    # a noiseless ramp, keeps an infinite statistic
+    z[start['mean'] == end['mean']] = 0
+    t[slope == 0] = 0
+
+    # Significant changes smaller than the tolerance are accepted
+    stationary = (np.abs(z) <= z_max) | (np.abs(shift) <= rtol)
+    steady = (np.abs(t) <= t_max) | (np.abs(drift) <= rtol)
+    converged = (stationary & steady & (np.nan_to_num(rel_err) <= rtol)
+                 & (whole['mean'] > 0))
+    return {'fom' : whole['mean'], 'rel_err' : rel_err, 'z' : z, 't' : t,
+            'drift' : drift, 'converged' : converged}
+
+class Monitor():
+    """ An object that follows the snapshots written by a running
+    simulation and checks the convergence of a Serpent parameter every
+    time it is updated, see :func:`check`.
+
+    :param location: folder where the Serpent output files are written
+    :type location: string
+
+    :param label: Serpent 2 output parameter
+    :type label: string
+
+    :param grps: the groups of interest. If None (default), all are checked.
+    :type grps: list(int), optional
+
+    :param flag: file written once every group has converged, with one \
+                 line per group. If None (default), no file is written.
+    :type flag: string, optional
+
+    The remaining keyword arguments are passed to :func:`check`.
+    """
+
+    def __init__(self, location, label, grps = None, flag = None, **criteria):
+        self.analyzer = fom.Analyzer(location)
+        self.label = label
+        self.grps = grps
+        self.flag = flag
+        self.criteria = criteria
+        self.result = None
+
+    def update(self):
+        """ Uploads new snapshots and checks convergence again. Nothing is
+        recalculated if there are no new snapshots.
+
+        :returns: True if every group has converged.
+        :rtype: bool
+        """
+        if self.analyzer.refresh() or self.result is None:
+            if self.analyzer.n == 0:
+                return False
+            self.result = check(self.analyzer, self.label, self.grps,
+                                **self.criteria)
+        converged = bool(np.all(self.result['converged']))
+        if converged and self.flag is not None:
+            self.__write_flag__()
+        return converged
+
+    def watch(self, interval = 60, max_checks = None):
+        """ Checks convergence every `interval` seconds until every group
+        has converged, or `max_checks` checks have been made.
+
+        :returns: True if every group has converged.
+        :rtype: bool
+        """
+        checks = 0
+        while True:
+            if self.update():
+                return True
+            checks += 1
+            if max_checks is not None and checks >= max_checks:
+                return False
+            time.sleep(interval)
+
+    def __write_flag__(self):
+        # Write to a temporary file first so the flag is never partial
+        grps = self.grps
+        if grps is None:
+            grps = range(1, len(self.result['fom']) + 1)
+        lines = [self.label + ' ' + str(g) + ' ' + repr(f) + ' ' + repr(e)
+                 for g, f, e in zip(grps, self.result['fom'],
+                                    self.result['rel_err'])]
+        tmp = self.flag + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.rename(tmp, self.flag)
@@ -10,28 +10,22 @@ from pyne import serpent
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
-import os, sys
+import os, sys, re
 import warnings as warnings
 import math as math
 import pandas as pd
 from IPython.display import display, HTML
 
-class DataFile():
-    """An object containing the data from a Serpent 2 output file
-    (`_res.m`). When created, it will seek the provided filename and
-    ingest all the data, stored in dictionary format.
-
-    :param file_name: filename to be ingested.
-    :type file_name: string
+class BaseFile(object):
+    """Accessors shared by :class:`DataFile`, :class:`CompactDataFile`
+    and :class:`DetectorFile`. Subclasses provide the `filename`,
+    `cpu` and `cycles` attributes and a `__get_val__(label, err)`
+    method returning the values or errors of a label as a two
+    dimensional array.
     """
-    
-    def __init__(self,file_name):
-        assert os.path.exists(file_name), "File does not exist"
-        self.data = serpent.parse_res(file_name)
-        self.filename = file_name
-        self.cpu = self.data['TOT_CPU_TIME'][0]
-        self.cycles = self.data['CYCLE_IDX'][0]
-        
+
+    __slots__ = ()
+
     def get_cpu(self):
         """Returns a float with the total CPU time"""
         return self.cpu
@@ -40,10 +34,6 @@ class DataFile():
         """Returns a string with the filename"""
         return self.filename
     
-    def all_data(self):
-        """Returns the dictionary with all the `res.m` data"""
-        return self.data
-    
     def get_data(self, label, err = False, reshape = False):
         """Returns an array with the specified output data,
         either the values themselves or their associated error.
@@ -103,37 +93,24 @@ class DataFile():
         """
         
         try:
-            data = []
-            #errors = self.__get_val__(self.data[label],err = True)
-            errors = self.__get_val__(label,err = True)
+            # Errors are promoted to double precision before squaring
+            errors = np.array(self.__get_val__(label, err = True),
+                              dtype = np.float64, ndmin = 2)
             
             if cpu:
                 time = self.cpu
             else:
                 time = self.cycles
-                
-            for error in errors[0]:
-                if error != 0:
-                    data.append(np.power(time*np.power(error,2), -1))
-                else:
-                    data.append(0)
-            data = np.array(data, ndmin=2)
+
+            data = np.zeros_like(errors)
+            nonzero = (errors != 0)
+            data[nonzero] = np.power(time*np.power(errors[nonzero],2), -1)
             if reshape:
                 return self.__reshape__(data)
             else:
                 return data
         except KeyError:
             raise KeyError('Invalid serpent2 res_m label')
-    
-    def __get_val__(self,label, err = False):
-        array = self.data[label]
-        shape = np.shape(array)
-        if shape == (1,1) or len(shape) == 1:
-            if err:
-                return np.array([0],ndmin=2)
-            return np.array(array,ndmin=2)
-        else:
-            return np.array([array[0,i] for i in range(shape[1]) if i % 2 == err],ndmin=2)
         
     def __reshape__(self,array):
         # Reshapes into a square matrix
@@ -150,3 +127,552 @@ class DataFile():
                 warnings.warn('This does not appear to be a square matrix, skipping reshape')
                 return array
 
+def is_complete(file_name):
+    """Returns True if a Serpent output file ends with a complete
+    statement. Files that are still being written, or were cut short,
+    end in the middle of a line or array.
+
+    :param file_name: filename to be checked.
+    :type file_name: string
+
+    :rtype: bool
+    """
+    with open(file_name, 'rb') as f:
+        f.seek(0, 2)
+        f.seek(max(f.tell() - 256, 0))
+        return f.read().rstrip().endswith(b';')
+
+# Data lines of a Serpent result file, `LABEL (idx, [1: n]) = ... ;`
+RES_DATA = re.compile(r'^\s*([A-Za-z_]\w*)\s*\(idx,\s*(?:\[\s*1:\s*\d+\s*\]|(1))\s*\)\s*=')
+
+# Templates learned from the first result file read in each folder
+TEMPLATES = {}
+
+class ResTemplate(object):
+    """The layout of a Serpent 2 result file (`_res.m`): the order of its
+    data lines, their labels and the number of values on each. Files
+    written by the same Serpent build for the same problem share this
+    layout, so that they can be read by checking each line against the
+    template and converting all numbers of the file with a single call.
+
+    A template is only used if reading the file it was learned from gives
+    the same result as the general parser, see :attr:`valid`.
+
+    :param file_name: result file the layout is learned from.
+    :type file_name: string
+
+    :param data: the file as read by :func:`pyne.serpent.parse_res`.
+    :type data: dict
+    """
+
+    def __init__(self, file_name, data):
+        self.lines = []
+        self.size = 0
+        labels = []
+        lines = {}
+        with open(file_name) as f:
+            for line in f:
+                if '(idx' not in line:
+                    continue
+                match = RES_DATA.match(line)
+                if match is None:
+                    self.valid = False
+                    return
+                label = match.group(1)
+                rhs = line[match.end():].strip()
+                if rhs.startswith("'"):
+                    # String lengths vary, only the label is checked
+                    self.lines.append((line[:line.index('(idx')], label, None))
+                else:
+                    n = len(rhs.replace('[', ' ').replace(']', ' ')
+                            .replace(';', ' ').split())
+                    self.lines.append((line[:match.end()], label, n))
+                    if label not in lines:
+                        labels.append(label)
+                    lines.setdefault(label, []).append(
+                        (self.size, self.size + n, match.group(2) is not None))
+                    self.size += n
+
+        # Position of the numbers of each label, and the shape returned
+        self.blocks = []
+        for label in labels:
+            rows = lines[label]
+            if len(rows) == 1:
+                select = slice(rows[0][0], rows[0][1])
+            else:
+                select = np.concatenate([np.arange(s, e) for s, e, _ in rows])
+            if all(scalar for _, _, scalar in rows):
+                shape = (len(rows),)
+            else:
+                shape = (len(rows), rows[0][1] - rows[0][0])
+            self.blocks.append((label, select, shape))
+
+        try:
+            self.valid = self.__matches__(self.parse(file_name), data)
+        except ValueError:
+            self.valid = False
+
+    def parse(self, file_name):
+        """Reads a result file with this layout.
+
+        :returns: dictionary in the format of \
+                  :func:`pyne.serpent.parse_res`, or None if the file does \
+                  not match the layout.
+        :rtype: dict
+        """
+        chunks = []
+        strings = {}
+        i = 0
+        n_lines = len(self.lines)
+        with open(file_name) as f:
+            for line in f:
+                if '(idx' not in line:
+                    continue
+                if i == n_lines:
+                    return None
+                prefix, label, n = self.lines[i]
+                if not line.startswith(prefix):
+                    return None
+                if n is None:
+                    value = line[line.index('=') + 1:].strip().rstrip(';').strip()
+                    strings.setdefault(label, []).append(value.strip("'"))
+                else:
+                    chunks.append(line[len(prefix):])
+                i += 1
+        if i != n_lines:
+            return None
+
+        text = ' '.join(chunks).replace('[', ' ').replace(']', ' ').replace(';', ' ')
+        try:
+            values = np.array(text.split(), dtype = float)
+        except ValueError:
+            return None
+        if len(values) != self.size:
+            return None
+
+        data = dict((label, np.array(s)) for label, s in strings.items())
+        for label, select, shape in self.blocks:
+            data[label] = np.reshape(values[select], shape)
+        return data
+
+    def __matches__(self, fast, data):
+        if fast is None or sorted(fast) != sorted(data):
+            return False
+        for label in data:
+            a, b = fast[label], data[label]
+            if type(a) is not type(b) or np.shape(a) != np.shape(b):
+                return False
+            if np.asarray(b).dtype.kind in 'biuf':
+                if not np.array_equal(a, b):
+                    return False
+            elif np.asarray(a).tolist() != np.asarray(b).tolist():
+                return False
+        return True
+
+def parse_res(file_name):
+    """Reads a Serpent 2 result file (`_res.m`) in the format of
+    :func:`pyne.serpent.parse_res`. The layout of the first file read in
+    a folder is learned as a :class:`ResTemplate`, and later files of the
+    folder are read with it. Files that do not match the template are
+    read with :func:`pyne.serpent.parse_res`, and their layout replaces
+    the template.
+
+    :param file_name: filename to be read.
+    :type file_name: string
+
+    :rtype: dict
+    """
+    folder = os.path.dirname(os.path.abspath(file_name))
+    template = TEMPLATES.get(folder)
+    if template is not None and template.valid:
+        data = template.parse(file_name)
+        if data is not None:
+            return data
+
+    data = serpent.parse_res(file_name)
+    if template is None or template.valid:
+        TEMPLATES[folder] = ResTemplate(file_name, data)
+    return data
+
+class DataFile(BaseFile):
+    """An object containing the data from a Serpent 2 output file
+    (`_res.m`). When created, it will seek the provided filename and
+    ingest all the data, stored in dictionary format. Files are read
+    with :func:`parse_res`.
+
+    :param file_name: filename to be ingested.
+    :type file_name: string
+    """
+
+    # Shapes of the parameters removed with release
+    released = {}
+
+    def __init__(self,file_name):
+        assert os.path.exists(file_name), "File does not exist"
+        assert is_complete(file_name), "File is incomplete"
+        self.data = parse_res(file_name)
+        self.filename = file_name
+        self.cpu = self.data['TOT_CPU_TIME'][0]
+        self.cycles = self.data['CYCLE_IDX'][0]
+    
+    def all_data(self):
+        """Returns the dictionary with all the `res.m` data, except the
+        parameters removed with :meth:`release`"""
+        return self.data
+
+    def get_labels(self):
+        """Returns the names of all the `res.m` parameters"""
+        return list(self.data) + list(self.released)
+
+    def get_shape(self, label):
+        """Returns the shape of a `res.m` parameter as read"""
+        if label in self.released:
+            return self.released[label]
+        return np.shape(self.data[label])
+
+    def get_nbytes(self):
+        """Returns the number of bytes of the data held"""
+        return sum(np.asarray(v).nbytes for v in self.data.values())
+
+    def release(self, labels):
+        """Removes parameters from memory, once their values are kept
+        elsewhere. They are still listed by :meth:`get_labels`, but
+        :meth:`get_data` raises a KeyError.
+
+        :param labels: Serpent 2 output parameters.
+        :type labels: list(string)
+        """
+        released = dict(self.released)
+        for label in labels:
+            if label in self.data:
+                released[label] = np.shape(self.data.pop(label))
+        self.released = released
+
+    def is_released(self, label):
+        """Returns True if a parameter was removed with :meth:`release`"""
+        return label in self.released
+    
+    def __get_val__(self,label, err = False):
+        array = self.data[label]
+        shape = np.shape(array)
+        if shape == (1,1) or len(shape) == 1:
+            if err:
+                return np.array([0],ndmin=2)
+            return np.array(array,ndmin=2)
+        else:
+            return np.array([array[0,i] for i in range(shape[1]) if i % 2 == err],ndmin=2)
+
+# Layouts shared between CompactDataFile objects with the same labels
+LAYOUTS = {}
+
+class CompactDataFile(BaseFile):
+    """A compact alternative to :class:`DataFile` for holding many
+    snapshots in memory. Instead of a dictionary of arrays, all values
+    are packed into a single array and all errors into another, and
+    the label offsets are shared between every file with the same
+    layout. Instances use `__slots__` and carry no `__dict__`.
+
+    Values and errors are stored with the precision given by `dtype`,
+    while the CPU time and cycle number are kept in double
+    precision. Serpent writes values with 6 significant digits and
+    relative errors with at most 5, so storing them as
+    :any:`numpy.float32` (about 7 significant digits) introduces a
+    relative rounding error of at most :math:`2^{-24} \\approx 6
+    \\times 10^{-8}` on each number. Since :math:`FOM \\propto
+    \\sigma^{-2}`, the relative error on a FOM is at most twice that,
+    about :math:`1.2 \\times 10^{-7}`, which is negligible next to the
+    statistical uncertainty of the FOM itself. Non-numeric entries
+    (version, title, dates) are kept as read.
+
+    :param file_name: filename to be ingested.
+    :type file_name: string
+
+    :param dtype: storage type for values and errors, \
+                  :any:`numpy.float32` (default) halves the memory used \
+                  compared to :class:`DataFile`.
+    :type dtype: :any:`numpy.dtype`
+    """
+
+    __slots__ = ('filename', 'cpu', 'cycles', 'index', 'values',
+                 'errors', 'strings')
+
+    def __init__(self, file_name, dtype=np.float32):
+        assert os.path.exists(file_name), "File does not exist"
+        assert is_complete(file_name), "File is incomplete"
+        data = parse_res(file_name)
+        self.filename = file_name
+        self.cpu = float(data['TOT_CPU_TIME'][0])
+        self.cycles = float(data['CYCLE_IDX'][0])
+        self.strings = {}
+
+        index = []
+        values = []
+        errors = []
+        n_val = 0
+        n_err = 0
+        for label in sorted(data):
+            array = np.asarray(data[label])
+            if array.dtype.kind not in 'biuf':
+                self.strings[label] = data[label]
+                continue
+            shape = np.shape(array)
+            if self.__paired__(shape):
+                # Every row is kept, such as the universes of a multi-universe file
+                val = np.ravel(array[:, 0::2])
+                err = np.ravel(array[:, 1::2])
+            else:
+                val = np.ravel(array)
+                err = val[:0]
+            index.append((label, (n_val, n_val + len(val),
+                                  n_err, n_err + len(err), shape)))
+            values.append(val)
+            errors.append(err)
+            n_val += len(val)
+            n_err += len(err)
+
+        self.index = LAYOUTS.setdefault(tuple(index), dict(index))
+        self.values = np.concatenate(values).astype(dtype)
+        self.errors = np.concatenate(errors).astype(dtype)
+
+    def all_data(self):
+        """Returns a dictionary with all the `res.m` data, rebuilt in the
+        layout returned by :class:`DataFile`. Numeric data is returned at
+        the storage precision. Parameters removed with :meth:`release`
+        are left out."""
+        data = dict(self.strings)
+        for label, (vs, ve, es, ee, shape) in self.index.items():
+            if vs is None:
+                continue
+            elif self.__paired__(shape):
+                array = np.empty(shape, dtype=self.values.dtype)
+                array[:, 0::2] = np.reshape(self.values[vs:ve], (shape[0], -1))
+                array[:, 1::2] = np.reshape(self.errors[es:ee], (shape[0], -1))
+            else:
+                array = np.reshape(self.values[vs:ve], shape)
+            data[label] = array
+        return data
+
+    def get_labels(self):
+        """Returns the names of all the `res.m` parameters"""
+        return list(self.index) + list(self.strings)
+
+    def get_shape(self, label):
+        """Returns the shape of a `res.m` parameter as read"""
+        if label in self.strings:
+            return np.shape(self.strings[label])
+        return self.index[label][4]
+
+    def get_nbytes(self):
+        """Returns the number of bytes of the data held"""
+        return (self.values.nbytes + self.errors.nbytes +
+                sum(np.asarray(v).nbytes for v in self.strings.values()))
+
+    def release(self, labels):
+        """Removes numeric parameters from memory, once their values are
+        kept elsewhere, see :meth:`DataFile.release`. The remaining values
+        and errors are packed again.
+
+        :param labels: Serpent 2 output parameters.
+        :type labels: list(string)
+        """
+        index = []
+        values = []
+        errors = []
+        n_val = 0
+        n_err = 0
+        for label, (vs, ve, es, ee, shape) in sorted(self.index.items()):
+            if vs is None or label in labels:
+                index.append((label, (None, None, None, None, shape)))
+                continue
+            index.append((label, (n_val, n_val + ve - vs,
+                                  n_err, n_err + ee - es, shape)))
+            values.append(self.values[vs:ve])
+            errors.append(self.errors[es:ee])
+            n_val += ve - vs
+            n_err += ee - es
+        self.index = LAYOUTS.setdefault(tuple(index), dict(index))
+        self.values = np.concatenate(values or [self.values[:0]])
+        self.errors = np.concatenate(errors or [self.errors[:0]])
+
+    def is_released(self, label):
+        """Returns True if a parameter was removed with :meth:`release`"""
+        return label in self.index and self.index[label][0] is None
+
+    def __getstate__(self):
+        return tuple(getattr(self, a) for a in self.__slots__)
+
+    def __setstate__(self, state):
+        for a, value in zip(self.__slots__, state):
+            setattr(self, a, value)
+        # Share the layout again after unpickling
+        self.index = LAYOUTS.setdefault(tuple(sorted(self.index.items())), self.index)
+
+    def __paired__(self, shape):
+        # Values and errors are interleaved unless the entry is a scalar
+        return not (shape == (1,1) or len(shape) == 1)
+
+    def __get_val__(self, label, err = False):
+        vs, ve, es, ee, shape = self.index[label]
+        if vs is None:
+            raise KeyError(label)
+        elif not self.__paired__(shape):
+            if err:
+                return np.array([0],ndmin=2)
+            return np.array(self.values[vs:ve],ndmin=2)
+        # First row only, as in DataFile
+        elif err:
+            return np.array(self.errors[es:es + (ee - es)//shape[0]],ndmin=2)
+        else:
+            return np.array(self.values[vs:vs + (ve - vs)//shape[0]],ndmin=2)
+
+# Serpent detector output files, `<input>_det<step>.m`
+DET_FILE = re.compile(r'_det\d*\.m$')
+DET_START = re.compile(r'^\s*DET(\w+)\s*=\s*\[(.*)$')
+# Suffixes of the auxiliary arrays (bin grids) written after a detector name
+DET_GRIDS = ['E', 'X', 'Y', 'Z', 'R', 'T', 'N', 'PHI', 'THETA', 'COORD']
+RES_TIME = re.compile(r'^\s*(TOT_CPU_TIME|CYCLE_IDX)\s*\(idx,\s*1\)\s*=\s*([^;\s]+)')
+
+def is_det_file(file_name):
+    """Returns True if `file_name` is a Serpent detector output file
+    (`_det.m`)."""
+    return DET_FILE.search(file_name) is not None
+
+def parse_det(file_name, names = None):
+    """Reads the arrays of a Serpent 2 detector output file (`_det.m`)
+    one line at a time. Each array is converted in bulk when its closing
+    bracket is reached, and arrays not requested in `names` are skipped
+    without being converted, so only the selected detectors are held in
+    memory.
+
+    :param file_name: filename to be read.
+    :type file_name: string
+
+    :param names: detectors to be read, without the `DET` prefix. The \
+                  auxiliary arrays of a detector (the grids \
+                  `DET<name><suffix>` with a suffix of :data:`DET_GRIDS`, \
+                  such as the energy grid `DET<name>E`) are read along \
+                  with it. If None (default), all arrays are read.
+    :type names: list(string), optional
+
+    :returns: dictionary of two dimensional arrays, keyed by the array \
+              name without the `DET` prefix.
+    :rtype: dict
+    """
+    data = {}
+    name = None
+    rows = []
+    with open(file_name) as f:
+        for line in f:
+            if name is None:
+                match = DET_START.match(line)
+                if match is None:
+                    continue
+                name = match.group(1)
+                keep = names is None or any(
+                    name == n or (name.startswith(n) and name[len(n):] in DET_GRIDS)
+                    for n in names)
+                rows = []
+                line = match.group(2)
+            end = line.find(']')
+            if keep:
+                rows.append(line if end < 0 else line[:end])
+            if end >= 0:
+                if keep:
+                    first = [r for r in rows if r.strip()]
+                    ncols = len(first[0].split()) if first else 0
+                    values = np.array(' '.join(rows).split(), dtype = float)
+                    data[name] = values.reshape(-1, max(ncols, 1))
+                name = None
+    return data
+
+class DetectorFile(BaseFile):
+    """An object containing the detector tallies from a Serpent 2
+    detector output file (`_det.m`). For each detector the values,
+    relative errors and the ten bin indices of every bin are stored as
+    separate arrays. Detector files do not contain the CPU time or cycle
+    number, these are read from the result file (`_res.m`) of the same
+    run.
+
+    :param file_name: filename to be ingested.
+    :type file_name: string
+
+    :param names: detectors to be ingested, without the `DET` prefix. If \
+                  None (default), all detectors are ingested.
+    :type names: list(string), optional
+
+    :param res_file: result file of the same run. If None (default), the \
+                     `_det<step>.m` suffix of `file_name` is replaced with \
+                     `_res.m`.
+    :type res_file: string, optional
+    """
+
+    def __init__(self, file_name, names = None, res_file = None):
+        assert os.path.exists(file_name), "File does not exist"
+        if res_file is None:
+            res_file = DET_FILE.sub('_res.m', file_name)
+        assert os.path.exists(res_file), "Result file does not exist"
+        assert is_complete(file_name), "File is incomplete"
+
+        self.filename = file_name
+        self.values = {}
+        self.errors = {}
+        self.bins = {}
+        self.grids = {}
+        for name, array in parse_det(file_name, names).items():
+            if np.shape(array)[1] == 12:
+                self.bins[name] = array[:,:10].astype(np.int32)
+                self.values[name] = array[:,10].copy()
+                self.errors[name] = array[:,11].copy()
+            else:
+                self.grids[name] = array
+
+        time = {}
+        with open(res_file) as f:
+            for line in f:
+                match = RES_TIME.match(line)
+                if match is not None:
+                    time.setdefault(match.group(1), float(match.group(2)))
+        self.cpu = time['TOT_CPU_TIME']
+        self.cycles = time['CYCLE_IDX']
+
+    def all_data(self):
+        """Returns a dictionary with the values of all detectors"""
+        return self.values
+
+    def get_labels(self):
+        """Returns the names of all detectors"""
+        return list(self.values)
+
+    def get_shape(self, label):
+        """Returns the shape of the values of a detector"""
+        return np.shape(self.values[label])
+
+    def get_bins(self, name):
+        """Returns an array with the ten bin indices (value, energy,
+        universe, cell, material, lattice, reaction, z, y, x) of each bin
+        of a detector, one row per bin.
+
+        :param name: detector name, without the `DET` prefix.
+        :type name: string
+        """
+        try:
+            return self.bins[name]
+        except KeyError:
+            raise KeyError('Invalid serpent2 detector name')
+
+    def get_grid(self, name):
+        """Returns an auxiliary array of a detector, such as the energy
+        grid `DET<name>E`.
+
+        :param name: array name, without the `DET` prefix.
+        :type name: string
+        """
+        try:
+            return self.grids[name]
+        except KeyError:
+            raise KeyError('Invalid serpent2 detector name')
+
+    def __get_val__(self, label, err = False):
+        if err:
+            return np.array(self.errors[label], ndmin=2)
+        return np.array(self.values[label], ndmin=2)
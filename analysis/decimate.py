@@ -0,0 +1,109 @@
+"""
+
+.. module:: decimate
+     :synopsis: Level-of-detail decimation of long series for plotting
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+Series with tens of thousands of snapshots are reduced to the resolution
+of the figure before they are drawn. The x axis is divided into bins
+evenly spaced in logarithm (the FOM plots use a log x axis), and only
+the smallest and largest value of each bin are kept, so that the
+envelope and the outliers of the series look the same as with every
+point drawn. All series of a figure are then drawn as one collection.
+
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.lines import Line2D
+
+def minmax(x, y, max_pts = 2000, log = True):
+    """ Returns the indices of the points of a series kept when it is
+    decimated to at most `max_pts` points: the smallest and largest value
+    in each of `max_pts/2 - 1` bins of `x`, and the first and last points.
+    Series that are short enough are kept whole.
+
+    :param x: abscissa of the series.
+    :type x: :class:`numpy.ndarray`
+
+    :param y: ordinate of the series.
+    :type y: :class:`numpy.ndarray`
+
+    :param max_pts: largest number of points kept.
+    :type max_pts: int
+
+    :param log: If True (default), the bins are evenly spaced in \
+                logarithm, unless `x` has values that are not positive.
+    :type log: bool
+
+    :returns: sorted indices of the kept points.
+    :rtype: :class:`numpy.ndarray`
+    """
+    x = np.asarray(x, dtype = float)
+    y = np.asarray(y, dtype = float)
+    if len(x) <= max_pts:
+        return np.arange(len(x))
+
+    n_bins = max(max_pts//2 - 1, 1)
+    lo, hi = np.nanmin(x), np.nanmax(x)
+    if log and lo > 0:
+        edges = np.logspace(np.log10(lo), np.log10(hi), n_bins + 1)
+    else:
+        edges = np.linspace(lo, hi, n_bins + 1)
+    bins = np.clip(np.searchsorted(edges, x, side = 'right') - 1, 0, n_bins - 1)
+
+    # Sorted by bin then value, the first and last of each bin are kept
+    order = np.lexsort((y, bins))
+    starts = np.flatnonzero(np.diff(np.concatenate(([-1], bins[order]))))
+    ends = np.concatenate((starts[1:], [len(order)])) - 1
+    return np.unique(np.concatenate((order[starts], order[ends],
+                                     [0, len(x) - 1])))
+
+def scatter(series, colors, labels, max_pts = 2000, ax = None, **legend):
+    """ Draws several series as markers with a single collection, and adds
+    a legend with one entry per series.
+
+    :param series: pairs of abscissa and ordinate of each series.
+    :type series: list(tuple(:class:`numpy.ndarray`, :class:`numpy.ndarray`))
+
+    :param colors: color of each series.
+    :type colors: list
+
+    :param labels: legend entry of each series.
+    :type labels: list(string)
+
+    :param max_pts: largest number of points drawn per series, see \
+                    :func:`minmax`. If None, every point is drawn.
+    :type max_pts: int, optional
+
+    :param ax: axes to draw on, the current axes by default.
+    :type ax: :class:`matplotlib.axes.Axes`, optional
+
+    The remaining keyword arguments are passed to the legend.
+
+    :rtype: :class:`matplotlib.axes.Axes`
+    """
+    if ax is None:
+        ax = plt.gca()
+
+    xs, ys, cs = [], [], []
+    for (x, y), color in zip(series, colors):
+        x = np.asarray(x, dtype = float)
+        y = np.asarray(y, dtype = float)
+        if max_pts is not None:
+            keep = minmax(x, y, max_pts)
+            x, y = x[keep], y[keep]
+        xs.append(x)
+        ys.append(y)
+        cs.append(np.tile(np.asarray(color, dtype = float), (len(x), 1)))
+
+    if xs:
+        size = plt.rcParams['lines.markersize']**2
+        ax.scatter(np.concatenate(xs), np.concatenate(ys), s = size,
+                   c = np.concatenate(cs), marker = '.', linewidths = 0)
+
+    handles = [Line2D([], [], linestyle = '', marker = '.', color = c, label = l)
+               for c, l in zip(colors, labels)]
+    ax.legend(handles = handles, loc = 'best', **legend)
+    return ax
@@ -0,0 +1,229 @@
+"""
+
+.. module:: derived
+     :synopsis: Derived quantities of Serpent parameters with error propagation
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+Derived quantities, such as :math:`\\nu\\Sigma_f/\\Sigma_a` or a sum over
+groups, are declared once as expressions of Serpent parameters::
+
+    from analysis.derived import Param
+    kinf = (Param('INF_NSF')/Param('INF_ABS')).sum()
+    analyzer.define('KINF', kinf)
+
+after which the name can be used like any Serpent parameter by every
+method of :class:`analysis.fom.Analyzer`. Expressions are evaluated when
+first requested, for all snapshots at once, and the standard deviation
+:math:`\\sigma` of the result is propagated to first order assuming the
+terms are independent:
+
+.. math::
+
+   \\sigma_{a \\pm b}^2 = \\sigma_a^2 + \\sigma_b^2, \\quad
+   \\sigma_{ab}^2 = (b \\sigma_a)^2 + (a \\sigma_b)^2, \\quad
+   \\sigma_{a/b}^2 = (\\sigma_a/b)^2 + (a \\sigma_b/b^2)^2
+
+Every intermediate result is stored with the arrays of the
+:class:`analysis.fom.Analyzer`, keyed by the structure of the
+expression, so a subterm shared by several quantities is evaluated once.
+
+"""
+
+import numpy as np
+
+class Expr(object):
+    """ A derived quantity. Expressions are combined with `+`, `-`, `*`
+    and `/` (with each other or with numbers), a group is selected with
+    `expr[g]` (starting at 1) and groups are summed with :meth:`sum`.
+    """
+
+    def __add__(self, other):
+        return Binary('+', self, other)
+
+    def __radd__(self, other):
+        return Binary('+', other, self)
+
+    def __sub__(self, other):
+        return Binary('-', self, other)
+
+    def __rsub__(self, other):
+        return Binary('-', other, self)
+
+    def __mul__(self, other):
+        return Binary('*', self, other)
+
+    def __rmul__(self, other):
+        return Binary('*', other, self)
+
+    def __div__(self, other):
+        return Binary('/', self, other)
+
+    def __rdiv__(self, other):
+        return Binary('/', other, self)
+
+    __truediv__ = __div__
+    __rtruediv__ = __rdiv__
+
+    def __neg__(self):
+        return Binary('*', -1.0, self)
+
+    def __getitem__(self, grp):
+        return Group(self, grp)
+
+    def sum(self, grps = None):
+        """ Returns the sum over groups, all by default.
+
+        :param grps: the groups to be summed.
+        :type grps: list(int), optional
+
+        :rtype: :class:`Expr`
+        """
+        return Sum(self, grps)
+
+    def labels(self):
+        """ Returns the Serpent parameters used by the expression
+
+        :rtype: set(string)
+        """
+        return set()
+
+    def evaluate(self, analyzer):
+        """ Returns the value and standard deviation of the expression for
+        every snapshot of an :class:`analysis.fom.Analyzer`, one row per
+        snapshot. Results are stored with the arrays of the analyzer.
+
+        :rtype: tuple(:class:`numpy.ndarray`, :class:`numpy.ndarray`)
+        """
+        key = ('derived', self.key)
+        if (key, False) not in analyzer.cache:
+            value, sigma = self.__compute__(analyzer)
+            value = np.array(value, dtype = float, ndmin = 2)
+            sigma = np.array(sigma, dtype = float, ndmin = 2)
+            value.flags.writeable = False
+            sigma.flags.writeable = False
+            analyzer.cache[(key, False)] = value
+            analyzer.cache[(key, True)] = sigma
+        return analyzer.cache[(key, False)], analyzer.cache[(key, True)]
+
+    def __repr__(self):
+        return 'Expr' + repr(self.key)
+
+class Param(Expr):
+    """ A Serpent parameter, or a quantity defined with
+    :meth:`analysis.fom.Analyzer.define`.
+
+    :param label: Serpent 2 output parameter
+    :type label: string
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.key = ('param', label)
+
+    def labels(self):
+        return set([self.label])
+
+    def __compute__(self, analyzer):
+        value = analyzer.get_array(self.label)
+        return value, np.abs(value*analyzer.get_array(self.label, err = True))
+
+class Const(Expr):
+    """ A number without uncertainty """
+
+    def __init__(self, value):
+        self.value = float(value)
+        self.key = ('const', self.value)
+
+    def __compute__(self, analyzer):
+        return np.full((analyzer.n, 1), self.value), np.zeros((analyzer.n, 1))
+
+class Binary(Expr):
+    """ The sum, difference, product or ratio of two expressions """
+
+    def __init__(self, op, a, b):
+        self.op = op
+        self.a = a if isinstance(a, Expr) else Const(a)
+        self.b = b if isinstance(b, Expr) else Const(b)
+        keys = [self.a.key, self.b.key]
+        if op in '+*':
+            # a + b and b + a are the same quantity
+            keys.sort(key = repr)
+        self.key = (op,) + tuple(keys)
+
+    def labels(self):
+        return self.a.labels() | self.b.labels()
+
+    def __compute__(self, analyzer):
+        a, sa = self.a.evaluate(analyzer)
+        b, sb = self.b.evaluate(analyzer)
+        if self.op == '+':
+            return a + b, np.hypot(sa, sb)
+        elif self.op == '-':
+            return a - b, np.hypot(sa, sb)
+        elif self.op == '*':
+            return a*b, np.hypot(b*sa, a*sb)
+
+        # Ratios with a zero denominator are 0 without error
+        shape = np.broadcast(a, b).shape
+        value = np.zeros(shape)
+        sigma = np.zeros(shape)
+        a, sa, b, sb = [np.broadcast_to(x, shape) for x in [a, sa, b, sb]]
+        nonzero = (b != 0)
+        value[nonzero] = a[nonzero]/b[nonzero]
+        sigma[nonzero] = np.hypot(sa[nonzero]/b[nonzero],
+                                  a[nonzero]*sb[nonzero]/b[nonzero]**2)
+        return value, sigma
+
+class Group(Expr):
+    """ One group or matrix entry (as a flattened index, starting at 1)
+    of an expression """
+
+    def __init__(self, a, grp):
+        self.a = a
+        self.grp = grp
+        self.key = ('group', a.key, grp)
+
+    def labels(self):
+        return self.a.labels()
+
+    def __compute__(self, analyzer):
+        a, sa = self.a.evaluate(analyzer)
+        return a[:,[self.grp - 1]], sa[:,[self.grp - 1]]
+
+class Sum(Expr):
+    """ The sum over groups of an expression """
+
+    def __init__(self, a, grps = None):
+        self.a = a
+        self.grps = None if grps is None else tuple(grps)
+        self.key = ('sum', a.key, self.grps)
+
+    def labels(self):
+        return self.a.labels()
+
+    def __compute__(self, analyzer):
+        a, sa = self.a.evaluate(analyzer)
+        if self.grps is not None:
+            cols = [g - 1 for g in self.grps]
+            a, sa = a[:,cols], sa[:,cols]
+        return (np.sum(a, axis = 1)[:,np.newaxis],
+                np.sqrt(np.sum(sa**2, axis = 1))[:,np.newaxis])
+
+def store(analyzer, name, expr):
+    """ Evaluates a quantity defined with
+    :meth:`analysis.fom.Analyzer.define` and stores its values and
+    relative errors, in the layout of
+    :meth:`analysis.fom.Analyzer.get_array`, under its name. The Serpent
+    parameters of the expression, and of the quantities it uses, are built
+    in a single traversal of the files first.
+    """
+    analyzer.load(sorted(expr.labels()))
+
+    value, sigma = expr.evaluate(analyzer)
+    error = np.zeros_like(value)
+    nonzero = (value != 0)
+    error[nonzero] = sigma[nonzero]/np.abs(value[nonzero])
+    error.flags.writeable = False
+    analyzer.cache[(name, False)] = value
+    analyzer.cache[(name, True)] = error
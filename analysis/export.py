@@ -0,0 +1,108 @@
+"""
+
+.. module:: export
+     :synopsis: Export of snapshot data to long-format tables and Parquet
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+The data of an :class:`analysis.fom.Analyzer` or
+:class:`analysis.fom.Comparator` is exported as a long-format
+:class:`pandas.DataFrame` with one row per data set, file, parameter and
+group. The columns are built directly from the arrays stored by each
+:class:`analysis.fom.Analyzer`, by flattening, repeating and tiling them,
+with no loop over files or groups. Writing Parquet files requires
+`pyarrow`.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['threshold', 'file', 'cycle', 'cpu', 'label', 'group', 'value',
+           'error', 'fom']
+
+def to_frame(analyzer, labels):
+    """ Returns the data of an :class:`analysis.fom.Analyzer` as a
+    long-format table.
+
+    :param analyzer: data set to be exported.
+    :type analyzer: :class:`analysis.fom.Analyzer`
+
+    :param labels: Serpent 2 output parameter(s)
+    :type labels: string or list(string)
+
+    :returns: table with the columns `threshold` (the data set name), \
+              `file`, `cycle`, `cpu`, `label`, `group` (or flattened matrix \
+              entry, starting at 1), `value`, `error` and `fom`. For an \
+              :class:`analysis.fom.ReplicaAnalyzer`, `file` lists the \
+              replicas of each snapshot, separated by `;`.
+    :rtype: :class:`pandas.DataFrame`
+    """
+    if type(labels) is not list:
+        labels = [labels]
+
+    files = __row_files__(analyzer)
+    frames = []
+    for label in labels:
+        values = analyzer.get_array(label)
+        n, k = np.shape(values)
+        frames.append(pd.DataFrame({
+            'threshold' : np.repeat(analyzer.name, n*k),
+            'file' : np.repeat(files, k),
+            'cycle' : np.repeat(analyzer.get_x(cycle = True), k),
+            'cpu' : np.repeat(analyzer.get_x(cycle = False), k),
+            'label' : np.repeat(label, n*k),
+            'group' : np.tile(np.arange(1, k + 1), n),
+            'value' : values.ravel(),
+            'error' : analyzer.get_array(label, err = True).ravel(),
+            'fom' : analyzer.get_fom_array(label).ravel()},
+            columns = COLUMNS))
+    return pd.concat(frames, ignore_index = True)
+
+def __row_files__(analyzer):
+    # File(s) of each row of the arrays of the analyzer
+    files = analyzer.get_filenames()
+    starts = getattr(analyzer, 'starts', None)
+    if starts is not None:
+        # Rows of a ReplicaAnalyzer combine the replicas of a snapshot
+        ends = np.append(starts[1:], len(files))
+        files = [';'.join(files[s:e]) for s, e in zip(starts, ends)]
+    assert len(files) == analyzer.n, "The files do not match the snapshots"
+    return np.array(files)
+
+def comparator_frame(comparator, labels):
+    """ Returns the data of every data set of an
+    :class:`analysis.fom.Comparator` as one long-format table, see
+    :func:`to_frame`.
+
+    :rtype: :class:`pandas.DataFrame`
+    """
+    return pd.concat([to_frame(d, labels) for d in comparator.data],
+                     ignore_index = True)
+
+def to_parquet(comparator, labels, path, partition_cols = None):
+    """ Writes the data of every data set of an
+    :class:`analysis.fom.Comparator` to a Parquet dataset, partitioned into
+    one directory per value of the `partition_cols`.
+
+    :param comparator: data sets to be exported.
+    :type comparator: :class:`analysis.fom.Comparator`
+
+    :param labels: Serpent 2 output parameter(s)
+    :type labels: string or list(string)
+
+    :param path: root directory of the dataset.
+    :type path: string
+
+    :param partition_cols: columns used to partition the dataset, \
+                           `threshold` and `label` by default.
+    :type partition_cols: list(string), optional
+    """
+    if partition_cols is None:
+        partition_cols = ['threshold', 'label']
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError('Writing Parquet files requires pyarrow')
+    comparator_frame(comparator, labels).to_parquet(
+        path, engine = 'pyarrow', partition_cols = partition_cols)
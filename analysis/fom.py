@@ -11,15 +11,23 @@ import numpy as np
 import matplotlib.pyplot as plt
 import os, sys
 import math
+import pickle
 import pandas as pd
+from collections import OrderedDict
 import core
+import decimate
+import derived
+import memory
+
+# Number of new files appended to the checkpoint between flushes
+CHECKPOINT_EVERY = 100
 
 class Analyzer():
     """ An object containing multiple :class:`analysis.core.DataFile`
     objects with methods to analyze FOM convergence properties. All
-    `res.m` files in a directory will be ingested when initialized,
+    `res.m` files (any `.m` file except detector files) in a directory will be ingested when initialized,
     the intention is that each of these represents the same simulation
-    at different cycle values.
+    at different cycle values. Files are kept sorted by cycle number.
 
     :param location: folder where the Serpent output files are located
     :type location: string
@@ -30,27 +38,389 @@ class Analyzer():
     :param verb: if True, prints the name of the files uploaded
     :type verb: bool
 
+    :param compact: if True, files are stored as \
+                    :class:`analysis.core.CompactDataFile` objects, \
+                    otherwise as :class:`analysis.core.DataFile` objects.
+    :type compact: bool
+
+    :param dtype: storage type for values and errors when `compact` \
+                  is True, see :class:`analysis.core.CompactDataFile` \
+                  for the effect of single precision on the FOM.
+    :type dtype: :any:`numpy.dtype`
+
+    :param budget: memory budget for the arrays built by :meth:`get_array`. \
+                   If None (default), they are all kept in memory. \
+                   Otherwise the values and errors of a parameter are \
+                   built together and the parameter is released from the \
+                   files, so the budget holds the only copy.
+    :type budget: :class:`analysis.memory.Budget`, optional
+
+    :param strict: if False (default), files that cannot be read, such as \
+                   files still being written, are skipped and listed in \
+                   `skipped` with the reason, and read again by \
+                   :meth:`refresh`. If True, the error is raised.
+    :type strict: bool
+
+    :param checkpoint: file the uploaded files are saved to as the upload \
+                       progresses. If it exists, the files it holds are \
+                       used instead of being read again, unless they have \
+                       changed since.
+    :type checkpoint: string, optional
 
     """
 
-    def __init__(self, location, name = "", verb = False):
+    def __init__(self, location, name = "", verb = False, compact = False,
+                 dtype = np.float32, budget = None, strict = False,
+                 checkpoint = None):
         self.name = name
+        self.budget = budget
+        self.strict = strict
+        self.checkpoint = checkpoint
+        self.skipped = {}
+        self.expressions = {}
+        # Arrays of parameters released from the files, and their rows
+        self.released = {}
+        self.rows = []
         # Verify file location exists
         abs_location = os.path.abspath(os.path.expanduser(location))
         assert os.path.exists(abs_location), "Folder does not exist"
 
         # Initialize data array
+        self.location = abs_location
         self.data = []
+        self.compact = compact
+        self.dtype = dtype
+        if checkpoint is not None:
+            self.__resume__()
         
         # Get all .m files
-        for file_name in os.listdir(abs_location):
-            if file_name[-2:] == '.m':
-                if verb: print "Uploading: " + file_name
-                file_loc = abs_location + '/' + file_name
-                self.data.append(core.DataFile(file_loc))
+        self.__upload__(verb)
+        self.__reindex__()
+        print "Uploaded " + str(len(self.data)) + " files."
+        if self.skipped:
+            print "Skipped " + str(len(self.skipped)) + " files, see skipped."
+
+    def refresh(self, verb = False):
+        """ Uploads the files added to the folder since the last upload, such
+        as new snapshots of a running simulation. Stored arrays are rebuilt on
+        the next request.
+
+        :param verb: if True, prints the name of the files uploaded
+        :type verb: bool
 
+        :returns: the number of new files.
+        :rtype: int
+        """
+        before = len(self.data)
+        new = self.__upload__(verb)
+        if new or len(self.data) != before + new:
+            self.__reindex__()
+        return new
+
+    def __upload__(self, verb):
+        self.__drop__(max([len(d.get_labels()) for d in self.data] or [0]))
+        loaded = set(self.get_filenames())
+        new = 0
+        stream = None
+        if self.checkpoint is not None:
+            stream = open(self.checkpoint, 'ab')
+        try:
+            for file_name in sorted(os.listdir(self.location)):
+                file_loc = self.location + '/' + file_name
+                if self.__accept__(file_name) and file_loc not in loaded:
+                    if verb: print "Uploading: " + file_name
+                    try:
+                        data_file = self.__check__(self.__read__(file_loc))
+                    except Exception as e:
+                        if self.strict:
+                            raise
+                        self.skipped[file_loc] = type(e).__name__ + ': ' + str(e)
+                        if verb: print "Skipped: " + file_name
+                        continue
+                    self.data.append(data_file)
+                    self.skipped.pop(file_loc, None)
+                    new += 1
+                    if stream is not None:
+                        # Only the new file is appended to the checkpoint
+                        pickle.dump((self.__stat__(file_loc), data_file), stream,
+                                    pickle.HIGHEST_PROTOCOL)
+                        if new % CHECKPOINT_EVERY == 0:
+                            stream.flush()
+        finally:
+            if stream is not None:
+                stream.close()
+        return new
+
+    def __check__(self, data_file):
+        # A file cut at the end of a line misses the last parameters, files
+        # read before one with more parameters are dropped
+        n_labels = len(data_file.get_labels())
+        if self.data:
+            missing = self.n_labels - n_labels
+            assert missing <= 0, "File is incomplete, " + str(missing) + \
+                " parameters are missing"
+        self.__drop__(n_labels)
+        return data_file
+
+    def __drop__(self, n_labels):
+        self.n_labels = n_labels
+        incomplete = [d for d in self.data if len(d.get_labels()) < n_labels]
+        if not incomplete:
+            return
+        if self.strict:
+            raise AssertionError("File is incomplete: " + incomplete[0].get_filename())
+        for d in incomplete:
+            missing = n_labels - len(d.get_labels())
+            self.skipped[d.get_filename()] = "AssertionError: File is incomplete, " + \
+                str(missing) + " parameters are missing"
+        self.data = [d for d in self.data if len(d.get_labels()) >= n_labels]
+
+    def __resume__(self):
+        # Keep the saved files that have not changed since, the last record
+        # of a file replaces the earlier ones
+        records, complete = self.__records__()
+        kept = OrderedDict()
+        for stat, d in records:
+            if self.__stat__(d.get_filename()) == stat:
+                kept[d.get_filename()] = (stat, d)
+            else:
+                kept.pop(d.get_filename(), None)
+        self.data = [d for stat, d in kept.values()]
+        if not complete or len(kept) < len(records):
+            self.__save__(kept.values())
+
+    def __records__(self):
+        # The checkpoint holds its folder then one (stat, file) record per
+        # uploaded file. Returns the readable records, and whether every
+        # byte of the checkpoint was read.
+        if not os.path.exists(self.checkpoint):
+            return [], False
+        records = []
+        end = 0
+        with open(self.checkpoint, 'rb') as f:
+            try:
+                if pickle.load(f) != {'location' : self.location}:
+                    return [], False
+                end = f.tell()
+                while True:
+                    records.append(pickle.load(f))
+                    end = f.tell()
+            except Exception:
+                # End of the file, or a record cut by an interrupted upload
+                pass
+        return records, end == os.path.getsize(self.checkpoint)
+
+    def __save__(self, records):
+        # Written to a temporary file first so the checkpoint is never partial
+        tmp = self.checkpoint + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump({'location' : self.location}, f, pickle.HIGHEST_PROTOCOL)
+            for record in records:
+                pickle.dump(record, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, self.checkpoint)
+
+    def __stat__(self, file_name):
+        try:
+            st = os.stat(file_name)
+            return (st.st_size, st.st_mtime)
+        except OSError:
+            return None
+
+    def __reindex__(self):
+        # Sort by cycle number and store the cycle and cpu vectors
+        self.data.sort(key = lambda d: d.cycles)
+        self.cycles = np.array([d.cycles for d in self.data], dtype = float)
+        self.cpu = np.array([d.get_cpu() for d in self.data], dtype = float)
+        if self.budget is None:
+            self.cache = {}
+        else:
+            if not hasattr(self, 'cache'):
+                self.cache = self.budget.cache(self.name)
+            self.__merge__()
         self.n = len(self.data)
-        print "Uploaded " + str(len(self.data)) + " files."
+
+    def __merge__(self):
+        # Arrays of released parameters are the only copy of their rows, so
+        # they are rebuilt in the new order of the files, with the rows of
+        # the new files read from them. Other arrays are built again.
+        position = dict((f, i) for i, f in enumerate(self.rows))
+        for key in self.cache.keys():
+            if key not in self.released:
+                del self.cache[key]
+        merged = []
+        for key, (label, err) in sorted(self.released.items()):
+            if key not in self.cache or not self.data:
+                # Removed with the budget, read again when requested
+                self.released.pop(key)
+                if key in self.cache:
+                    del self.cache[key]
+                continue
+            old = self.cache[key]
+            rows = [old[position[d.get_filename()]]
+                    if d.get_filename() in position
+                    else d.get_data(label, err = err)[0] for d in self.data]
+            merged.append((key, np.vstack(rows).astype(float)))
+        self.__release__(merged)
+        self.rows = self.get_filenames()
+
+    def __accept__(self, file_name):
+        # Result files only, detector files are read by DetectorAnalyzer
+        return file_name[-2:] == '.m' and not core.is_det_file(file_name)
+
+    def __read__(self, file_loc):
+        if self.compact:
+            return core.CompactDataFile(file_loc, self.dtype)
+        else:
+            return core.DataFile(file_loc)
+
+    def get_x(self, cycle = True):
+        """ Returns the cycle numbers or the CPU times of all files, sorted
+        by cycle number.
+
+        :param cycle: If True (default), returns cycle numbers, otherwise \
+                      CPU times.
+        :type cycle: bool
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        if cycle:
+            return self.cycles
+        else:
+            return self.cpu
+
+    def get_array(self, label, err = False):
+        """ Returns the values or errors of a Serpent parameter for all
+        files, one row per file sorted by cycle number and one column per
+        group or matrix entry. The array is built once per parameter and
+        kept for later calls, in double precision.
+
+        :param label: Serpent 2 output parameter
+        :type label: string
+
+        :param err: If True, returns the errors, otherwise the values.
+        :type err: bool
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        key = (label, bool(err))
+        if key not in self.cache:
+            if label in self.expressions:
+                derived.store(self, label, self.expressions[label])
+            else:
+                self.__traverse__([(key, label, bool(err))])
+        return self.cache[key]
+
+    def define(self, name, expr):
+        """ Defines a derived quantity, which can then be used as a
+        Serpent parameter by every method, see :mod:`analysis.derived`. It
+        is evaluated when first requested.
+
+        :param name: name of the quantity.
+        :type name: string
+
+        :param expr: expression of Serpent parameters.
+        :type expr: :class:`analysis.derived.Expr`
+        """
+        self.expressions[name] = expr
+        # Quantities using a previous definition are evaluated again
+        for key in list(self.cache.keys()):
+            if key[0] in self.expressions or \
+               (isinstance(key[0], tuple) and key[0][0] == 'derived'):
+                del self.cache[key]
+
+    def load(self, labels):
+        """ Builds the values and errors of several Serpent parameters, see
+        :meth:`get_array`, in a single traversal of the files. Parameters
+        that are already built are skipped.
+
+        :param labels: Serpent 2 output parameters, or quantities defined \
+                       with :meth:`define`.
+        :type labels: list(string)
+        """
+        params, names = self.__split__(labels)
+        self.__traverse__([((label, err), label, err) for label in params
+                           for err in [False, True]])
+        self.__store__(names)
+
+    def __split__(self, labels):
+        # Serpent parameters to read, including those of derived quantities
+        params, names, todo = set(), [], list(labels)
+        while todo:
+            label = todo.pop()
+            if label not in self.expressions:
+                params.add(label)
+            elif label not in names:
+                names.append(label)
+                todo.extend(self.expressions[label].labels())
+        return sorted(params), names
+
+    def __store__(self, names):
+        for name in names:
+            if (name, False) not in self.cache:
+                derived.store(self, name, self.expressions[name])
+
+    def __traverse__(self, keys):
+        # Stack the rows of every missing (cache key, label, err) at once
+        if self.budget is not None:
+            # Values and errors are built together, so that the parameter
+            # can be released from the files
+            keys = keys + [(key[:-1] + (not err,), label, not err)
+                           for key, label, err in keys]
+        keys = [k for i, k in enumerate(keys)
+                if k[0] not in self.cache and k not in keys[:i]]
+        if not keys:
+            return
+        rows = [[] for k in keys]
+        for d in self.data:
+            if self.budget is not None and \
+               any(d.is_released(label) for key, label, err in keys):
+                # Removed from memory, after the budget was closed
+                d = self.__read__(d.get_filename())
+            for i, (key, label, err) in enumerate(keys):
+                rows[i].append(d.get_data(label, err = err)[0])
+        arrays = [(key, np.vstack(rows[i]).astype(float))
+                  for i, (key, label, err) in enumerate(keys)]
+        if self.budget is None:
+            for key, array in arrays:
+                array.flags.writeable = False
+                self.cache[key] = array
+        else:
+            self.released.update((key, (label, err)) for key, label, err in keys)
+            self.__release__(arrays)
+
+    def __release__(self, arrays):
+        # Releases the parameters of the arrays from the files, then stores
+        # the arrays with the budget as their only copy
+        labels = set(self.released[key][0] for key, array in arrays)
+        for d in self.data:
+            d.release(labels)
+        self.cache.hold(sum(d.get_nbytes() for d in self.data))
+        for key, array in arrays:
+            array.flags.writeable = False
+            self.cache[key] = array
+
+    def get_fom_array(self, label, cpu = True):
+        """ Returns the FOM of a Serpent parameter for all files, in the
+        layout of :meth:`get_array`. Entries with no error have a FOM of 0.
+
+        :param label: Serpent 2 output parameter
+        :type label: string
+
+        :param cpu: If True (default), calculates FOM using the CPU time, \
+                    otherwise uses cycle number.
+        :type cpu: bool
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        return self.__fom__(np.power(self.get_array(label, err = True), 2),
+                            self.get_x(cycle = not cpu))
+
+    def __fom__(self, err2, time):
+        # FOM from squared errors, one row per file
+        fom = np.zeros_like(err2)
+        nonzero = (err2 != 0)
+        fom[nonzero] = np.power(np.multiply(err2, time[:,np.newaxis])[nonzero], -1)
+        return fom
 
     def get_avg(self, label, grp_entry, n=0):
         """ Returns the average FOM from the last `n` values of the
@@ -106,24 +476,49 @@ class Analyzer():
         :rtype: :class:`numpy.ndarray`
 
         """
-        sum = 0
-        for grp in grps:
-            val = self.__val_vs__(label, grp, cycle, fom = False)
-            if fom:
-                sum += np.power(val[:,1:2],2)
-            else:
-                sum += val[:,1:2]
+        return self.collapse(label, [grps], fom, cycle)
+
+    def collapse(self, label, mapping, fom = True, cycle = True):
+        """ Returns the combined FOM or error for every broad group of a
+        group mapping, for all files at once. The errors of the fine groups
+        in a broad group are summed, or summed in quadrature to calculate
+        the FOM using the CPU time.
+
+        :param label: Serpent 2 output parameter
+        :type label: string
+
+        :param mapping: the fine groups in each broad group, for example \
+        `[range(1, 36), range(36, 71)]` collapses 70 groups into two.
+        :type mapping: list(list(int))
+
+        :param fom: if True (default) returns the FOM, otherwise returns \
+        error.
+        :type fom: bool
 
-        sum = np.hstack((val[:,0:1], sum))
+        :param cycle: if True (default) returns cycle number in the first column, \
+        otherwise returns cpu time.
+        :type cycle: bool
+
+        :returns: an array with cycles/cpu in the first column, and error \
+        or FOM for each broad group in the following columns.
+        :rtype: :class:`numpy.ndarray`
+
+        """
+        errors = self.get_array(label, err = True)
+
+        # Matrix summing the fine groups into broad groups
+        collapse = np.zeros((np.shape(errors)[1], len(mapping)))
+        for j, grps in enumerate(mapping):
+            for grp in grps:
+                collapse[grp - 1, j] = 1
 
         if fom:
-            # Get CPU
-            cpu = self.__val_vs__(label, grp, cycle = False, fom = False)[:,0:1]
-            zeros = (sum[:,1:2] == 0)
-            sum[:,1:2] = np.power(np.multiply(sum[:,1:2], cpu),-1)
-            sum[:,1:2][zeros] = 0
-            
-        return sum
+            data = self.__fom__(np.dot(np.power(errors, 2), collapse),
+                                self.get_x(cycle = False))
+        else:
+            data = np.dot(errors, collapse)
+
+        return np.column_stack((self.get_x(cycle), data))
 
     def get_collapse_avg(self, label, grps, n = 0):
         """ Returns the average FOM from the last _n_ values of the Serpent \
@@ -147,7 +542,8 @@ class Analyzer():
         return np.mean(data[-n:,1])
 
 
-    def get_data(self, label, grp_entry, fom = True, plot = False, cycle = True):
+    def get_data(self, label, grp_entry, fom = True, plot = False, cycle = True,
+                 max_pts = 2000):
         """ Returns the an array with the error and cycle number for
         analysis of error for a given Serpent 2 output parameter
         and group number (if the parameter has multiple groups).
@@ -168,6 +564,11 @@ class Analyzer():
                      the first column. Otherwise, returns the cpu time.
         :type cycle: bool
 
+        :param max_pts: largest number of points plotted per group, see \
+                        :func:`analysis.decimate.minmax`. If None, every \
+                        point is plotted. The returned data is not decimated.
+        :type max_pts: int, optional
+
         :returns: :class:`numpy.array` with the cycles/cpu in the first column \
                   and error in the second column. If multiple groups are passed \
                   They will be horizontally concatenated in this manner (ex: second \
@@ -207,53 +608,77 @@ class Analyzer():
             else:
                 labels = self.__entry_label__(grp_entry)
             
-            ax = self.__plot_me__(data, xlabel, ylabel, title, labels)
+            ax = self.__plot_me__(data, xlabel, ylabel, title, labels, max_pts)
             ax.set_xscale('log')                            
 
             if not fom:
                 ax.set_yscale('log')
         return data                
 
-    def __plot_me__(self, data, xlabel, ylabel, title, labels):
+    def query(self, requests):
+        """ Answers many requests of :meth:`get_data` at once. The
+        parameters of all requests are built in a single traversal of the
+        files, see :meth:`load`.
+
+        :param requests: tuples of Serpent 2 output parameter, group(s) or \
+                         matrix entry(ies), and optionally `fom` and `cycle` \
+                         as in :meth:`get_data` (both True by default), such \
+                         as `('INF_FLX', [1, 2], True, False)`.
+        :type requests: list(tuple)
+
+        :returns: dictionary keyed by `(label, grp_entry, fom, cycle)` with \
+                  one key per group or matrix entry, whose values are the \
+                  arrays returned by :meth:`get_data`.
+        :rtype: dict
+        """
+        keys = self.__requests__(requests)
+        self.load(sorted(set(k[0] for k in keys)))
+        return dict((k, self.get_data(k[0], k[1], fom = k[2], cycle = k[3]))
+                    for k in keys)
+
+    def __requests__(self, requests):
+        # One (label, grp_entry, fom, cycle) tuple per group or entry
+        keys = []
+        for request in requests:
+            label, entries = request[0], request[1]
+            fom = request[2] if len(request) > 2 else True
+            cycle = request[3] if len(request) > 3 else True
+            if type(entries) is not list:
+                entries = [entries]
+            keys.extend([(label, e, bool(fom), bool(cycle)) for e in entries])
+        return keys
+
+    def __plot_me__(self, data, xlabel, ylabel, title, labels, max_pts = 2000):
         colors = self.__plot_setup__(xlabel, ylabel, title)
-        
-        for i in range(1,np.shape(data)[1]):
-            plt.plot(data[:,0], data[:,i], '.', color = colors[i-1], label=labels[i-1])
-        plt.legend(loc = 'best')
-        return plt.gca()
+
+        n = np.shape(data)[1] - 1
+        series = [(data[:,0], data[:,i]) for i in range(1, n + 1)]
+        return decimate.scatter(series, colors[:n], labels, max_pts)
         
 
     def __val_vs__(self, label, grp = 1, cycle = True, fom = True):
         # Cast into a list if an integer is passed
         if type(grp) is not list:
             grp = [grp]
-        
-        ans = np.zeros((len(self.data), 1+len(grp)))
-        for j, g in enumerate(grp):
-            for i, d in enumerate(self.data):
-            
-                if fom:
-                    ans[i,j+1] = d.get_fom(label)[0][g-1]
-                else:
-                    ans[i,j+1] = d.get_data(label, err = True)[0][g-1]
-                
-                if cycle:
-                    ans[i,0] = d.get_data('CYCLE_IDX')[0][0]
-                else:
-                    ans[i,0] = d.get_cpu()
 
-        return ans
+        if fom:
+            data = self.get_fom_array(label)
+        else:
+            data = self.get_array(label, err = True)
+
+        cols = [g - 1 for g in grp]
+        return np.column_stack((self.get_x(cycle), data[:,cols]))
 
     def __mat_vs__(self, label, entry, cycle = True, fom = True):
 
         if type(entry) is not list:
             entry = [entry]
         
-        # Get size of the matrix from the first entry
-        n = np.shape(self.data[0].get_data(label, err = True,
-                                               reshape = True))[0]
+        # Get size of the matrix from the number of entries
+        n = np.sqrt(np.shape(self.get_array(label, err = True))[1])
         
-        assert n != 1, "Reshape failed, invalid Serpent matrix parameter"
+        assert n.is_integer() and n != 1, "Reshape failed, invalid Serpent matrix parameter"
+        n = int(n)
 
         loc = []
         for e in entry:
@@ -325,11 +750,59 @@ class Comparator:
     :param verb: When True, shows all filenames as they are uploaded, \
                  useful to ensure initialization doesn't hang.
     :type verb: bool
+
+    :param compact: When True, uses the compact storage of \
+                    :class:`analysis.core.CompactDataFile` for every data set.
+    :type compact: bool
+
+    :param dtype: storage type for values and errors when `compact` is True.
+    :type dtype: :any:`numpy.dtype`
+
+    :param budget: memory budget shared by the arrays of every data set, \
+                   or its size in bytes. If None (default), all arrays are \
+                   kept in memory.
+    :type budget: :class:`analysis.memory.Budget` or int, optional
+
+    :param strict: if True, files that cannot be read raise an error \
+                   instead of being skipped, see :class:`Analyzer`.
+    :type strict: bool
+
+    :param checkpoint: folder holding one checkpoint file per data set, \
+                       named after the data set, see :class:`Analyzer`.
+    :type checkpoint: string, optional
     """
     
-    def __init__(self, dirs, names, verb = False):
+    def __init__(self, dirs, names, verb = False, compact = False,
+                 dtype = np.float32, budget = None, strict = False,
+                 checkpoint = None):
         assert len(dirs) == len(names), "Number of directories and names must match"
-        self.data = [Analyzer(dir, names[i], verb) for i, dir in enumerate(dirs)]
+        self.compact = compact
+        self.dtype = dtype
+        if budget is not None and not isinstance(budget, memory.Budget):
+            budget = memory.Budget(budget)
+        self.budget = budget
+        self.strict = strict
+        self.checkpoint = checkpoint
+        if checkpoint is not None and not os.path.isdir(checkpoint):
+            os.makedirs(checkpoint)
+        self.data = [self.__analyzer__(dir, names[i], verb)
+                     for i, dir in enumerate(dirs)]
+
+    def close(self):
+        """ Removes the arrays stored with the memory budget of the data
+        sets, and its scratch folder if it is temporary, see
+        :meth:`analysis.memory.Budget.close`. Arrays are built again when
+        requested.
+        """
+        if self.budget is not None:
+            self.budget.close()
+
+    def __analyzer__(self, dir, name, verb):
+        checkpoint = None
+        if self.checkpoint is not None:
+            checkpoint = os.path.join(self.checkpoint, str(name) + '.pkl')
+        return Analyzer(dir, name, verb, self.compact, self.dtype, self.budget,
+                        self.strict, checkpoint)
 
     def add(self,dir,name, verb = False):
         """ Add a new data set to the comparator
@@ -344,8 +817,20 @@ class Comparator:
                  useful to ensure initialization doesn't hang.
         :type verb: bool        
         """
-        self.data.append(Analyzer(dir,name,verb))
+        self.data.append(self.__analyzer__(dir, name, verb))
         
+    def get(self, name):
+        """ Returns the data set with the given name.
+
+        :param name: name of the data set, compared as a string.
+        :type name: string or float
+
+        :rtype: :class:`Analyzer`
+        """
+        names = [d.name for d in self.data]
+        assert str(name) in names, "No data set named " + str(name)
+        return self.data[names.index(str(name))]
+
     def ratio(self, label, grp, n_pts):
         """ Returns an array with the ratio of the average FOM for the
         parameter in label compared to the first analyzer in the data
@@ -363,6 +848,67 @@ class Comparator:
 
         return names, data, error
 
+    def define(self, name, expr):
+        """ Defines a derived quantity for every data set, see
+        :meth:`Analyzer.define`.
+
+        :param name: name of the quantity.
+        :type name: string
+
+        :param expr: expression of Serpent parameters.
+        :type expr: :class:`analysis.derived.Expr`
+        """
+        for d in self.data:
+            d.define(name, expr)
+
+    def query(self, requests):
+        """ Answers many requests of :meth:`Analyzer.get_data` for every
+        data set, see :meth:`Analyzer.query`.
+
+        :param requests: tuples of Serpent 2 output parameter, group(s) or \
+                         matrix entry(ies), and optionally `fom` and `cycle`.
+        :type requests: list(tuple)
+
+        :returns: dictionary keyed by data set name of the answers of \
+                  :meth:`Analyzer.query`.
+        :rtype: dict
+        """
+        return dict((d.name, d.query(requests)) for d in self.data)
+
+    def summary(self, requests, n_pts = 0):
+        """ Returns the average FOM (:meth:`Analyzer.get_avg`), its
+        variance (:meth:`Analyzer.get_var`) and its ratio to the first data
+        set for many parameters and groups, building the parameters of each
+        data set in a single traversal of its files.
+
+        :param requests: pairs of Serpent 2 output parameter and group(s) \
+                         or matrix entry(ies).
+        :type requests: list(tuple)
+
+        :param n_pts: The number of points used for the average.
+        :type n_pts: int
+
+        :returns: table with the columns `name`, `label`, `entry`, `avg`, \
+                  `var` and `ratio`, one row per data set and group.
+        :rtype: :class:`pandas.DataFrame`
+        """
+        rows = []
+        base = {}
+        for d in self.data:
+            keys = d.__requests__(requests)
+            d.load(sorted(set(k[0] for k in keys)))
+            for label, entry, fom, cycle in keys:
+                avg = d.get_avg(label, entry, n_pts)
+                if type(entry) is int:
+                    var = d.get_var(label, entry)
+                else:
+                    var = np.nan
+                base.setdefault((label, entry), avg)
+                ratio = avg/base[(label, entry)] if base[(label, entry)] != 0 else np.nan
+                rows.append((d.name, label, entry, avg, var, ratio))
+        return pd.DataFrame(rows, columns = ['name', 'label', 'entry', 'avg',
+                                             'var', 'ratio'])
+
     def collapse_ratio(self, label, grps, n_pts):
         """ Returns an array with the ratio of the average FOM for the
         parameter in label compared to the first analyzer in the data
@@ -388,7 +934,8 @@ class Comparator:
         return names,data
             
 
-    def plot(self, label, grp_entry, cycle = True, fom = True, show_avg=False, avg_n=100):
+    def plot(self, label, grp_entry, cycle = True, fom = True, show_avg=False, avg_n=100,
+             max_pts = 2000):
         """ Plots the given Serpent 2 output parameter for the specified groups
         for both sets of data.
 
@@ -412,6 +959,11 @@ class Comparator:
 
         param avg_n: The number of points used to calculate the average
         :type avg_n: int
+
+        :param max_pts: largest number of points plotted per series, see \
+                        :func:`analysis.decimate.minmax`. If None, every \
+                        point is plotted.
+        :type max_pts: int, optional
         
         """
 
@@ -439,7 +991,7 @@ class Comparator:
         else:
             labels = self.__entry_label__(grp_entry)
             
-        ax = self.__multi_plot__(data_sets, xlabel, ylabel, title, labels)
+        ax = self.__multi_plot__(data_sets, xlabel, ylabel, title, labels, max_pts)
 
         ax.set_xscale('log')
 
@@ -447,23 +999,24 @@ class Comparator:
             ax.set_yscale('log')
             
 
-    def __multi_plot__(self, data_sets, xlabel, ylabel, title, labels):
+    def __multi_plot__(self, data_sets, xlabel, ylabel, title, labels, max_pts = 2000):
         colors = self.__plot_setup__(xlabel, ylabel, title)
-        
+
+        series, plot_colors, plot_labels = [], [], []
         for i in range(0,len(data_sets)):
             to_plot = data_sets[i]
             if i == 0:
                 plot_color = colors[1]
                 
             for j in range(1,np.shape(to_plot)[1]):
-                plt.plot(to_plot[:,0], to_plot[:,j], '.', color =
-                         plot_color[i*j + j - 1], label=labels[j-1] +
-                         " (" + self.data[i].name + ")")
+                series.append((to_plot[:,0], to_plot[:,j]))
+                plot_colors.append(plot_color[i*j + j - 1])
+                plot_labels.append(labels[j-1] + " (" + self.data[i].name + ")")
                 
             plot_color = colors[0]
-        plt.legend(loc = 'best', markerscale = 2.0)
-        
-        return plt.gca()
+
+        return decimate.scatter(series, plot_colors, plot_labels, max_pts,
+                                markerscale = 2.0)
 
     def __plot_setup__(self,xlabel,ylabel, title):
         self.base_color = ([0.0,107.0/255,164.0/255])
@@ -508,3 +1061,263 @@ class Comparator:
             return ["Entry " + str(entry)]
         else:
             return ["Entry " + str(e) for e in entry]
+
+
+class DetectorAnalyzer(Analyzer):
+    """ An :class:`Analyzer` for the detector output files (`_det.m`) in a
+    directory, stored as :class:`analysis.core.DetectorFile` objects. Every
+    method of :class:`Analyzer` is available, with the detector name (without
+    the `DET` prefix) as the label and the detector bins as the groups.
+
+    :param location: folder where the Serpent output files are located
+    :type location: string
+
+    :param name: desired name for this data set
+    :type name: string, optional
+    
+    :param verb: if True, prints the name of the files uploaded
+    :type verb: bool
+
+    :param detectors: detectors to be ingested. If None (default), all \
+                      detectors are ingested.
+    :type detectors: list(string), optional
+    """
+
+    def __init__(self, location, name = "", verb = False, detectors = None):
+        self.detectors = detectors
+        Analyzer.__init__(self, location, name, verb)
+
+    def __accept__(self, file_name):
+        return core.is_det_file(file_name)
+
+    def __read__(self, file_loc):
+        return core.DetectorFile(file_loc, self.detectors)
+
+    def get_bins(self, name):
+        """ Returns the bin indices of a detector, see \
+        :meth:`analysis.core.DetectorFile.get_bins`.
+        """
+        return self.data[0].get_bins(name)
+
+class DetectorComparator(Comparator):
+    """ A :class:`Comparator` of :class:`DetectorAnalyzer` objects.
+
+    :param dirs: list of strings with the location of the data sets.
+    :type dirs: list(string)
+
+    :param names: list of strings that are the chosen names for the data sets
+    :type names: list(string)
+
+    :param verb: When True, shows all filenames as they are uploaded.
+    :type verb: bool
+
+    :param detectors: detectors to be ingested. If None (default), all \
+                      detectors are ingested.
+    :type detectors: list(string), optional
+    """
+
+    def __init__(self, dirs, names, verb = False, detectors = None):
+        assert len(dirs) == len(names), "Number of directories and names must match"
+        self.detectors = detectors
+        self.data = [DetectorAnalyzer(dir, names[i], verb, detectors)
+                     for i, dir in enumerate(dirs)]
+
+    def add(self, dir, name, verb = False):
+        """ Add a new data set to the comparator
+
+        :param dir: location of the new data set.
+        :type dir: string
+
+        :param name: name for the new data set.
+        :type name: string
+        """
+        self.data.append(DetectorAnalyzer(dir, name, verb, self.detectors))
+
+class ReplicaAnalyzer(Analyzer):
+    """ An :class:`Analyzer` for independent replicas of one simulation
+    run with different seeds, such as the files of a `runs/` folder.
+    Files with the same cycle number are replicas of the same snapshot.
+    The values of the replicas of a snapshot are combined with inverse
+    variance weighting, and their CPU times and cycle numbers are summed,
+    so that the FOM of the combined snapshot accounts for the work of
+    every replica. Replicas without an error do not contribute to a
+    value, unless none of the replicas of the snapshot has one.
+
+    Every method of :class:`Analyzer` returns the combined snapshots, and
+    :meth:`get_spread` returns the spread of the replicas.
+
+    :param location: folder where the Serpent output files are located
+    :type location: string
+
+    :param name: desired name for this data set
+    :type name: string, optional
+    
+    :param verb: if True, prints the name of the files uploaded
+    :type verb: bool
+
+    :param compact: if True, files are stored as \
+                    :class:`analysis.core.CompactDataFile` objects.
+    :type compact: bool
+
+    :param dtype: storage type for values and errors when `compact` is True.
+    :type dtype: :any:`numpy.dtype`
+    """
+
+    def __reindex__(self):
+        # Replicas of a snapshot are stored next to each other
+        Analyzer.__reindex__(self)
+        cycles = self.cycles
+        self.starts = np.flatnonzero(np.diff(np.concatenate(([-np.inf], cycles))))
+        self.snapshots = cycles[self.starts]
+        self.replicas = np.diff(np.append(self.starts, len(cycles)))
+        self.file_cpu = self.cpu
+        self.cycles = np.add.reduceat(cycles, self.starts) if len(cycles) else cycles
+        self.cpu = np.add.reduceat(self.cpu, self.starts) if len(cycles) else self.cpu
+        self.n = len(self.starts)
+
+    def get_file_array(self, label, err = False):
+        """ Returns the values or errors of a Serpent parameter for every
+        replica, one row per file sorted by cycle number, see
+        :meth:`Analyzer.get_array`.
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        key = ('file', label, bool(err))
+        if key not in self.cache:
+            self.__traverse__([(key, label, bool(err))])
+        return self.cache[key]
+
+    def load(self, labels):
+        """ Builds the values and errors of several Serpent parameters for
+        every replica in a single traversal of the files, see
+        :meth:`Analyzer.load`.
+        """
+        params, names = self.__split__(labels)
+        self.__traverse__([(('file', label, err), label, err) for label in params
+                           for err in [False, True]])
+        self.__store__(names)
+
+    def get_array(self, label, err = False):
+        """ Returns the combined values or relative errors of a Serpent
+        parameter, one row per snapshot and one column per group or
+        matrix entry.
+
+        :param label: Serpent 2 output parameter
+        :type label: string
+
+        :param err: If True, returns the errors, otherwise the values.
+        :type err: bool
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        key = (label, bool(err))
+        if key not in self.cache and label in self.expressions:
+            derived.store(self, label, self.expressions[label])
+        if key not in self.cache:
+            values, errors = self.__combine__(self.get_file_array(label),
+                                              self.get_file_array(label, err = True))
+            values.flags.writeable = False
+            errors.flags.writeable = False
+            self.cache[(label, False)] = values
+            self.cache[(label, True)] = errors
+        return self.cache[key]
+
+    def __combine__(self, values, errors):
+        # Inverse variance weighted mean of the replicas of each snapshot
+        sigma = np.abs(values*errors)
+        weights = np.zeros_like(sigma)
+        measured = (sigma != 0)
+        weights[measured] = np.power(sigma[measured], -2)
+
+        total = np.add.reduceat(weights, self.starts)
+        mean = np.add.reduceat(values, self.starts)/self.replicas[:,np.newaxis]
+        combined = np.add.reduceat(weights*values, self.starts)
+        weighted = (total != 0)
+        mean[weighted] = combined[weighted]/total[weighted]
+
+        error = np.zeros_like(mean)
+        known = weighted & (mean != 0)
+        error[known] = np.power(total[known], -0.5)/np.abs(mean[known])
+        return mean, error
+
+    def get_spread(self, label, fom = True, cpu = True):
+        """ Returns the standard deviation over the replicas of each
+        snapshot of the FOM or value of a Serpent parameter. Snapshots with
+        a single replica have a spread of `nan`.
+
+        :param label: Serpent 2 output parameter
+        :type label: string
+
+        :param fom: If True (default), returns the spread of the FOM of \
+                    each replica, otherwise of its value.
+        :type fom: bool
+
+        :param cpu: If True (default), the FOM is calculated using the CPU \
+                    time, otherwise the cycle number.
+        :type cpu: bool
+
+        :returns: array with one row per snapshot and one column per group.
+        :rtype: :class:`numpy.ndarray`
+        """
+        if fom:
+            time = self.file_cpu if cpu else np.repeat(self.snapshots, self.replicas)
+            data = self.__fom__(np.power(self.get_file_array(label, err = True), 2),
+                                time)
+        else:
+            data = self.get_file_array(label)
+
+        m = self.replicas[:,np.newaxis].astype(float)
+        mean = np.add.reduceat(data, self.starts)/m
+        square = np.add.reduceat(np.power(data, 2), self.starts)/m
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            var = np.maximum(square - mean**2, 0)*m/(m - 1)
+        var[self.replicas == 1] = np.nan
+        return np.sqrt(var)
+
+class ReplicaComparator(Comparator):
+    """ A :class:`Comparator` of :class:`ReplicaAnalyzer` objects, one per
+    folder of replicas.
+
+    :param dirs: list of strings with the location of the data sets.
+    :type dirs: list(string)
+
+    :param names: list of strings that are the chosen names for the data sets
+    :type names: list(string)
+
+    :param verb: When True, shows all filenames as they are uploaded.
+    :type verb: bool
+
+    :param compact: When True, uses the compact storage of \
+                    :class:`analysis.core.CompactDataFile` for every data set.
+    :type compact: bool
+
+    :param dtype: storage type for values and errors when `compact` is True.
+    :type dtype: :any:`numpy.dtype`
+
+    :param budget: memory budget shared by the arrays of every data set, \
+                   or its size in bytes, see :class:`Comparator`.
+    :type budget: :class:`analysis.memory.Budget` or int, optional
+    """
+
+    def __init__(self, dirs, names, verb = False, compact = False,
+                 dtype = np.float32, budget = None):
+        assert len(dirs) == len(names), "Number of directories and names must match"
+        self.compact = compact
+        self.dtype = dtype
+        if budget is not None and not isinstance(budget, memory.Budget):
+            budget = memory.Budget(budget)
+        self.budget = budget
+        self.data = [ReplicaAnalyzer(dir, names[i], verb, compact, dtype, budget)
+                     for i, dir in enumerate(dirs)]
+
+    def add(self, dir, name, verb = False):
+        """ Add a new data set to the comparator
+
+        :param dir: location of the new data set.
+        :type dir: string
+
+        :param name: name for the new data set.
+        :type name: string
+        """
+        self.data.append(ReplicaAnalyzer(dir, name, verb, self.compact, self.dtype,
+                                         self.budget))
@@ -0,0 +1,197 @@
+"""
+
+.. module:: memory
+     :synopsis: Memory budget for the arrays built by Analyzer objects
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+The arrays built by :meth:`analysis.fom.Analyzer.get_array` are kept for
+later calls, so a :class:`analysis.fom.Comparator` over many data sets
+and parameters keeps growing. A :class:`Budget` shared by the data sets
+bounds the memory used by these arrays: when it is exceeded, the least
+recently used arrays are written to a scratch folder and replaced by
+read-only memory maps of the files, which are read back from disk when
+accessed. Analyses then slow down instead of running out of memory.
+
+Once the arrays of a parameter are built, the parameter is released from
+the files (:class:`analysis.core.DataFile` objects), so the arrays are
+the only copy of the data loaded. The bytes still held by the files,
+the parameters that were never requested, are counted by the budget but
+cannot be spilled, see :class:`analysis.core.CompactDataFile` to reduce
+their size.
+
+"""
+
+import numpy as np
+import pandas as pd
+import atexit, os, shutil, tempfile, threading
+from collections import OrderedDict
+
+class Budget(object):
+    """ A memory budget for the arrays of one or more
+    :class:`analysis.fom.Analyzer` objects.
+
+    :param max_bytes: largest number of bytes of arrays kept in memory.
+    :type max_bytes: int
+
+    :param scratch: folder the spilled arrays are written to. If None \
+                    (default), a temporary folder is created and removed \
+                    by :meth:`close`, or when the interpreter exits.
+    :type scratch: string, optional
+    """
+
+    def __init__(self, max_bytes, scratch = None):
+        self.max_bytes = max_bytes
+        self.temporary = scratch is None
+        if scratch is None:
+            scratch = tempfile.mkdtemp(prefix = 'wdt_spill_')
+        elif not os.path.isdir(scratch):
+            os.makedirs(scratch)
+        self.scratch = scratch
+        if self.temporary:
+            atexit.register(self.close)
+        self.entries = OrderedDict()
+        self.held = {}
+        self.resident = 0
+        self.spilled = 0
+        self.count = 0
+        self.n_files = 0
+        self.lock = threading.RLock()
+
+    def cache(self, owner = ""):
+        """ Returns a new cache using this budget, in place of the
+        dictionary of an :class:`analysis.fom.Analyzer`.
+
+        :param owner: name of the data set, used in :meth:`report`.
+        :type owner: string
+
+        :rtype: :class:`BudgetCache`
+        """
+        with self.lock:
+            self.count += 1
+            return BudgetCache(self, self.count, owner)
+
+    def get(self, key):
+        """ Returns a stored array and marks it as the most recently used """
+        with self.lock:
+            entry = self.entries.pop(key)
+            self.entries[key] = entry
+            return entry['array']
+
+    def put(self, key, owner, array):
+        """ Stores an array, spilling the least recently used arrays if the
+        budget is exceeded.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = {'owner' : owner, 'array' : array,
+                                 'bytes' : array.nbytes, 'file' : None}
+            self.resident += array.nbytes
+            self.__enforce__()
+
+    def hold(self, number, owner, nbytes):
+        """ Sets the number of bytes held by the files of a cache, which
+        are resident but cannot be spilled.
+        """
+        with self.lock:
+            self.resident -= self.held.get(number, (owner, 0))[1]
+            self.held[number] = (owner, nbytes)
+            self.resident += nbytes
+            self.__enforce__()
+
+    def remove(self, key):
+        """ Removes a stored array and its scratch file """
+        with self.lock:
+            entry = self.entries.pop(key)
+            if entry['file'] is None:
+                self.resident -= entry['bytes']
+            else:
+                self.spilled -= entry['bytes']
+                entry['array'] = None
+                try:
+                    os.remove(entry['file'])
+                except OSError:
+                    pass
+
+    def report(self):
+        """ Returns the data loaded with this budget: the bytes held by
+        the files of each cache, with the key 'files', then the arrays
+        from least to most recently used.
+
+        :returns: table with the columns `owner`, `key`, `bytes` and \
+                  `spilled`.
+        :rtype: :class:`pandas.DataFrame`
+        """
+        with self.lock:
+            rows = [(owner, 'files', nbytes, False)
+                    for n, (owner, nbytes) in sorted(self.held.items())]
+            rows += [(e['owner'], key[1], e['bytes'], e['file'] is not None)
+                     for key, e in self.entries.items()]
+        return pd.DataFrame(rows, columns = ['owner', 'key', 'bytes', 'spilled'])
+
+    def close(self):
+        """ Removes every stored array, and the scratch folder if it is
+        temporary. Arrays stored afterwards use a new scratch folder.
+        """
+        with self.lock:
+            for key in list(self.entries):
+                self.remove(key)
+            if self.temporary:
+                shutil.rmtree(self.scratch, ignore_errors = True)
+
+    def __enforce__(self):
+        # Spill the least recently used resident arrays
+        for key in list(self.entries):
+            if self.resident <= self.max_bytes:
+                break
+            entry = self.entries[key]
+            if entry['file'] is not None:
+                continue
+            if not os.path.isdir(self.scratch):
+                os.makedirs(self.scratch)
+            self.n_files += 1
+            entry['file'] = os.path.join(self.scratch, str(self.n_files) + '.npy')
+            np.save(entry['file'], entry['array'])
+            entry['array'] = np.load(entry['file'], mmap_mode = 'r')
+            self.resident -= entry['bytes']
+            self.spilled += entry['bytes']
+
+class BudgetCache(object):
+    """ The arrays of one :class:`analysis.fom.Analyzer`, stored with a
+    :class:`Budget`. It is used like a dictionary.
+    """
+
+    def __init__(self, budget, number, owner):
+        self.budget = budget
+        self.number = number
+        self.owner = owner
+
+    def __contains__(self, key):
+        return (self.number, key) in self.budget.entries
+
+    def __getitem__(self, key):
+        return self.budget.get((self.number, key))
+
+    def __setitem__(self, key, array):
+        self.budget.put((self.number, key), self.owner, array)
+
+    def hold(self, nbytes):
+        """ Sets the number of bytes held by the files, see
+        :meth:`Budget.hold`.
+        """
+        self.budget.hold(self.number, self.owner, nbytes)
+
+    def keys(self):
+        """ Returns the keys of the stored arrays """
+        with self.budget.lock:
+            return [k for n, k in self.budget.entries if n == self.number]
+
+    def __delitem__(self, key):
+        self.budget.remove((self.number, key))
+
+    def clear(self):
+        """ Removes the stored arrays from the budget """
+        with self.budget.lock:
+            for key in self.keys():
+                self.budget.remove((self.number, key))
@@ -0,0 +1,172 @@
+"""
+
+.. module:: optimize
+     :synopsis: Search for the WDT threshold maximizing the FOM
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+The data sets of a :class:`analysis.fom.Comparator` are expected to be
+named after their threshold :math:`t_{\\mathrm{wdt}}`. For each requested
+parameter and group, the tail-average FOM (see :mod:`analysis.stats`) is
+normalized by its mean over all thresholds so that quantities of
+different magnitude can be combined with weights. A weighted quadratic
+is fitted to the combined FOM against the threshold, and the thresholds
+to simulate next are placed within the uncertainty of its maximum.
+
+"""
+
+import numpy as np
+import stats
+
+def combined_fom(comparator, requests, weights = None, frac = 0.5):
+    """ Returns the thresholds and the normalized, weighted combined FOM
+    with its standard error.
+
+    :param comparator: data sets named after their thresholds.
+    :type comparator: :class:`analysis.fom.Comparator`
+
+    :param requests: pairs of Serpent 2 output parameter and group.
+    :type requests: list(tuple(string, int))
+
+    :param weights: weight of each request, equal by default.
+    :type weights: list(float), optional
+
+    :param frac: fraction of each series skipped before the tail.
+    :type frac: float
+
+    :returns: the thresholds, combined FOM and its standard error, sorted \
+              by threshold.
+    :rtype: tuple(:class:`numpy.ndarray`)
+    """
+    if weights is None:
+        weights = np.ones(len(requests))
+    weights = np.asarray(weights, dtype = float)
+
+    x = np.array([float(d.name) for d in comparator.data])
+    y = np.zeros((len(requests), len(x)))
+    err = np.zeros_like(y)
+    cache = {}
+    for k, (label, grp) in enumerate(requests):
+        for i, d in enumerate(comparator.data):
+            if (i, label) not in cache:
+                cache[(i, label)] = stats.analyzer_stats(d, label, frac)
+            s = cache[(i, label)]
+            y[k,i] = s['mean'][grp - 1]
+            err[k,i] = s['err'][grp - 1]
+
+    # Normalize each request by its mean over the thresholds
+    norm = np.mean(y, axis = 1)[:,np.newaxis]
+    norm[norm == 0] = 1
+    y = y/norm
+    err = err/norm
+
+    total = np.sum(weights)
+    fom = np.dot(weights, y)/total
+    fom_err = np.sqrt(np.dot(weights**2, err**2))/total
+
+    order = np.argsort(x)
+    return x[order], fom[order], fom_err[order]
+
+def optimum(comparator, requests, weights = None, frac = 0.5, n_new = 3):
+    """ Returns the threshold maximizing the weighted combined FOM of the
+    requests, see :func:`combined_fom` and :func:`fit_optimum`.
+
+    :param comparator: data sets named after their thresholds.
+    :type comparator: :class:`analysis.fom.Comparator`
+
+    :param requests: pairs of Serpent 2 output parameter and group.
+    :type requests: list(tuple(string, int))
+
+    :param weights: weight of each request, equal by default.
+    :type weights: list(float), optional
+
+    :param frac: fraction of each series skipped before the tail.
+    :type frac: float
+
+    :param n_new: number of thresholds to suggest.
+    :type n_new: int
+
+    :rtype: dict
+    """
+    x, fom, fom_err = combined_fom(comparator, requests, weights, frac)
+    return fit_optimum(x, fom, fom_err, n_new)
+
+def fit_optimum(x, fom, fom_err, n_new = 3):
+    """ Returns the threshold maximizing the FOM and the thresholds to
+    simulate next.
+
+    A quadratic is fitted to the FOM, weighted by its standard error. If
+    the fit has a maximum within the simulated thresholds, it is the
+    optimum and its uncertainty is propagated from the covariance of the
+    fit (which needs at least five thresholds). Otherwise the best
+    simulated threshold is the optimum. New thresholds are spread over
+    the uncertainty of the optimum or, if it is unknown or too small,
+    between the simulated thresholds on either side of the optimum,
+    skipping thresholds already simulated or suggested.
+
+    :param x: thresholds, sorted.
+    :type x: :class:`numpy.ndarray`
+
+    :param fom: FOM at each threshold.
+    :type fom: :class:`numpy.ndarray`
+
+    :param fom_err: standard error of the FOM.
+    :type fom_err: :class:`numpy.ndarray`
+
+    :param n_new: number of thresholds to suggest.
+    :type n_new: int
+
+    :returns: dictionary with the thresholds `x`, `fom` and `fom_err`, \
+              the fit coefficients `coef` (highest power first, None with \
+              less than three thresholds), the `optimum` and its standard \
+              error `optimum_err` (`nan` if unknown), the `best` simulated \
+              threshold, and `suggest`, the thresholds to simulate next.
+    :rtype: dict
+    """
+    x = np.asarray(x, dtype = float)
+    fom = np.asarray(fom, dtype = float)
+    fom_err = np.asarray(fom_err, dtype = float)
+    best = x[np.argmax(fom)]
+
+    opt = best
+    opt_err = np.nan
+    coef = None
+    if len(x) >= 3:
+        # Avoid infinite weights for exact values
+        positive = (fom_err > 0)
+        floor = np.min(fom_err[positive]) if np.any(positive) else 1
+        w = 1/np.where(positive, fom_err, floor)
+
+        cov = None
+        if len(x) > 4:
+            coef, cov = np.polyfit(x, fom, 2, w = w, cov = True)
+        else:
+            coef = np.polyfit(x, fom, 2, w = w)
+
+        a, b = coef[0], coef[1]
+        if a < 0 and x[0] <= -b/(2*a) <= x[-1]:
+            opt = -b/(2*a)
+            if cov is not None:
+                grad = np.array([b/(2*a**2), -1/(2*a), 0])
+                opt_err = np.sqrt(np.dot(grad, np.dot(cov, grad)))
+
+    tol = 1e-3*(x[-1] - x[0])
+    lo, hi = opt, opt
+    if np.isfinite(opt_err):
+        lo = max(opt - 2*opt_err, x[0])
+        hi = min(opt + 2*opt_err, x[-1])
+    if hi - lo < tol:
+        # Unknown or tiny error, use the neighbouring thresholds
+        lo = np.max(x[x < opt]) if np.any(x < opt) else x[0]
+        hi = np.min(x[x > opt]) if np.any(x > opt) else x[-1]
+
+    # Evenly spaced in the interval, excluding its ends, known points and
+    # each other
+    suggest = []
+    for c in np.linspace(lo, hi, n_new + 2)[1:-1]:
+        if np.min(np.abs(np.append(x, suggest) - c)) > tol:
+            suggest.append(c)
+
+    return {'x' : x, 'fom' : fom, 'fom_err' : fom_err, 'coef' : coef,
+            'optimum' : opt, 'optimum_err' : opt_err, 'best' : best,
+            'suggest' : suggest}
@@ -3,9 +3,14 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import core
 import fom
+import tables
+import throughput
+
+# Text of the figures is rendered by LaTeX, which must be installed
+USETEX = True
 
 def fom_plot_setup(font_size=32, label_size=32):
-    plt.rc('text', usetex=True)
+    plt.rc('text', usetex=USETEX)
     plt.rc('font', family='serif')
     ax = plt.gca()
     plt.rc('font', size=font_size)
@@ -74,7 +79,8 @@ def get_fom(comparator, label, grp, cycle_caps=[], corr=False):
         else:
             cycl = data_set.get_data(label, grp, cycle=True)[:,0]
             cycl = cycl[cycl[:].argsort()]
-            dcyc = np.average(cyc_cpu_plot(comparator, x[-1], plot=False))
+            # Intervals with no CPU time have no rate
+            dcyc = np.nanmean(throughput.rates(data_set))
             data[:,1] = np.multiply(data[:,0], data[:,1])
             data[:,1] = np.divide(data[:,1], cycl)
             data[:,1] = data[:,1] * dcyc
@@ -106,6 +112,8 @@ def plot_title(label, grp, casename):
         param = ' infinite flux '
     elif label =='INF_TOT':
         param = ' infinite $\Sigma_t$ '
+    else:
+        param = ' ' + label.replace('_', ' ') + ' '
 
     if grp == 1:
         group = "fast"
@@ -115,9 +123,12 @@ def plot_title(label, grp, casename):
     title = casename + param + 'for the ' + group + " group"
     return title
 
-def plot_fom(comparator, casename, label, grp, save=False, fontsize=20, cycle_caps=[], corr=False):
+def plot_fom(comparator, casename, label, grp, save=False, fontsize=20, cycle_caps=[], corr=False,
+             img_dir='~/', filename=None, fmt='pdf'):
    
     title = plot_title(label, grp, casename)
+    if filename is None:
+        filename = casename.lower() + '_' + label.lower() + '_fom_' + str(grp)
     
     x, y, yerr = get_fom(comparator, label, grp, cycle_caps = cycle_caps, corr = corr)
     
@@ -127,13 +138,19 @@ def plot_fom(comparator, casename, label, grp, save=False, fontsize=20, cycle_ca
     fom_plot_setup(fontsize,fontsize)
     plt.xlim([0.05,1.05])
     plt.xticks(np.arange(0.1,1.1, 0.1))
-    plt.show()
+    if save:
+        plt.savefig(img_dir + filename + "." + fmt,
+                    format = fmt, bbox_inches='tight')
+        plt.close()
+    else:
+        plt.show()
 
 def plot_ratios(comparator, casename, label, grp, cycle_caps=[], corr=False,
-                save=False, fontsize=20, img_dir='~/'):
+                save=False, fontsize=20, img_dir='~/', filename=None, fmt='pdf'):
         
     title = plot_title(label, grp, casename)
-    filename = casename.lower() + '_' + label.lower() + '_' + str(grp)
+    if filename is None:
+        filename = casename.lower() + '_' + label.lower() + '_' + str(grp)
 
     x, r, rerr = get_ratios(comparator, label, grp, cycle_caps, corr)
 
@@ -147,8 +164,9 @@ def plot_ratios(comparator, casename, label, grp, cycle_caps=[], corr=False,
     plt.xlabel('$t_{\mathrm{wdt}}$', fontsize=fontsize+4)
     plt.axhline(y=1.0, ls='--', c='k')
     if save:
-        plt.savefig(img_dir + filename + ".pdf", 
-                    format = 'pdf', bbox_inches='tight')
+        plt.savefig(img_dir + filename + "." + fmt,
+                    format = fmt, bbox_inches='tight')
+        plt.close()
     else:
         plt.show()
 
@@ -162,16 +180,10 @@ def pandas_table(x, y, yerr, r, rerr):
     return df
 
 def pandas_format(df, fom_p, rat_p):
-    # Formats the data frame
-    def fom_form(x):
-        return '{:.0f}'.format(np.around(x/np.power(10,fom_p)))
-    def ratio(x):
-        fs = '{:.' + str(rat_p) + 'f}'
-        return fs.format(x)
-    df['fom'] = df['fom'].apply(fom_form)
-    df['fom_err'] = df['fom_err'].apply(fom_form)
-    df['r']  = df['r'].apply(ratio)
-    df['r_err']  = df['r_err'].apply(ratio)
+    # Formats the data frame, see tables.format_columns
+    formatted = tables.format_columns(df, fom_p, rat_p)
+    for col in ['fom', 'fom_err', 'r', 'r_err']:
+        df[col] = formatted[col]
 
 def latex(df, fom_p, rat_p):
     pandas_format(df, fom_p, rat_p)
@@ -180,35 +192,16 @@ def latex(df, fom_p, rat_p):
     return df.to_latex(index=False, escape=False, column_format='rrrrr')
 
 def make_table(comp, label, grp, fom_p, rat_p=3, cycle_caps=[]):
-    # Get fom and ratios
-    x, y, yerr = get_fom(comp, label, grp, cycle_caps)
-    x, r, rerr = get_ratios(comp, label, grp, cycle_caps)
-    df = pandas_table(x,y,yerr,r,rerr)
-    return latex(df, fom_p, rat_p)
+    # Get fom and ratios for all data sets at once
+    df = tables.compute(comp, label, grp, cycle_caps)
+    return tables.render(df, fom_p, rat_p)
 
 def cyc_cpu_plot(comp, twdt, plot=True):
-    # Find index
-    for i, analyzer in enumerate(comp.data):
-        if analyzer.name == str(twdt):
-            n = i
-    cycles = []
-    cpu = []
-    for data in comp.data[n].data:
-        cycles.append(data.get_data('CYCLE_IDX')[0][0])
-        cpu.append(data.get_cpu())
-    
-    cyc_cpu = np.column_stack((cycles, cpu))
-    
-    cyc_cpu = cyc_cpu[cyc_cpu[:,0].argsort()]
-    dcyc_cpu = []
-
-    for i in range(1,len(cycles)):
-        dcyc = cyc_cpu[i,0] - cyc_cpu[i-1,0]
-        dcpu = cyc_cpu[i,1] - cyc_cpu[i-1,1]
-        dcyc_cpu.append(dcyc/dcpu)
+    analyzer = comp.get(twdt)
+    dcyc_cpu = throughput.rates(analyzer)
 
     if plot:
-        plt.title('Cycles/CPU time for ' + comp.data[n].name)
+        plt.title('Cycles/CPU time for ' + analyzer.name)
         plt.plot(dcyc_cpu, 'k.')
         fom_plot_setup(12,12)
         plt.ylabel('Cycles/CPU time')
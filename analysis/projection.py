@@ -0,0 +1,103 @@
+"""
+
+.. module:: projection
+     :synopsis: Projected cost to reach a target precision
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+Since :math:`FOM = 1/(\\sigma^2 T)` is constant once a simulation has
+converged, the CPU time needed to reach a relative error
+:math:`\\sigma` is :math:`T = 1/(FOM \\, \\sigma^2)`. The FOM is the
+average of the tail of each series, and its standard error (including
+the autocorrelation, see :mod:`analysis.stats`) gives the uncertainty
+band of the projection. The CPU time is converted to cycles with a
+linear fit of CPU time against cycle number, so that the time spent
+before the first cycle is accounted for.
+
+"""
+
+import numpy as np
+import pandas as pd
+import stats
+
+def cycle_fit(analyzer):
+    """ Returns the intercept and slope of the linear fit of CPU time
+    against cycle number for an :class:`analysis.fom.Analyzer`, that is the
+    CPU time spent before the first cycle and the CPU time per cycle.
+
+    :rtype: tuple(float, float)
+    """
+    slope, intercept = np.polyfit(analyzer.get_x(cycle = True),
+                                  analyzer.get_x(cycle = False), 1)
+    return intercept, slope
+
+def project(comparator, labels, target, grps = None, frac = 0.5, z = 1.0):
+    """ Returns the projected CPU time and cycle number needed to reach a
+    relative error of `target`, for every data set, parameter and group.
+
+    :param comparator: data sets to be analyzed.
+    :type comparator: :class:`analysis.fom.Comparator`
+
+    :param labels: Serpent 2 output parameter(s)
+    :type labels: string or list(string)
+
+    :param target: the relative error to be reached.
+    :type target: float
+
+    :param grps: the groups or matrix entries (as flattened indices) of \
+                 interest. If None (default), all are projected.
+    :type grps: list(int), optional
+
+    :param frac: fraction of each series skipped before the tail.
+    :type frac: float
+
+    :param z: width of the uncertainty band, in standard errors of the FOM.
+    :type z: float
+
+    :returns: one row per data set, parameter and group with the average \
+              `fom` and its standard error `fom_err`, the projected `cpu` \
+              time and `cycles` with their bands (`_lo`, `_hi`), and the \
+              CPU time left from the last snapshot `cpu_left`. Groups with \
+              a FOM band reaching 0 have an infinite upper bound.
+    :rtype: :class:`pandas.DataFrame`
+    """
+    if type(labels) is not list:
+        labels = [labels]
+
+    tables = []
+    for d in comparator.data:
+        intercept, slope = cycle_fit(d)
+        for label in labels:
+            s = stats.analyzer_stats(d, label, frac)
+            cols = np.arange(len(s['mean']))
+            if grps is not None:
+                cols = np.array(grps) - 1
+
+            fom = s['mean'][cols]
+            err = s['err'][cols]
+            cpu = __cpu__(fom, target)
+            cpu_lo = __cpu__(fom + z*err, target)
+            cpu_hi = __cpu__(fom - z*err, target)
+
+            tables.append(pd.DataFrame({
+                'name' : d.name, 'label' : label, 'group' : cols + 1,
+                'fom' : fom, 'fom_err' : err,
+                'cpu' : cpu, 'cpu_lo' : cpu_lo, 'cpu_hi' : cpu_hi,
+                'cpu_left' : np.maximum(cpu - d.get_x(cycle = False)[-1], 0),
+                'cycles' : __cycles__(cpu, intercept, slope),
+                'cycles_lo' : __cycles__(cpu_lo, intercept, slope),
+                'cycles_hi' : __cycles__(cpu_hi, intercept, slope)},
+                columns = ['name', 'label', 'group', 'fom', 'fom_err', 'cpu',
+                           'cpu_lo', 'cpu_hi', 'cpu_left', 'cycles',
+                           'cycles_lo', 'cycles_hi']))
+    return pd.concat(tables, ignore_index = True)
+
+def __cpu__(fom, target):
+    # CPU time for a relative error of target, infinite for FOM <= 0
+    cpu = np.full(np.shape(fom), np.inf)
+    positive = (fom > 0)
+    cpu[positive] = np.power(fom[positive]*target**2, -1)
+    return cpu
+
+def __cycles__(cpu, intercept, slope):
+    return np.maximum((cpu - intercept)/slope, 0)
@@ -0,0 +1,233 @@
+"""
+
+.. module:: report
+     :synopsis: Incremental builds of the figures and tables of a study
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+The figures and tables of a study are declared once in a
+:class:`Report`, each with the data sets it is made from and the
+arguments of the function drawing it::
+
+    rep = report.Report('~/paper/img')
+    rep.add('c5g7_flx_1.pdf', 'ratios', dirs, names,
+            casename = 'C5G7', label = 'INF_FLX', grp = 1)
+    rep.add('c5g7_flx_1.tex', 'table', dirs, names,
+            label = 'INF_FLX', grp = 1, fom_p = 2)
+    rep.build()
+
+Each output has a fingerprint made of its arguments and of the size and
+modification time of every result file of its data sets. Fingerprints of
+built outputs are kept in a manifest in the output folder, and
+:meth:`Report.build` only rebuilds the outputs whose fingerprint changed
+or whose file is missing. Outputs made from the same data sets are built
+together so each data set is read once, and the groups are built in
+parallel.
+
+"""
+
+import hashlib, json, os
+import fom
+import plot_tools
+import shared
+
+MANIFEST = 'report.json'
+
+def __figure__(path):
+    # Arguments saving a figure to path, in the format of its extension
+    folder, name = os.path.split(path)
+    filename, ext = os.path.splitext(name)
+    return {'save' : True, 'img_dir' : folder + '/', 'filename' : filename,
+            'fmt' : ext[1:]}
+
+def __ratios__(comp, path, **options):
+    # Normalized FOM figure, see plot_tools.plot_ratios
+    options.update(__figure__(path))
+    plot_tools.plot_ratios(comp, **options)
+
+def __fom__(comp, path, **options):
+    # FOM figure, see plot_tools.plot_fom
+    options.update(__figure__(path))
+    plot_tools.plot_fom(comp, **options)
+
+def __table__(comp, path, **options):
+    # LaTeX table, see plot_tools.make_table
+    with open(path, 'w') as f:
+        f.write(plot_tools.make_table(comp, **options))
+
+# Functions building each kind of output, called with the Comparator of
+# the data sets, the path of the output and the arguments of the output
+BUILDERS = {'ratios' : __ratios__, 'fom' : __fom__, 'table' : __table__}
+
+# Kinds of output saved in the format given by the extension of their name
+FIGURES = ['ratios', 'fom']
+
+def fingerprint(dirs, kind, options):
+    """ Returns the fingerprint of an output: a digest of its kind, its
+    arguments, and the name, size and modification time of every result
+    file of its data sets.
+
+    :rtype: string
+    """
+    files = []
+    for d in dirs:
+        for file_name in sorted(os.listdir(d)):
+            if file_name[-2:] == '.m':
+                st = os.stat(os.path.join(d, file_name))
+                files.append([d, file_name, st.st_size, st.st_mtime])
+    text = json.dumps([kind, sorted(options.items()), files])
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def __build_task__(task):
+    # Reads the data sets once and builds every output made from them
+    directory, dirs, names, compact, outputs = task
+    results = []
+    try:
+        comp = fom.Comparator(dirs, names, compact = compact)
+    except Exception as e:
+        message = type(e).__name__ + ': ' + str(e)
+        return [(name, message) for name, kind, options in outputs]
+    for name, kind, options in outputs:
+        try:
+            BUILDERS[kind](comp, os.path.join(directory, name), **options)
+            results.append((name, None))
+        except Exception as e:
+            results.append((name, type(e).__name__ + ': ' + str(e)))
+    return results
+
+class Report():
+    """ The figures and tables of a study, rebuilt when their data sets or
+    arguments change.
+
+    :param directory: folder the outputs and the manifest are written to, \
+                      created if needed.
+    :type directory: string
+
+    :param processes: number of worker processes, one per core by default. \
+                      If 1, outputs are built in this process.
+    :type processes: int, optional
+
+    :param compact: When True, data sets use the compact storage of \
+                    :class:`analysis.core.CompactDataFile`.
+    :type compact: bool
+    """
+
+    def __init__(self, directory, processes = None, compact = False):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self.processes = processes
+        self.compact = compact
+        self.outputs = {}
+        self.failed = {}
+
+    def add(self, name, kind, dirs, names, **options):
+        """ Declares an output.
+
+        :param name: file name of the output in the report folder. The \
+                     extension of figures, such as `.pdf` or `.png`, gives \
+                     their format.
+        :type name: string
+
+        :param kind: kind of output, a key of :data:`BUILDERS`: 'ratios' \
+                     (:func:`analysis.plot_tools.plot_ratios`), 'fom' \
+                     (:func:`analysis.plot_tools.plot_fom`) or 'table' \
+                     (:func:`analysis.plot_tools.make_table`).
+        :type kind: string
+
+        :param dirs: location of the data sets.
+        :type dirs: list(string)
+
+        :param names: names of the data sets.
+        :type names: list(string)
+
+        The remaining keyword arguments are passed to the function
+        building the output.
+        """
+        assert kind in BUILDERS, "Unknown kind of output " + str(kind)
+        assert len(dirs) == len(names), "Need one name per data set"
+        assert kind not in FIGURES or os.path.splitext(name)[1], \
+            "Figure names need an extension giving their format"
+        dirs = [os.path.abspath(os.path.expanduser(d)) for d in dirs]
+        self.outputs[name] = (kind, dirs, [str(n) for n in names], options)
+
+    def stale(self):
+        """ Returns the outputs that need to be built, with their
+        fingerprint.
+
+        :rtype: dict
+        """
+        manifest = self.manifest()
+        stale = {}
+        for name in self.outputs:
+            fp = self.__fingerprint__(name)
+            if manifest.get(name) != fp or \
+               not os.path.exists(os.path.join(self.directory, name)):
+                stale[name] = fp
+        return stale
+
+    def build(self, force = False):
+        """ Builds the outputs whose inputs changed since they were last
+        built. Outputs that fail are left out of the manifest and listed
+        with their error in `failed`.
+
+        :param force: If True, every output is built.
+        :type force: bool
+
+        :returns: names of the outputs built.
+        :rtype: list(string)
+        """
+        if force:
+            stale = dict((name, self.__fingerprint__(name))
+                         for name in self.outputs)
+        else:
+            stale = self.stale()
+
+        # Outputs made from the same data sets are built by one task
+        groups = {}
+        for name in sorted(stale):
+            kind, dirs, names, options = self.outputs[name]
+            groups.setdefault((tuple(dirs), tuple(names)), []).append(
+                (name, kind, options))
+        tasks = [(self.directory, list(dirs), list(names), self.compact, outputs)
+                 for (dirs, names), outputs in sorted(groups.items())]
+
+        if self.processes == 1 or len(tasks) < 2:
+            results = [__build_task__(t) for t in tasks]
+        else:
+            results = shared.fan_out(__build_task__, tasks, self.processes)
+
+        manifest = self.manifest()
+        built = []
+        self.failed = {}
+        for name, error in [r for result in results for r in result]:
+            if error is None:
+                manifest[name] = stale[name]
+                built.append(name)
+            else:
+                manifest.pop(name, None)
+                self.failed[name] = error
+        self.__save__(manifest)
+        return sorted(built)
+
+    def manifest(self):
+        """ Returns the fingerprints of the built outputs
+
+        :rtype: dict
+        """
+        path = os.path.join(self.directory, MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return dict((str(k), str(v)) for k, v in json.load(f).items())
+
+    def __fingerprint__(self, name):
+        kind, dirs, names, options = self.outputs[name]
+        return fingerprint(dirs, kind, dict(options, names = names))
+
+    def __save__(self, manifest):
+        # Written to a temporary file first so the manifest is never partial
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent = 1, sort_keys = True)
+        os.rename(path + '.tmp', path)
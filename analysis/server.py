@@ -0,0 +1,381 @@
+"""
+
+.. module:: server
+     :synopsis: Local analysis server sharing loaded sweeps between clients
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+An :class:`AnalysisServer` loads each data set once, keeps it in a
+bounded, least recently used :class:`SweepCache`, and answers queries
+from many clients over HTTP on the local machine. The clients,
+:class:`RemoteAnalyzer` and :class:`RemoteComparator`, mirror the query
+methods of :class:`analysis.fom.Analyzer` and
+:class:`analysis.fom.Comparator`, so that a notebook only pays for the
+answer of each query instead of loading the data sets itself.
+
+A server is started with::
+
+    python -m analysis.server --port 8642 --max-sweeps 8
+
+Requests and answers are JSON, with arrays and tuples (used for matrix
+entries) encoded so that they arrive unchanged.
+
+"""
+
+import numpy as np
+import copy, json, os, threading
+from collections import OrderedDict
+import fom
+import plot_tools
+
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from urllib2 import urlopen, Request, HTTPError
+
+PORT = 8642
+
+ANALYZER_METHODS = ['get_data', 'get_avg', 'get_var', 'get_collapse',
+                    'get_collapse_avg', 'collapse', 'get_x', 'get_array',
+                    'get_fom_array', 'get_filenames']
+COMPARATOR_METHODS = ['ratio', 'collapse_ratio']
+TABLE_FUNCTIONS = {'get_fom' : plot_tools.get_fom,
+                   'get_ratios' : plot_tools.get_ratios,
+                   'make_table' : plot_tools.make_table}
+
+class SweepCache():
+    """ A bounded cache of :class:`analysis.fom.Analyzer` objects, one per
+    data set folder. When more than `max_sweeps` data sets are loaded, the
+    least recently used one is dropped. Each folder is loaded only once,
+    even when several clients request it at the same time.
+
+    :param max_sweeps: largest number of data sets kept in memory.
+    :type max_sweeps: int
+
+    :param compact: When True, data sets use the compact storage of \
+                    :class:`analysis.core.CompactDataFile`.
+    :type compact: bool
+
+    :param dtype: storage type for values and errors when `compact` is True.
+    :type dtype: :any:`numpy.dtype`
+    """
+
+    def __init__(self, max_sweeps = 8, compact = True, dtype = np.float32):
+        self.max_sweeps = max_sweeps
+        self.compact = compact
+        self.dtype = dtype
+        self.sweeps = OrderedDict()
+        self.lock = threading.Lock()
+        self.loading = {}
+
+    def get(self, location, name = ""):
+        """ Returns the data set in a folder, loading it if needed.
+
+        :param location: folder where the Serpent output files are located
+        :type location: string
+
+        :param name: name of the returned data set. The data is shared with \
+                     every other request of the same folder.
+        :type name: string
+
+        :rtype: :class:`analysis.fom.Analyzer`
+        """
+        key = os.path.abspath(os.path.expanduser(location))
+        with self.__key_lock__(key):
+            analyzer = self.__lookup__(key)
+            if analyzer is None:
+                analyzer = fom.Analyzer(key, compact = self.compact,
+                                        dtype = self.dtype)
+                self.__insert__(key, analyzer)
+            view = copy.copy(analyzer)
+
+        view.name = str(name)
+        return view
+
+    def refresh(self, location):
+        """ Uploads the new files of a cached data set. The new files are
+        added to a copy of the data set, which then replaces it, so the
+        data sets returned by earlier calls of :meth:`get` are unchanged.
+
+        :returns: the number of new files, 0 if the folder is not cached.
+        :rtype: int
+        """
+        key = os.path.abspath(os.path.expanduser(location))
+        with self.__key_lock__(key):
+            analyzer = self.__lookup__(key)
+            if analyzer is None:
+                return 0
+            fresh = copy.copy(analyzer)
+            fresh.data = list(analyzer.data)
+            fresh.skipped = dict(analyzer.skipped)
+            new = fresh.refresh()
+            if new:
+                self.__insert__(key, fresh)
+            return new
+
+    def status(self):
+        """ Returns the folder and number of files of every cached data set,
+        from least to most recently used.
+
+        :rtype: list(tuple(string, int))
+        """
+        with self.lock:
+            return [(key, a.n) for key, a in self.sweeps.items()]
+
+    def __lookup__(self, key):
+        with self.lock:
+            analyzer = self.sweeps.pop(key, None)
+            if analyzer is not None:
+                self.sweeps[key] = analyzer
+            return analyzer
+
+    def __insert__(self, key, analyzer):
+        with self.lock:
+            self.sweeps[key] = analyzer
+            while len(self.sweeps) > self.max_sweeps:
+                self.sweeps.popitem(last = False)
+
+    def __key_lock__(self, key):
+        with self.lock:
+            return self.loading.setdefault(key, threading.Lock())
+
+class AnalysisServer(ThreadingMixIn, HTTPServer):
+    """ A threaded HTTP server answering analysis queries from a shared
+    :class:`SweepCache`.
+
+    :param port: port to listen on, 0 picks a free port.
+    :type port: int
+
+    :param host: address to listen on, the local machine by default.
+    :type host: string
+
+    The remaining keyword arguments are passed to :class:`SweepCache`.
+    """
+    daemon_threads = True
+
+    def __init__(self, port = PORT, host = 'localhost', **cache_options):
+        HTTPServer.__init__(self, (host, port), Handler)
+        self.cache = SweepCache(**cache_options)
+
+    def url(self):
+        """ Returns the address clients connect to
+
+        :rtype: string
+        """
+        return 'http://' + self.server_address[0] + ':' + str(self.server_address[1])
+
+    def start(self):
+        """ Serves in a background thread and returns it
+
+        :rtype: :class:`threading.Thread`
+        """
+        thread = threading.Thread(target = self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def answer(self, path, request):
+        """ Returns the answer to a decoded request. The path selects the
+        query: `/analyzer/<method>`, `/comparator/<method>`, `/refresh` or
+        `/status`.
+        """
+        parts = path.strip('/').split('/')
+        if parts == ['status']:
+            return self.cache.status()
+        if parts == ['refresh']:
+            return self.cache.refresh(request['location'])
+
+        assert len(parts) == 2, "Unknown query " + path
+        kind, method = parts
+        args = request.get('args', [])
+        kwargs = request.get('kwargs', {})
+        assert not kwargs.get('plot', False), "Plots are not drawn by the server"
+
+        if kind == 'analyzer':
+            assert method in ANALYZER_METHODS, "Unknown Analyzer method " + method
+            analyzer = self.cache.get(request['location'], request.get('name', ''))
+            return getattr(analyzer, method)(*args, **kwargs)
+        elif kind == 'comparator':
+            assert len(request['dirs']) == len(request['names']), \
+                "Number of directories and names must match"
+            comp = fom.Comparator([], [])
+            comp.data = [self.cache.get(d, n) for d, n in
+                         zip(request['dirs'], request['names'])]
+            if method in COMPARATOR_METHODS:
+                return getattr(comp, method)(*args, **kwargs)
+            assert method in TABLE_FUNCTIONS, "Unknown Comparator query " + method
+            return TABLE_FUNCTIONS[method](comp, *args, **kwargs)
+        assert False, "Unknown query " + path
+
+class Handler(BaseHTTPRequestHandler):
+    """ Decodes a request, asks the :class:`AnalysisServer` for the answer
+    and sends it back. Errors are sent back with their type and message. """
+
+    def do_POST(self):
+        try:
+            length = int(self.headers['Content-Length'])
+            request = decode(self.rfile.read(length))
+            code, answer = 200, {'result' : self.server.answer(self.path, request)}
+        except Exception as e:
+            code, answer = 500, {'error' : type(e).__name__, 'message' : str(e)}
+        body = json.dumps(encode(answer))
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Queries are not logged
+        pass
+
+def encode(obj):
+    """ Returns `obj` with arrays, numpy scalars and tuples replaced by
+    objects JSON can store, see :func:`decode`.
+    """
+    if isinstance(obj, np.ndarray):
+        return {'__array__' : encode(obj.tolist()), 'dtype' : str(obj.dtype)}
+    elif isinstance(obj, np.generic):
+        return obj.item()
+    elif isinstance(obj, tuple):
+        return {'__tuple__' : [encode(o) for o in obj]}
+    elif isinstance(obj, list):
+        return [encode(o) for o in obj]
+    elif isinstance(obj, dict):
+        return dict((k, encode(v)) for k, v in obj.items())
+    return obj
+
+def decode(text):
+    """ Returns the object encoded by :func:`encode` and stored as JSON
+    text.
+    """
+    return json.loads(text, object_hook = __restore__)
+
+def __restore__(obj):
+    if '__array__' in obj:
+        return np.array(obj['__array__'], dtype = obj['dtype'])
+    elif '__tuple__' in obj:
+        return tuple(obj['__tuple__'])
+    # JSON keys are strings
+    return dict((str(k), v) for k, v in obj.items())
+
+def query(url, path, request):
+    """ Sends a request to an :class:`AnalysisServer` and returns the
+    answer. Errors raised by the server are raised again, as
+    :class:`KeyError` or :class:`AssertionError` when they are of that
+    type and as :class:`RuntimeError` otherwise.
+    """
+    body = json.dumps(encode(request))
+    req = Request(url.rstrip('/') + path, body,
+                  {'Content-Type' : 'application/json'})
+    try:
+        answer = decode(urlopen(req).read())
+    except HTTPError as e:
+        answer = decode(e.read())
+    if 'error' in answer:
+        error = {'KeyError' : KeyError,
+                 'AssertionError' : AssertionError}.get(answer['error'], RuntimeError)
+        raise error(answer['message'])
+    return answer['result']
+
+class RemoteAnalyzer():
+    """ A client for a data set loaded by an :class:`AnalysisServer`, with
+    the query methods of :class:`analysis.fom.Analyzer`: `get_data`,
+    `get_avg`, `get_var`, `get_collapse`, `get_collapse_avg`, `collapse`,
+    `get_x`, `get_array`, `get_fom_array` and `get_filenames`. Plots are
+    not available.
+
+    :param location: folder where the Serpent output files are located, \
+                     as seen by the server.
+    :type location: string
+
+    :param name: desired name for this data set
+    :type name: string, optional
+
+    :param url: address of the server.
+    :type url: string
+    """
+
+    def __init__(self, location, name = "", url = 'http://localhost:' + str(PORT)):
+        self.location = location
+        self.name = str(name)
+        self.url = url
+
+    def __getattr__(self, method):
+        if method not in ANALYZER_METHODS:
+            raise AttributeError(method)
+        def remote(*args, **kwargs):
+            return query(self.url, '/analyzer/' + method,
+                         {'location' : self.location, 'name' : self.name,
+                          'args' : list(args), 'kwargs' : kwargs})
+        return remote
+
+    def refresh(self):
+        """ Asks the server to upload the new files of the data set.
+
+        :returns: the number of new files.
+        :rtype: int
+        """
+        return query(self.url, '/refresh', {'location' : self.location})
+
+class RemoteComparator():
+    """ A client for data sets loaded by an :class:`AnalysisServer`, with
+    the query methods of :class:`analysis.fom.Comparator` (`ratio` and
+    `collapse_ratio`) and the tables of :mod:`analysis.plot_tools`
+    (`get_fom`, `get_ratios` and `make_table`, called without the
+    comparator argument).
+
+    :param dirs: list of strings with the location of the data sets, as \
+                 seen by the server.
+    :type dirs: list(string)
+
+    :param names: list of strings that are the chosen names for the data sets
+    :type names: list(string)
+
+    :param url: address of the server.
+    :type url: string
+    """
+
+    def __init__(self, dirs, names, url = 'http://localhost:' + str(PORT)):
+        assert len(dirs) == len(names), "Number of directories and names must match"
+        self.url = url
+        self.data = [RemoteAnalyzer(d, n, url) for d, n in zip(dirs, names)]
+
+    def get(self, name):
+        """ Returns the data set with the given name.
+
+        :rtype: :class:`RemoteAnalyzer`
+        """
+        names = [d.name for d in self.data]
+        assert str(name) in names, "No data set named " + str(name)
+        return self.data[names.index(str(name))]
+
+    def __getattr__(self, method):
+        if method not in COMPARATOR_METHODS and method not in TABLE_FUNCTIONS:
+            raise AttributeError(method)
+        def remote(*args, **kwargs):
+            return query(self.url, '/comparator/' + method,
+                         {'dirs' : [d.location for d in self.data],
+                          'names' : [d.name for d in self.data],
+                          'args' : list(args), 'kwargs' : kwargs})
+        return remote
+
+def serve(port = PORT, host = 'localhost', **cache_options):
+    """ Starts an :class:`AnalysisServer` and serves until interrupted. """
+    server = AnalysisServer(port, host, **cache_options)
+    print "Serving on " + server.url()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description = 'Local analysis server')
+    parser.add_argument('--port', type = int, default = PORT)
+    parser.add_argument('--host', default = 'localhost')
+    parser.add_argument('--max-sweeps', type = int, default = 8)
+    parser.add_argument('--full', action = 'store_true',
+                        help = 'keep double precision DataFile objects')
+    args = parser.parse_args()
+    serve(args.port, args.host, max_sweeps = args.max_sweeps,
+          compact = not args.full)
@@ -0,0 +1,246 @@
+"""
+
+.. module:: shard
+     :synopsis: Sharded analysis of sweeps over a shared filesystem
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+The largest sweeps are split between independent worker processes, on
+one or many machines sharing a filesystem. A plan, written once with
+:func:`plan`, lists the data sets of the sweep and the parameters to
+summarize. Each worker then reads the data sets of its shard and writes
+their arrays to one subfolder each, in the format of
+:func:`analysis.shared.share`. Finally :func:`merge` gathers the
+subfolders into an :class:`analysis.fom.Comparator` of
+:class:`analysis.shared.SharedAnalyzer` objects, used for ratios and
+tables as if the sweep had been loaded in one process::
+
+    python -m analysis.shard plan OUTPUT --dirs run_a run_b run_c \\
+        --names a b c --labels INF_FLX INF_TOT --shards 2
+    python -m analysis.shard map OUTPUT --shard 0    # on one node
+    python -m analysis.shard map OUTPUT --shard 1    # on another node
+
+and, once every shard is done::
+
+    comp = shard.merge('OUTPUT')
+
+Subfolders are written under a temporary name, made of the host name and
+process id of the worker, and renamed when complete, so a shard that is
+interrupted can simply be run again. A worker only removes the temporary
+subfolders left by processes of its own host that are no longer running,
+so it never removes the subfolder another worker is writing.
+
+"""
+
+import errno, json, os, shutil, socket
+import fom
+import shared
+
+PLAN = 'plan.json'
+
+def plan(dirs, names, labels, output, n_shards = 1, compact = False):
+    """ Writes the plan of a sharded analysis to a folder.
+
+    :param dirs: location of the data sets.
+    :type dirs: list(string)
+
+    :param names: names of the data sets.
+    :type names: list(string)
+
+    :param labels: Serpent 2 output parameter(s) summarized for each \
+                   data set.
+    :type labels: string or list(string)
+
+    :param output: folder shared by the workers, created if needed.
+    :type output: string
+
+    :param n_shards: number of shards the data sets are divided into.
+    :type n_shards: int
+
+    :param compact: When True, workers use the compact storage of \
+                    :class:`analysis.core.CompactDataFile`.
+    :type compact: bool
+
+    :returns: the plan.
+    :rtype: dict
+    """
+    assert len(dirs) == len(names), "Need one name per data set"
+    assert n_shards >= 1, "Need at least one shard"
+    if type(labels) is not list:
+        labels = [labels]
+    output = os.path.abspath(os.path.expanduser(output))
+    if not os.path.isdir(output):
+        os.makedirs(output)
+
+    sweep = {'dirs' : [os.path.abspath(os.path.expanduser(d)) for d in dirs],
+             'names' : [str(n) for n in names], 'labels' : labels,
+             'shards' : n_shards, 'compact' : compact}
+    with open(os.path.join(output, PLAN), 'w') as f:
+        json.dump(sweep, f)
+    return sweep
+
+def read_plan(output):
+    """ Returns the plan written to a folder by :func:`plan`
+
+    :rtype: dict
+    """
+    plan_file = os.path.join(os.path.expanduser(output), PLAN)
+    assert os.path.exists(plan_file), "No plan in " + output
+    with open(plan_file) as f:
+        sweep = json.load(f)
+    sweep['dirs'] = [str(d) for d in sweep['dirs']]
+    sweep['names'] = [str(n) for n in sweep['names']]
+    sweep['labels'] = [str(l) for l in sweep['labels']]
+    return sweep
+
+def members(output, shard):
+    """ Returns the positions in the plan of the data sets of a shard
+
+    :rtype: list(int)
+    """
+    sweep = read_plan(output)
+    assert 0 <= shard < sweep['shards'], "No shard " + str(shard)
+    return range(shard, len(sweep['dirs']), sweep['shards'])
+
+def run(output, shard, verb = False):
+    """ Reads the data sets of one shard and writes their arrays to the
+    output folder, one subfolder per data set.
+
+    :param output: folder holding the plan.
+    :type output: string
+
+    :param shard: shard number, starting at 0.
+    :type shard: int
+
+    :param verb: When True, shows all filenames as they are uploaded.
+    :type verb: bool
+
+    :returns: names of the data sets written.
+    :rtype: list(string)
+    """
+    output = os.path.abspath(os.path.expanduser(output))
+    sweep = read_plan(output)
+    written = []
+    for i in members(output, shard):
+        analyzer = fom.Analyzer(sweep['dirs'][i], sweep['names'][i], verb,
+                                sweep['compact'])
+        __publish__(analyzer, sweep['labels'], output, i)
+        written.append(sweep['names'][i])
+    return written
+
+def missing(output):
+    """ Returns the names of the data sets of the plan that have not been
+    written yet. Data sets being written, or left half written by an
+    interrupted worker, are included.
+
+    :rtype: list(string)
+    """
+    output = os.path.abspath(os.path.expanduser(output))
+    sweep = read_plan(output)
+    return [name for i, name in enumerate(sweep['names'])
+            if not os.path.exists(os.path.join(output, str(i), shared.INDEX))]
+
+def merge(output, partial = False):
+    """ Gathers the data sets written by the workers into a Comparator,
+    in the order of the plan.
+
+    :param output: folder holding the plan.
+    :type output: string
+
+    :param partial: If True, data sets that have not been written yet are \
+                    left out, otherwise they raise an AssertionError.
+    :type partial: bool
+
+    :rtype: :class:`analysis.fom.Comparator`
+    """
+    output = os.path.abspath(os.path.expanduser(output))
+    sweep = read_plan(output)
+    left = missing(output)
+    assert partial or not left, "Data sets not written: " + ", ".join(left)
+
+    comp = fom.Comparator([], [])
+    folders = [os.path.join(output, str(i)) for i in range(len(sweep['names']))]
+    comp.data = [shared.SharedAnalyzer(f) for f in folders
+                 if os.path.exists(os.path.join(f, shared.INDEX))]
+    return comp
+
+def run_local(output, processes = None):
+    """ Runs every shard of a plan with a pool of local processes, then
+    gathers the results, see :func:`merge`.
+
+    :param processes: number of workers, one per core by default.
+    :type processes: int, optional
+
+    :rtype: :class:`analysis.fom.Comparator`
+    """
+    output = os.path.abspath(os.path.expanduser(output))
+    sweep = read_plan(output)
+    shared.fan_out(__run_task__, [(output, s) for s in range(sweep['shards'])],
+                   processes)
+    return merge(output)
+
+def __run_task__(task):
+    return run(*task)
+
+def __alive__(pid):
+    # Whether a process of this host is running
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno == errno.EPERM
+    return True
+
+def __temporary__(output, i):
+    # Subfolders of data set i left by interrupted workers of this host,
+    # named .<i>.<host>.<pid> or, once set aside, .<i>.<host>.<pid>.old
+    prefix = '.' + str(i) + '.' + socket.gethostname() + '.'
+    stale = []
+    for f in os.listdir(output):
+        if not f.startswith(prefix):
+            continue
+        pid = f[len(prefix):]
+        if pid.endswith('.old'):
+            pid = pid[:-len('.old')]
+        if pid.isdigit() and (int(pid) == os.getpid() or
+                              not __alive__(int(pid))):
+            stale.append(os.path.join(output, f))
+    return stale
+
+def __publish__(analyzer, labels, output, i):
+    # Written under a temporary name, a complete subfolder replaces the old
+    # one, which is renamed aside first and removed once replaced
+    folder = os.path.join(output, str(i))
+    for temp in __temporary__(output, i):
+        shutil.rmtree(temp, ignore_errors = True)
+    temp = os.path.join(output, '.'.join(['', str(i), socket.gethostname(),
+                                          str(os.getpid())]))
+    shared.share(analyzer, labels, temp)
+    old = temp + '.old'
+    if os.path.isdir(folder):
+        os.rename(folder, old)
+    os.rename(temp, folder)
+    shutil.rmtree(old, ignore_errors = True)
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description = 'Sharded sweep analysis')
+    parser.add_argument('command', choices = ['plan', 'map', 'status'])
+    parser.add_argument('output', help = 'folder shared by the workers')
+    parser.add_argument('--dirs', nargs = '+', default = [])
+    parser.add_argument('--names', nargs = '+', default = [])
+    parser.add_argument('--labels', nargs = '+', default = [])
+    parser.add_argument('--shards', type = int, default = 1)
+    parser.add_argument('--shard', type = int, default = 0)
+    parser.add_argument('--compact', action = 'store_true')
+    parser.add_argument('--verb', action = 'store_true')
+    args = parser.parse_args()
+
+    if args.command == 'plan':
+        plan(args.dirs, args.names, args.labels, args.output, args.shards,
+             args.compact)
+    elif args.command == 'map':
+        for name in run(args.output, args.shard, args.verb):
+            print "Wrote " + name
+    else:
+        left = missing(args.output)
+        print str(len(left)) + " data sets not written: " + ", ".join(left)
@@ -0,0 +1,182 @@
+"""
+
+.. module:: shared
+     :synopsis: Memory-mapped snapshot arrays shared between processes
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+The arrays of an :class:`analysis.fom.Analyzer` (cycle numbers, CPU times
+and the values and errors of the requested parameters, see
+:meth:`analysis.fom.Analyzer.get_array`) are written once to `.npy`
+files in a folder. A :class:`SharedAnalyzer` maps these files into memory
+instead of reading them, and is pickled as the folder name only, so that
+worker processes of a :class:`multiprocessing.Pool` attach to the same
+pages instead of each receiving a copy of every
+:class:`analysis.core.DataFile`.
+
+"""
+
+import numpy as np
+import json, os
+from multiprocessing import Pool
+import derived
+import fom
+
+INDEX = 'index.json'
+
+def share(analyzer, labels, directory):
+    """ Writes the arrays of an :class:`analysis.fom.Analyzer` to a folder
+    and returns a :class:`SharedAnalyzer` attached to them.
+
+    :param analyzer: data set to be shared.
+    :type analyzer: :class:`analysis.fom.Analyzer`
+
+    :param labels: Serpent 2 output parameter(s)
+    :type labels: string or list(string)
+
+    :param directory: folder the arrays are written to, created if needed.
+    :type directory: string
+
+    :rtype: :class:`SharedAnalyzer`
+    """
+    if type(labels) is not list:
+        labels = [labels]
+    directory = os.path.abspath(os.path.expanduser(directory))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    np.save(os.path.join(directory, 'cycles.npy'), analyzer.get_x(cycle = True))
+    np.save(os.path.join(directory, 'cpu.npy'), analyzer.get_x(cycle = False))
+    for label in labels:
+        for err in [False, True]:
+            np.save(__array_file__(directory, label, err),
+                    analyzer.get_array(label, err = err))
+
+    # The index is written last, a folder without one is incomplete
+    index = {'name' : analyzer.name, 'labels' : labels,
+             'files' : analyzer.get_filenames()}
+    with open(os.path.join(directory, INDEX), 'w') as f:
+        json.dump(index, f)
+    return SharedAnalyzer(directory)
+
+def share_comparator(comparator, labels, directory):
+    """ Writes the arrays of every data set of an
+    :class:`analysis.fom.Comparator` to one subfolder each, see
+    :func:`share`, and returns a Comparator of the shared data sets.
+
+    :param directory: folder containing the subfolders.
+    :type directory: string
+
+    :rtype: :class:`analysis.fom.Comparator`
+    """
+    comp = fom.Comparator([], [])
+    comp.data = [share(d, labels, os.path.join(directory, str(i)))
+                 for i, d in enumerate(comparator.data)]
+    return comp
+
+def fan_out(func, tasks, processes = None):
+    """ Returns `func` applied to every task by a pool of worker
+    processes. Tasks containing :class:`SharedAnalyzer` objects are sent
+    to the workers without their arrays.
+
+    :param func: module level function taking one task.
+    :type func: function
+
+    :param tasks: arguments of each call.
+    :type tasks: list
+
+    :param processes: number of workers, one per core by default.
+    :type processes: int, optional
+
+    :rtype: list
+    """
+    pool = Pool(processes)
+    try:
+        return pool.map(func, tasks)
+    finally:
+        pool.close()
+        pool.join()
+
+def __array_file__(directory, label, err):
+    if err:
+        return os.path.join(directory, label + '.err.npy')
+    return os.path.join(directory, label + '.val.npy')
+
+class SharedAnalyzer(fom.Analyzer):
+    """ An :class:`analysis.fom.Analyzer` whose arrays are mapped from the
+    files written by :func:`share`. Only the parameters that were shared
+    are available. Pickling keeps only the folder and name, and unpickling
+    maps the files again.
+
+    :param directory: folder written by :func:`share`.
+    :type directory: string
+
+    :param name: desired name for this data set, by default the name of \
+                 the shared data set.
+    :type name: string, optional
+    """
+
+    def __init__(self, directory, name = None):
+        self.__attach__(os.path.abspath(os.path.expanduser(directory)), name)
+
+    def __attach__(self, directory, name):
+        index_file = os.path.join(directory, INDEX)
+        assert os.path.exists(index_file), "No shared arrays in " + directory
+        with open(index_file) as f:
+            index = json.load(f)
+
+        self.location = directory
+        self.name = str(index['name']) if name is None else name
+        self.labels = [str(l) for l in index['labels']]
+        self.files = [str(f) for f in index['files']]
+        self.data = []
+        self.expressions = {}
+        self.cycles = np.load(os.path.join(directory, 'cycles.npy'), mmap_mode = 'r')
+        self.cpu = np.load(os.path.join(directory, 'cpu.npy'), mmap_mode = 'r')
+        self.cache = {}
+        self.n = len(self.cycles)
+
+    def __getstate__(self):
+        return {'location' : self.location, 'name' : self.name,
+                'expressions' : self.expressions}
+
+    def __setstate__(self, state):
+        self.__attach__(state['location'], state['name'])
+        self.expressions = state.get('expressions', {})
+
+    def refresh(self, verb = False):
+        """ Shared arrays are not updated, always returns 0. """
+        return 0
+
+    def get_array(self, label, err = False):
+        """ Returns the mapped values or errors of a shared parameter, see
+        :meth:`analysis.fom.Analyzer.get_array`. The array is read-only.
+
+        :rtype: :class:`numpy.memmap`
+        """
+        key = (label, bool(err))
+        if key not in self.cache and label in self.expressions:
+            derived.store(self, label, self.expressions[label])
+        if key not in self.cache:
+            if label not in self.labels:
+                raise KeyError(label + " was not shared")
+            self.cache[key] = np.load(__array_file__(self.location, label, err),
+                                      mmap_mode = 'r')
+        return self.cache[key]
+
+    def load(self, labels):
+        """ Maps the arrays of several shared parameters, and evaluates
+        the quantities defined with :meth:`analysis.fom.Analyzer.define`
+        """
+        params, names = self.__split__(labels)
+        for label in params:
+            self.get_array(label)
+            self.get_array(label, err = True)
+        self.__store__(names)
+
+    def get_filenames(self):
+        """ Returns the filenames of the files of the shared data set
+
+        :rtype: list(string)
+        """
+        return list(self.files)
@@ -0,0 +1,267 @@
+"""
+
+.. module:: stats
+     :synopsis: Autocorrelation and effective sample size of FOM series
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+Successive FOM values of a simulation are computed from cumulative
+tallies and are therefore strongly correlated, so the plain variance of
+a series underestimates the uncertainty of its average. The tools here
+estimate the autocorrelation of every column of a series at once using
+FFTs, and from it the integrated autocorrelation time :math:`\\tau` and
+effective sample size :math:`n/\\tau`. The tail averages of every
+window size can be scanned at once to choose the averaging window.
+
+"""
+
+import numpy as np
+
+def autocorr(series):
+    """ Returns the normalized autocorrelation function of each column of
+    `series`, calculated with FFTs in :math:`O(n \log n)`. Constant columns
+    have an autocorrelation of 1 at lag 0 and 0 elsewhere.
+
+    :param series: data with one row per snapshot and one column per \
+                   series, or a single series.
+    :type series: :class:`numpy.ndarray`
+
+    :returns: array of the same shape as `series` (two dimensional), with \
+              the autocorrelation at lag `t` in row `t`.
+    :rtype: :class:`numpy.ndarray`
+    """
+    x = np.array(series, dtype = float)
+    if x.ndim == 1:
+        x = x[:,np.newaxis]
+    n = np.shape(x)[0]
+    x = x - np.mean(x, axis = 0)
+
+    # Zero-pad to avoid circular correlation
+    nfft = 2**int(np.ceil(np.log2(2*n)))
+    f = np.fft.rfft(x, n = nfft, axis = 0)
+    acf = np.fft.irfft(f * np.conj(f), n = nfft, axis = 0)[:n]
+
+    var = acf[0].copy()
+    constant = (var <= 0)
+    var[constant] = 1
+    acf = acf/var
+    acf[:,constant] = 0
+    acf[0,constant] = 1
+    return acf
+
+def int_time(series, c = 5.0):
+    """ Returns the integrated autocorrelation time of each column of
+    `series`,
+
+    .. math::
+
+       \\tau = 1 + 2 \\sum_{t=1}^{M} \\rho(t)
+
+    where the window :math:`M` is the smallest lag with :math:`M \\geq c \\tau`
+    (Sokal's automatic windowing). The result is bounded between 1 and
+    the length of the series.
+
+    :param series: data with one row per snapshot and one column per series.
+    :type series: :class:`numpy.ndarray`
+
+    :param c: window constant, 5 (default) is suitable for series that \
+              decorrelate roughly exponentially.
+    :type c: float
+
+    :rtype: :class:`numpy.ndarray`
+    """
+    acf = autocorr(series)
+    n = np.shape(acf)[0]
+    taus = 2*np.cumsum(acf, axis = 0) - 1
+    lags = np.arange(n)[:,np.newaxis]
+    window = (lags >= c*taus)
+
+    # First lag satisfying the window condition, or the last lag
+    m = np.where(np.any(window, axis = 0), np.argmax(window, axis = 0), n - 1)
+    tau = taus[m, np.arange(np.shape(acf)[1])]
+    return np.clip(tau, 1, n)
+
+def ess(series, c = 5.0):
+    """ Returns the effective sample size :math:`n/\\tau` of each column
+    of `series`.
+
+    :param series: data with one row per snapshot and one column per series.
+    :type series: :class:`numpy.ndarray`
+
+    :param c: window constant passed to :func:`int_time`.
+    :type c: float
+
+    :rtype: :class:`numpy.ndarray`
+    """
+    n = np.shape(series)[0]
+    return n/int_time(series, c)
+
+def tail(data, frac = 0.5):
+    """ Returns the last rows of `data`, starting at the fraction `frac`
+    of its length. The default matches the second half used by
+    :meth:`analysis.fom.Analyzer.get_var`.
+    """
+    return data[int(len(data)*frac):]
+
+def series_stats(series, c = 5.0):
+    """ Returns the mean, variance, integrated autocorrelation time,
+    effective sample size and standard error of the mean of each column
+    of `series`.
+
+    :param series: data with one row per snapshot and one column per series.
+    :type series: :class:`numpy.ndarray`
+
+    :param c: window constant passed to :func:`int_time`.
+    :type c: float
+
+    :returns: dictionary of arrays with keys `mean`, `var`, `tau`, `ess` \
+              and `err`.
+    :rtype: dict
+    """
+    x = np.array(series, dtype = float)
+    if x.ndim == 1:
+        x = x[:,np.newaxis]
+    n = np.shape(x)[0]
+    tau = int_time(x, c)
+    var = np.var(x, axis = 0)
+    return {'mean' : np.mean(x, axis = 0),
+            'var'  : var,
+            'tau'  : tau,
+            'ess'  : n/tau,
+            'err'  : np.sqrt(var*tau/n)}
+
+def analyzer_stats(analyzer, label, frac = 0.5, cpu = True, c = 5.0):
+    """ Returns :func:`series_stats` for the FOM of every group or matrix
+    entry of a Serpent parameter, using the tail of the series of an
+    :class:`analysis.fom.Analyzer`.
+
+    :param analyzer: data set to be analyzed.
+    :type analyzer: :class:`analysis.fom.Analyzer`
+
+    :param label: Serpent 2 output parameter
+    :type label: string
+
+    :param frac: fraction of the series skipped before the tail.
+    :type frac: float
+
+    :param cpu: If True (default), the FOM is calculated using the CPU \
+                time, otherwise the cycle number.
+    :type cpu: bool
+
+    :rtype: dict
+    """
+    return series_stats(tail(analyzer.get_fom_array(label, cpu), frac), c)
+
+def comparator_stats(comparator, label, frac = 0.5, cpu = True, c = 5.0):
+    """ Returns :func:`analyzer_stats` for every data set of an
+    :class:`analysis.fom.Comparator`. Data sets with tails of the same
+    length are stacked and transformed together.
+
+    :param comparator: data sets to be analyzed.
+    :type comparator: :class:`analysis.fom.Comparator`
+
+    :param label: Serpent 2 output parameter
+    :type label: string
+
+    :rtype: list(dict), in the order of the data sets.
+    """
+    tails = [tail(d.get_fom_array(label, cpu), frac) for d in comparator.data]
+
+    # Group data sets by tail length
+    lengths = {}
+    for i, t in enumerate(tails):
+        lengths.setdefault(len(t), []).append(i)
+
+    ans = [None]*len(tails)
+    for idx in lengths.values():
+        widths = np.cumsum([np.shape(tails[i])[1] for i in idx])[:-1]
+        stats = series_stats(np.hstack([tails[i] for i in idx]), c)
+        split = dict((key, np.split(val, widths)) for key, val in stats.items())
+        for j, i in enumerate(idx):
+            ans[i] = dict((key, val[j]) for key, val in split.items())
+    return ans
+
+def window_scan(series, c = None):
+    """ Returns the mean, variance and standard error of the last `w` rows
+    of each column of `series`, for every window size `w` at once. The
+    sums are accumulated from the end of the series, so the scan is
+    :math:`O(n)` instead of one average per window. Row `w - 1` of each
+    result matches :meth:`analysis.fom.Analyzer.get_avg` with `n = w`, and
+    the variance is the population variance used by
+    :meth:`analysis.fom.Analyzer.get_var`.
+
+    :param series: data with one row per snapshot, sorted by cycle, and \
+                   one column per series.
+    :type series: :class:`numpy.ndarray`
+
+    :param c: If None (default), the standard error assumes independent \
+              snapshots. Otherwise it is scaled by the integrated \
+              autocorrelation time of the second half of the series, \
+              see :func:`int_time` with window constant `c`.
+    :type c: float, optional
+
+    :returns: dictionary with the window sizes `n` and arrays with one row \
+              per window size and one column per series, with keys \
+              `mean`, `var` and `err`.
+    :rtype: dict
+    """
+    x = np.array(series, dtype = float)
+    if x.ndim == 1:
+        x = x[:,np.newaxis]
+    n = np.shape(x)[0]
+    w = np.arange(1, n + 1, dtype = float)[:,np.newaxis]
+
+    # Shifted by the mean to avoid cancellation in the variance
+    shift = np.mean(x, axis = 0)
+    r = (x - shift)[::-1]
+    s1 = np.cumsum(r, axis = 0)
+    s2 = np.cumsum(r**2, axis = 0)
+    mean = s1/w
+    var = np.maximum(s2/w - mean**2, 0)
+
+    tau = 1.0
+    if c is not None:
+        tau = int_time(tail(x), c)
+    return {'n' : w[:,0].astype(int),
+            'mean' : mean + shift,
+            'var' : var,
+            'err' : np.sqrt(var*tau/w)}
+
+def analyzer_scan(analyzer, label, mapping = None, cpu = True, c = None):
+    """ Returns :func:`window_scan` for the FOM of every group or matrix
+    entry of a Serpent parameter of an :class:`analysis.fom.Analyzer`.
+
+    :param analyzer: data set to be analyzed.
+    :type analyzer: :class:`analysis.fom.Analyzer`
+
+    :param label: Serpent 2 output parameter
+    :type label: string
+
+    :param mapping: If given, the FOM of each broad group of the mapping \
+                    is scanned instead, see \
+                    :meth:`analysis.fom.Analyzer.collapse` (which always \
+                    uses the CPU time).
+    :type mapping: list(list(int)), optional
+
+    :param cpu: If True (default), the FOM is calculated using the CPU \
+                time, otherwise the cycle number.
+    :type cpu: bool
+
+    :param c: window constant passed to :func:`window_scan`.
+    :type c: float, optional
+
+    :rtype: dict
+    """
+    if mapping is not None:
+        data = analyzer.collapse(label, mapping)[:,1:]
+    else:
+        data = analyzer.get_fom_array(label, cpu)
+    return window_scan(data, c)
+
+def comparator_scan(comparator, label, mapping = None, cpu = True, c = None):
+    """ Returns :func:`analyzer_scan` for every data set of an
+    :class:`analysis.fom.Comparator`.
+
+    :rtype: list(dict), in the order of the data sets.
+    """
+    return [analyzer_scan(d, label, mapping, cpu, c) for d in comparator.data]
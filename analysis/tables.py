@@ -0,0 +1,155 @@
+"""
+
+.. module:: tables
+     :synopsis: Vectorized FOM and ratio tables in LaTeX, CSV and Markdown
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+The tables of :func:`analysis.plot_tools.make_table` give, for each data
+set of a :class:`analysis.fom.Comparator`, the last FOM of a parameter,
+its uncertainty (the standard deviation of the FOM over the second half
+of the snapshots) and the ratio of both to the data set with
+:math:`t_{wdt} = 0.1`. Here they are computed for many parameters and
+groups at once: the FOM of every group of a parameter is built once per
+data set, and the values, uncertainties and ratios of all groups and data
+sets are computed as arrays. Columns are then formatted in bulk::
+
+    df = tables.compute(comp, ['INF_FLX', 'INF_TOT'], [1, 2])
+    text = tables.render(df, fom_p = 2, fmt = 'latex')
+
+"""
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['twdt', 'fom', 'fom_err', 'r', 'r_err']
+
+def compute(comp, labels, grps, cycle_caps = []):
+    """ Returns the FOM, uncertainty and ratios of several parameters and
+    groups for every data set of a Comparator, as in
+    :func:`analysis.plot_tools.get_fom` and
+    :func:`analysis.plot_tools.get_ratios` without CPU time correction.
+
+    :param comp: data sets, named by their :math:`t_{wdt}`. One of them \
+                 must be named 0.1.
+    :type comp: :class:`analysis.fom.Comparator`
+
+    :param labels: Serpent 2 output parameter(s)
+    :type labels: string or list(string)
+
+    :param grps: group(s), or matrix entries as flattened indices \
+                 starting at 1.
+    :type grps: int or list(int)
+
+    :param cycle_caps: pairs of data set name and cycle; snapshots of that \
+                       data set at or after the cycle are ignored for the \
+                       FOM value.
+    :type cycle_caps: list(tuple)
+
+    :returns: table with the columns `label`, `grp`, `twdt`, `fom`, \
+              `fom_err`, `r` and `r_err`, one row per parameter, group \
+              and data set, in that order.
+    :rtype: :class:`pandas.DataFrame`
+    """
+    if type(labels) is not list:
+        labels = [labels]
+    if type(grps) is not list:
+        grps = [grps]
+    cols = np.array(grps) - 1
+    x = [float(d.name) for d in comp.data]
+    base = x.index(0.1)
+    caps = dict((str(name), cycle) for name, cycle in cycle_caps)
+
+    # Row of the last value and first row of the variance, per data set
+    last, orders = [], []
+    for d in comp.data:
+        cycles = d.get_x(cycle = True)
+        order = np.argsort(cycles)
+        kept = np.flatnonzero(cycles[order] < caps.get(d.name, np.inf))
+        last.append(order[kept[-1]])
+        orders.append(order)
+
+    frames = []
+    for label in labels:
+        # (data sets, groups) arrays of the FOM and its uncertainty
+        y = np.empty((len(comp.data), len(cols)))
+        yerr = np.empty_like(y)
+        for i, d in enumerate(comp.data):
+            fom = d.get_fom_array(label)[:,cols]
+            y[i] = fom[last[i]]
+            yerr[i] = np.std(fom[orders[i][d.n//2:]], axis = 0)
+
+        r = np.ones_like(y)
+        rerr = np.zeros_like(y)
+        others = np.arange(len(x)) != base
+        r[others] = y[others]/y[base]
+        rerr[others] = r[others]*np.sqrt(np.power(yerr[others]/y[others], 2) +
+                                         np.power(yerr[base]/y[base], 2))
+
+        n = len(x)
+        frames.append(pd.DataFrame({'label' : [label]*n*len(cols),
+                                    'grp' : np.repeat(grps, n),
+                                    'twdt' : np.tile(x, len(cols)),
+                                    'fom' : y.T.ravel(),
+                                    'fom_err' : yerr.T.ravel(),
+                                    'r' : r.T.ravel(),
+                                    'r_err' : rerr.T.ravel()},
+                                   columns = ['label', 'grp'] + COLUMNS))
+    return pd.concat(frames, ignore_index = True)
+
+def format_columns(df, fom_p, rat_p = 3):
+    """ Returns a copy of a table with the FOM columns divided by
+    :math:`10^{fom_p}` and rounded to integers, and the ratio columns with
+    `rat_p` decimals, as strings.
+
+    :param df: table with the columns `fom`, `fom_err`, `r` and `r_err`.
+    :type df: :class:`pandas.DataFrame`
+
+    :rtype: :class:`pandas.DataFrame`
+    """
+    df = df.copy()
+    scale = np.power(10.0, fom_p)
+    for col in ['fom', 'fom_err']:
+        df[col] = np.char.mod('%.0f', np.around(df[col].values/scale))
+    for col in ['r', 'r_err']:
+        df[col] = np.char.mod('%.' + str(rat_p) + 'f', df[col].values)
+    return df
+
+def render(df, fom_p, rat_p = 3, fmt = 'latex'):
+    """ Returns the columns `twdt`, `fom`, `fom_err`, `r` and `r_err` of a
+    table as text, see :func:`format_columns`.
+
+    :param df: table of one parameter and group, see :func:`compute`.
+    :type df: :class:`pandas.DataFrame`
+
+    :param fmt: 'latex', 'csv' or 'markdown'.
+    :type fmt: string
+
+    :rtype: string
+    """
+    df = format_columns(df[COLUMNS], fom_p, rat_p)
+    if fmt == 'latex':
+        return df.to_latex(index = False, escape = False,
+                           column_format = 'r'*len(COLUMNS))
+    elif fmt == 'csv':
+        return df.to_csv(index = False)
+    elif fmt == 'markdown':
+        cells = np.column_stack([np.char.mod('%g', df['twdt'].values)] +
+                                [df[c].values.astype(str) for c in COLUMNS[1:]])
+        lines = ['| ' + ' | '.join(COLUMNS) + ' |',
+                 '|' + '---:|'*len(COLUMNS)]
+        lines += ['| ' + ' | '.join(row) + ' |' for row in cells]
+        return '\n'.join(lines) + '\n'
+    raise ValueError("Unknown table format " + str(fmt))
+
+def make_tables(comp, labels, grps, fom_p, rat_p = 3, cycle_caps = [],
+                fmt = 'latex'):
+    """ Returns one table per parameter and group, see :func:`compute`
+    and :func:`render`.
+
+    :returns: text of each table, keyed by (label, grp).
+    :rtype: dict
+    """
+    df = compute(comp, labels, grps, cycle_caps)
+    return dict(((label, grp), render(part, fom_p, rat_p, fmt))
+                for (label, grp), part in df.groupby(['label', 'grp'], sort = False))
@@ -0,0 +1,105 @@
+"""
+
+.. module:: throughput
+     :synopsis: Transport throughput in cycles per CPU time
+
+.. moduleauthor:: Joshua Rehak <jsrehak@berkeley.edu>
+
+The throughput of a simulation between two snapshots is the number of
+cycles run divided by the CPU time spent. Rates are calculated from the
+cycle and CPU time vectors stored by each :class:`analysis.fom.Analyzer`,
+without reading the files again.
+
+"""
+
+import numpy as np
+
+def rates(analyzer):
+    """ Returns the cycles per CPU time between successive snapshots of an
+    :class:`analysis.fom.Analyzer`, sorted by cycle number. Intervals with
+    no CPU time are returned as `nan`.
+
+    :rtype: :class:`numpy.ndarray`
+    """
+    return __rate__(np.diff(analyzer.get_x(cycle = True)),
+                    np.diff(analyzer.get_x(cycle = False)))
+
+def rolling(analyzer, window = 10):
+    """ Returns the cycles per CPU time over `window` successive intervals,
+    for every position of the window.
+
+    :param analyzer: data set to be analyzed.
+    :type analyzer: :class:`analysis.fom.Analyzer`
+
+    :param window: number of intervals in the window.
+    :type window: int
+
+    :rtype: :class:`numpy.ndarray`
+    """
+    cycles = analyzer.get_x(cycle = True)
+    cpu = analyzer.get_x(cycle = False)
+    return __rate__(cycles[window:] - cycles[:-window],
+                    cpu[window:] - cpu[:-window])
+
+def outliers(rate, threshold = 3.5):
+    """ Returns a boolean array marking the rates that are outliers, using
+    the modified z-score
+
+    .. math::
+
+       z = 0.6745 (r - \\tilde{r})/\\mathrm{MAD}
+
+    where :math:`\\tilde{r}` is the median rate and MAD the median absolute
+    deviation. The median is insensitive to the outliers themselves, unlike
+    the mean and standard deviation.
+
+    :param rate: rates, as returned by :func:`rates`.
+    :type rate: :class:`numpy.ndarray`
+
+    :param threshold: largest accepted absolute z-score.
+    :type threshold: float
+
+    :rtype: :class:`numpy.ndarray`
+    """
+    rate = np.asarray(rate, dtype = float)
+    median = np.nanmedian(rate)
+    mad = np.nanmedian(np.abs(rate - median))
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        z = 0.6745*(rate - median)/mad
+    if mad == 0:
+        z = np.where(rate == median, 0, np.inf)
+    return ~(np.abs(z) <= threshold)
+
+def throughput(comparator, window = 10, threshold = 3.5):
+    """ Returns the throughput of every data set of an
+    :class:`analysis.fom.Comparator`.
+
+    :param comparator: data sets to be analyzed.
+    :type comparator: :class:`analysis.fom.Comparator`
+
+    :param window: number of intervals in the rolling rates.
+    :type window: int
+
+    :param threshold: largest accepted absolute z-score, see :func:`outliers`.
+    :type threshold: float
+
+    :returns: dictionary keyed by data set name, each a dictionary with the \
+              interval `rate`, the `rolling` rate, the `average` rate, and \
+              the `outliers`, the indices of the snapshots ending an \
+              outlying interval.
+    :rtype: dict
+    """
+    ans = {}
+    for d in comparator.data:
+        rate = rates(d)
+        ans[d.name] = {'rate' : rate,
+                       'rolling' : rolling(d, window),
+                       'average' : np.nanmean(rate),
+                       'outliers' : np.nonzero(outliers(rate, threshold))[0] + 1}
+    return ans
+
+def __rate__(dcycles, dcpu):
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        rate = np.divide(dcycles, dcpu)
+    rate[dcpu == 0] = np.nan
+    return rate
@@ -0,0 +1,45 @@
+from nose.tools import *
+import analysis.fom as fom
+import analysis.align as align
+import numpy as np
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.comp = fom.Comparator(['./tests/fom_data/', './tests/fom_data/'], ['0.1', '0.2'])
+
+    def test_interp_columns(self):
+        """ Interpolation should match numpy for every column """
+        x = np.array([1.0, 2.0, 4.0, 8.0])
+        y = np.column_stack((x**2, np.sqrt(x)))
+        grid = np.array([1.0, 1.5, 3.0, 7.9, 8.0])
+        ans = align.interp(x, y, grid)
+        for j in range(2):
+            ok_(np.allclose(ans[:,j], np.interp(grid, x, y[:,j])))
+
+    def test_interp_outside(self):
+        """ Points outside the data should be nan """
+        ans = align.interp([1.0, 2.0], [[1.0], [2.0]], [0.5, 2.5])
+        ok_(np.all(np.isnan(ans)))
+
+    def test_common_grid(self):
+        """ The default grid should be the snapshots of the first data set """
+        ok_(np.allclose(align.common_grid(self.comp), [10, 20, 30]))
+        ok_(np.allclose(align.common_grid(self.comp, cycle=False, n=3), [10.5, 20.5, 30.5]))
+
+    def test_align_shape(self):
+        """ Aligned data should have one entry per data set """
+        grid, data = align.align(self.comp, 'TEST_MAT', grid=np.array([15.0, 25.0]))
+        eq_(np.shape(data), (2, 2, 4))
+
+    def test_align_values(self):
+        """ Aligned FOM should be interpolated between snapshots """
+        grid, data = align.align(self.comp, 'TEST_VAL', grid=np.array([15.0]))
+        fom = self.comp.data[0].get_data('TEST_VAL', 1)[:,1]
+        ok_(np.isclose(data[0,0,0], np.mean(fom[:2])))
+
+    def test_ratio(self):
+        """ Identical data sets should have a ratio of 1 """
+        grid, r = align.ratio(self.comp, 'TEST_VAL', base='0.1')
+        ok_(np.allclose(r, 1))
@@ -0,0 +1,52 @@
+from nose.tools import *
+import analysis.fom as fom
+import analysis.bootstrap as bootstrap
+import numpy as np
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.comp = fom.Comparator(['./tests/fom_data/', './tests/fom_data/'], ['0.1', '0.2'])
+        cls.rng = np.random.RandomState(0)
+        cls.iid = cls.rng.normal(size=(5000, 3))
+
+    def test_block_means_shape(self):
+        """ Block bootstrap should return one row per resample """
+        means = bootstrap.block_means(self.iid, 250, 4, np.random.RandomState(1))
+        eq_(np.shape(means), (250, 3))
+
+    def test_block_means_spread(self):
+        """ Block bootstrap spread should match the standard error of iid data """
+        means = bootstrap.block_means(self.iid, 500, 1, np.random.RandomState(1))
+        ok_(np.allclose(np.std(means, axis=0), 1/np.sqrt(5000), rtol=0.2))
+
+    def test_batch_means(self):
+        """ Batch means should match the mean and standard error of iid data """
+        mean, err = bootstrap.batch_means(self.iid, 20)
+        ok_(np.allclose(mean, np.mean(self.iid, axis=0)))
+        ok_(np.allclose(err, 1/np.sqrt(5000), rtol=0.5))
+
+    def test_bootstrap_keys(self):
+        """ Bootstrap should return results for every parameter requested """
+        ans = bootstrap.bootstrap(self.comp, ['TEST_VAL', 'TEST_MAT'], n_boot=50)
+        eq_(sorted(ans.keys()), ['TEST_MAT', 'TEST_VAL'])
+        eq_(np.shape(ans['TEST_MAT']['fom_lo']), (2, 4))
+
+    def test_bootstrap_base_ratio(self):
+        """ The ratio of the base data set to itself should be 1 """
+        ans = bootstrap.bootstrap(self.comp, 'TEST_VAL', n_boot=50, base='0.1')
+        ok_(np.allclose(ans['TEST_VAL']['ratio'][0], 1))
+        ok_(np.allclose(ans['TEST_VAL']['ratio_lo'][0], 1))
+
+    def test_bootstrap_interval(self):
+        """ Confidence intervals should contain the average FOM """
+        ans = bootstrap.bootstrap(self.comp, 'TEST_VAL', n_boot=50)['TEST_VAL']
+        ok_(np.all(ans['fom_lo'] <= ans['fom']))
+        ok_(np.all(ans['fom'] <= ans['fom_hi']))
+
+    def test_bootstrap_reproducible(self):
+        """ Results should not depend on the number of processes """
+        serial = bootstrap.bootstrap(self.comp, 'TEST_VAL', n_boot=50, seed=3)
+        pool = bootstrap.bootstrap(self.comp, 'TEST_VAL', n_boot=50, seed=3, processes=2)
+        ok_(np.array_equal(serial['TEST_VAL']['ratio_hi'], pool['TEST_VAL']['ratio_hi']))
@@ -0,0 +1,54 @@
+from nose.tools import *
+import analysis.fom as fom
+import analysis.catalog as catalog
+import numpy as np
+import os, shutil, tempfile
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.dir = tempfile.mkdtemp()
+        cls.catalog = catalog.Catalog(os.path.join(cls.dir, 'catalog.db'))
+        cls.comp = cls.catalog.load(['./tests/fom_data/', './tests/fom_data/'],
+                                    ['0.1', '0.2'], 'test',
+                                    [('TEST_VAL', 1), ('TEST_MAT', 2)])
+
+    @classmethod
+    def teardown_class(cls):
+        cls.catalog.close()
+        shutil.rmtree(cls.dir)
+
+    def test_studies(self):
+        """ The catalog should list the recorded studies """
+        eq_(self.catalog.studies(), ['test'])
+
+    def test_sweeps(self):
+        """ The catalog should list the data sets of a study """
+        sweeps = self.catalog.sweeps('test')
+        eq_([s[0] for s in sweeps], ['0.1', '0.2'])
+        eq_(sweeps[0][2], 3)
+
+    def test_labels(self):
+        """ The catalog should list the parameters of a data set """
+        labels = dict(self.catalog.labels('test', '0.1'))
+        eq_(labels['TEST_MAT'], 8)
+
+    def test_query_summary(self):
+        """ Recorded averages should match the Analyzer """
+        rows = self.catalog.query('TEST_VAL', 1)
+        eq_(len(rows), 2)
+        ok_(np.isclose(rows[0][3], self.comp.data[0].get_avg('TEST_VAL', 1)))
+        ok_(np.isclose(rows[1][5], 1.0))
+
+    def test_query_ratio(self):
+        """ Queries should filter on the FOM ratio """
+        eq_(len(self.catalog.query('TEST_MAT', 2, min_ratio=1.2)), 0)
+        eq_(len(self.catalog.query('TEST_MAT', 2, min_ratio=0.9)), 2)
+
+    def test_record_replaces(self):
+        """ Recording a study again should replace the earlier record """
+        self.catalog.record(self.comp, 'test', [('TEST_VAL', 1)])
+        eq_(len(self.catalog.query('TEST_VAL', 1)), 2)
+        eq_(len(self.catalog.query('TEST_MAT', 2)), 0)
+        self.catalog.record(self.comp, 'test', [('TEST_VAL', 1), ('TEST_MAT', 2)])
@@ -0,0 +1,83 @@
+from nose.tools import *
+import analysis.fom as fom
+import analysis.convergence as convergence
+import numpy as np
+import os, shutil, tempfile
+
+def write_res(location, cycle, errors):
+    """ Writes a minimal result file with the given errors """
+    vals = ' '.join(['1.00000E+00 %.5e' % e for e in errors])
+    with open(os.path.join(location, 'res_%d.m' % cycle), 'w') as f:
+        f.write("CYCLE_IDX                 (idx, 1)        = %d ;\n" % cycle)
+        f.write("TOT_CPU_TIME              (idx, 1)        =  %.1f ;\n" % cycle)
+        f.write("TEST_VAL                  (idx, [1:   4]) = [  %s ];\n" % vals)
+
+class RampAnalyzer():
+    """ Exact FOM series: a constant group and a noiseless linear ramp """
+
+    def get_fom_array(self, label, cpu = True):
+        i = np.arange(80.0)
+        return np.column_stack((np.full(80, 1e4), 1e4 + 3*i))
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.location = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        # Group 1 has a constant FOM, group 2 a FOM growing with cycles
+        for c in range(10, 410, 10):
+            fom1 = 1e4*(1 + 0.01*rng.normal())
+            fom2 = 10*c
+            write_res(cls.location, c, [np.sqrt(1.0/(fom1*c)), np.sqrt(1.0/(fom2*c))])
+        cls.test_analyzer = fom.Analyzer(cls.location)
+
+    @classmethod
+    def teardown_class(cls):
+        shutil.rmtree(cls.location)
+
+    def test_check_verdicts(self):
+        """ A stationary group should converge and a drifting one should not """
+        ans = convergence.check(self.test_analyzer, 'TEST_VAL')
+        ok_(np.array_equal(ans['converged'], [True, False]))
+        ok_(ans['drift'][1] > 0.5)
+
+    def test_check_noiseless_ramp(self):
+        """ A ramp without noise should drift with an infinite statistic """
+        ans = convergence.check(RampAnalyzer(), 'TEST_VAL')
+        eq_(ans['t'][0], 0)
+        ok_(np.isinf(ans['t'][1]))
+        ok_(ans['drift'][1] > 0.01)
+        ok_(np.array_equal(ans['converged'], [True, False]))
+
+    def test_check_groups(self):
+        """ Only the requested groups should be checked """
+        ans = convergence.check(self.test_analyzer, 'TEST_VAL', grps=[2])
+        eq_(len(ans['converged']), 1)
+
+    def test_check_too_short(self):
+        """ Series shorter than the minimum should not be converged """
+        ans = convergence.check(self.test_analyzer, 'TEST_VAL', min_pts=100)
+        ok_(not np.any(ans['converged']))
+
+    def test_monitor_incremental(self):
+        """ Monitor should pick up new snapshots and write the flag """
+        location = tempfile.mkdtemp()
+        flag = os.path.join(location, 'converged.flag')
+        try:
+            for c in range(10, 110, 10):
+                write_res(location, c, [np.sqrt(1e-4/c), np.sqrt(1e-4/c)])
+            monitor = convergence.Monitor(location, 'TEST_VAL', grps=[1], flag=flag)
+            ok_(not monitor.update())
+            ok_(not os.path.exists(flag))
+            for c in range(110, 410, 10):
+                write_res(location, c, [np.sqrt(1e-4/c), np.sqrt(1e-4/c)])
+            ok_(monitor.update())
+            eq_(monitor.analyzer.n, 40)
+            ok_(os.path.exists(flag))
+        finally:
+            shutil.rmtree(location)
+
+    def test_refresh(self):
+        """ Refreshing without new files should not upload anything """
+        eq_(self.test_analyzer.refresh(), 0)
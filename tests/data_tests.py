@@ -1,6 +1,7 @@
 from nose.tools import *
 import analysis.core as wdt
 import numpy as np
+import os, shutil, tempfile
 
 class TestClass:
 
@@ -82,3 +83,130 @@ class TestClass:
                          0.00000000e+00, 0.00000000e+00, 0.00000000e+00,
                          0.00000000e+00, 0.00000000e+00, 0.00000000e+00])
         ok_(np.allclose(fom, self.data.get_fom('INF_SP0', reshape=True)[0]))
+
+class TestCompactClass:
+
+    @classmethod
+    def setup_class(cls):
+        filename = './tests/wdt_runs/S0100/W0100/runs/run1_res.m'
+        cls.full = wdt.DataFile(filename)
+        cls.data = wdt.CompactDataFile(filename)
+
+    def test_CompactDataFile_no_dict(self):
+        """ CompactDataFile should not carry a per-instance dictionary """
+        ok_(not hasattr(self.data, '__dict__'))
+
+    def test_CompactDataFile_dtype(self):
+        """ CompactDataFile should store values and errors in single precision """
+        eq_(np.float32, self.data.get_data('INF_FLX').dtype)
+        eq_(np.float32, self.data.get_data('INF_FLX', err=True).dtype)
+
+    def test_CompactDataFile_values(self):
+        """ CompactDataFile values and errors should match DataFile """
+        for err in [False, True]:
+            ok_(np.allclose(self.full.get_data('INF_S0', err=err, reshape=True),
+                            self.data.get_data('INF_S0', err=err, reshape=True),
+                            rtol=1e-6))
+
+    def test_CompactDataFile_CPU(self):
+        """ CompactDataFile should keep the CPU time in double precision """
+        eq_(self.full.get_cpu(), self.data.get_cpu())
+
+    def test_CompactDataFile_FOM_values(self):
+        """ Single precision storage should not change the FOM beyond rounding """
+        ok_(np.allclose(self.full.get_fom('INF_FLX'), self.data.get_fom('INF_FLX'),
+                        rtol=1e-6, atol=0))
+
+    def test_CompactDataFile_FOM_of_constant(self):
+        """ Requesting the FOM of a constant should return 0 """
+        eq_(0, self.data.get_fom('TOT_CPU_TIME'))
+
+    def test_CompactDataFile_all_data(self):
+        """ Rebuilt data should have the same labels and shapes as DataFile """
+        full = self.full.all_data()
+        data = self.data.all_data()
+        eq_(sorted(full.keys()), sorted(data.keys()))
+        eq_(np.shape(full['ANA_KEFF']), np.shape(data['ANA_KEFF']))
+
+    def test_CompactDataFile_universes(self):
+        """ Every universe of a multi-universe file should be kept """
+        folder = tempfile.mkdtemp()
+        try:
+            text = open('./tests/fom_data/res_10.m').read()
+            filename = os.path.join(folder, 'multi_res.m')
+            with open(filename, 'w') as f:
+                f.write(text + text.replace('1.23456E+02 0.00030', '5.00000E+01 0.00050'))
+            full = wdt.DataFile(filename).all_data()
+            data = wdt.CompactDataFile(filename).all_data()
+            eq_(np.shape(data['TEST_VAL']), (2, 4))
+            ok_(np.allclose(full['TEST_VAL'], data['TEST_VAL']))
+            ok_(np.allclose(full['TEST_MAT'], data['TEST_MAT']))
+            ok_(np.array_equal(wdt.DataFile(filename).get_data('TEST_MAT', err=True),
+                               wdt.CompactDataFile(filename, np.float64).get_data('TEST_MAT', err=True)))
+        finally:
+            shutil.rmtree(folder)
+
+    @raises(KeyError)
+    def test_CompactDataFile_bad_label(self):
+        """ Sending a bad Serpent parameter should return a key error """
+        self.data.get_data('WRONG_LABEL')
+
+class TestTemplateClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.filename = './tests/wdt_runs/S0100/W0100/runs/run1_res.m'
+        cls.data = wdt.serpent.parse_res(cls.filename)
+        cls.template = wdt.ResTemplate(cls.filename, cls.data)
+        cls.dir = tempfile.mkdtemp()
+
+    @classmethod
+    def teardown_class(cls):
+        shutil.rmtree(cls.dir)
+
+    def __write__(self, name, lines):
+        file_name = os.path.join(self.dir, name)
+        with open(file_name, 'w') as f:
+            f.writelines(lines)
+        return file_name
+
+    def test_template_valid(self):
+        """ A template should reproduce the file it was learned from """
+        ok_(self.template.valid)
+        data = self.template.parse(self.filename)
+        eq_(sorted(data.keys()), sorted(self.data.keys()))
+        eq_(np.shape(data['CYCLE_IDX']), np.shape(self.data['CYCLE_IDX']))
+        ok_(np.array_equal(data['INF_S0'], self.data['INF_S0']))
+        eq_(data['VERSION'].tolist(), self.data['VERSION'].tolist())
+
+    def test_template_other_file(self):
+        """ Files with the same layout should be read with the template """
+        lines = open(self.filename).readlines()
+        lines = [l.replace("'run1'", "'run22'").replace('1.77253E+00', '1.77254E+00')
+                 for l in lines]
+        file_name = self.__write__('other_res.m', lines)
+        data = self.template.parse(file_name)
+        eq_(data['INPUT_FILE_NAME'].tolist(), ['run22'])
+        ok_(np.array_equal(data['ANA_KEFF'], wdt.serpent.parse_res(file_name)['ANA_KEFF']))
+
+    def test_template_mismatch(self):
+        """ Files with another layout should not be read with the template """
+        lines = open(self.filename).readlines()
+        file_name = self.__write__('short_res.m', [l for l in lines
+                                                   if not l.startswith('ANA_KEFF')])
+        eq_(self.template.parse(file_name), None)
+
+    def test_parse_res_fallback(self):
+        """ parse_res should read every file of a folder like the general parser """
+        lines = open(self.filename).readlines()
+        folder = tempfile.mkdtemp(dir = self.dir)
+        first = os.path.join(folder, 'a_res.m')
+        second = os.path.join(folder, 'b_res.m')
+        shutil.copy(self.filename, first)
+        with open(second, 'w') as f:
+            f.writelines(lines + ['NEW_VAL (idx, [1:   2]) = [  1.0E+00 0.00100 ];\n'])
+        wdt.parse_res(first)
+        ok_(wdt.TEMPLATES[folder].valid)
+        data = wdt.parse_res(second)
+        ok_(np.array_equal(data['NEW_VAL'], wdt.serpent.parse_res(second)['NEW_VAL']))
+        ok_('NEW_VAL' in wdt.TEMPLATES[folder].parse(second))
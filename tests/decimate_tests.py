@@ -0,0 +1,61 @@
+from nose.tools import *
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import analysis.decimate as decimate
+import analysis.fom as fom
+import numpy as np
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.x = np.arange(1, 100001, dtype = float)
+        cls.y = np.sin(cls.x/100.0)
+        cls.y[5000] = 10.0
+
+    @classmethod
+    def teardown_class(cls):
+        plt.close('all')
+
+    def test_short_series(self):
+        """ Short series should be kept whole """
+        eq_(list(decimate.minmax(self.x[:10], self.y[:10], 20)), range(10))
+
+    def test_minmax(self):
+        """ Decimated series should be bounded and keep the extremes """
+        keep = decimate.minmax(self.x, self.y, 1000)
+        ok_(len(keep) <= 1000)
+        ok_(np.all(np.diff(keep) > 0))
+        ok_(5000 in keep)
+        ok_(np.argmin(self.y) in keep)
+        eq_(keep[0], 0)
+        eq_(keep[-1], len(self.x) - 1)
+
+    def test_linear_bins(self):
+        """ Series with non-positive abscissa should use linear bins """
+        keep = decimate.minmax(self.x - 10, self.y, 1000)
+        ok_(len(keep) <= 1000)
+        ok_(5000 in keep)
+
+    def test_scatter(self):
+        """ All series should be drawn as one collection """
+        plt.figure()
+        ax = decimate.scatter([(self.x, self.y), (self.x, -self.y)],
+                              [(0, 0, 1), (1, 0, 0)], ['a', 'b'], 500)
+        eq_(len(ax.collections), 1)
+        ok_(len(ax.collections[0].get_offsets()) <= 1000)
+        eq_([t.get_text() for t in ax.get_legend().get_texts()], ['a', 'b'])
+
+    def test_plots(self):
+        """ Analyzer and Comparator plots should draw one collection """
+        comp = fom.Comparator(['./tests/fom_data/', './tests/fom_data/'],
+                              ['0.1', '0.2'])
+        data = comp.data[0].get_data('TEST_VAL', [1, 2], plot = True)
+        ax = plt.gca()
+        eq_(len(ax.collections), 1)
+        eq_(len(ax.collections[0].get_offsets()), 6)
+        comp.plot('TEST_VAL', [1, 2])
+        ax = plt.gca()
+        eq_(len(ax.collections), 1)
+        eq_(len(ax.get_legend().get_texts()), 4)
@@ -0,0 +1,105 @@
+from nose.tools import *
+import analysis.fom as fom
+from analysis.derived import Param
+import numpy as np
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.base_dir = './tests/fom_data/'
+        cls.analyzer = fom.Analyzer(cls.base_dir)
+        cls.val = cls.analyzer.get_array('TEST_VAL')
+        cls.sig = cls.val*cls.analyzer.get_array('TEST_VAL', err = True)
+
+    def test_ratio(self):
+        """ Ratios should propagate relative errors in quadrature """
+        analyzer = fom.Analyzer(self.base_dir)
+        analyzer.define('RATIO', Param('TEST_VAL')[1]/Param('TEST_VAL')[2])
+        v = self.val[:,0]/self.val[:,1]
+        rel = np.hypot(self.sig[:,0]/self.val[:,0], self.sig[:,1]/self.val[:,1])
+        ok_(np.allclose(analyzer.get_array('RATIO')[:,0], v))
+        ok_(np.allclose(analyzer.get_array('RATIO', err = True)[:,0], rel))
+        ok_(np.allclose(analyzer.get_data('RATIO', 1)[:,1],
+                        1/(rel**2*analyzer.get_x(cycle = False))))
+
+    def test_sum(self):
+        """ Sums over groups should add errors in quadrature """
+        analyzer = fom.Analyzer(self.base_dir)
+        analyzer.define('TOTAL', 2*Param('TEST_VAL').sum() - 1)
+        v = 2*np.sum(self.val, axis = 1) - 1
+        sigma = 2*np.sqrt(np.sum(self.sig**2, axis = 1))
+        ok_(np.allclose(analyzer.get_array('TOTAL')[:,0], v))
+        ok_(np.allclose(analyzer.get_array('TOTAL', err = True)[:,0], sigma/v))
+
+    def test_shared_subterms(self):
+        """ Subterms shared between quantities should be evaluated once """
+        analyzer = fom.Analyzer(self.base_dir)
+        total = Param('TEST_VAL').sum()
+        analyzer.define('A', Param('TEST_VAL')/total)
+        analyzer.define('B', Param('TEST_VAL').sum()*Param('TEST_VAL'))
+        analyzer.get_array('A')
+        before = analyzer.cache[(('derived', total.key), False)]
+        analyzer.get_array('B')
+        ok_(analyzer.cache[(('derived', total.key), False)] is before)
+        eq_((Param('TEST_VAL')*total).key, (total*Param('TEST_VAL')).key)
+
+    def test_nested_definitions(self):
+        """ Defined quantities should be usable in other expressions """
+        comp = fom.Comparator([self.base_dir, self.base_dir], ['0.1', '0.2'])
+        comp.define('TOTAL', Param('TEST_VAL').sum())
+        comp.define('HALF', Param('TOTAL')/2)
+        for d in comp.data:
+            ok_(np.allclose(d.get_array('HALF')[:,0], np.sum(self.val, axis = 1)/2))
+            ok_(np.allclose(d.get_array('HALF', err = True), d.get_array('TOTAL', err = True)))
+
+    def test_zero_denominator(self):
+        """ Ratios with a zero denominator should be 0 """
+        analyzer = fom.Analyzer(self.base_dir)
+        analyzer.define('ZERO', Param('TEST_VAL')/(Param('TEST_VAL') - Param('TEST_VAL')))
+        eq_(np.count_nonzero(analyzer.get_array('ZERO')), 0)
+
+    def test_redefine(self):
+        """ Redefining a quantity should update quantities using it """
+        analyzer = fom.Analyzer(self.base_dir)
+        analyzer.define('X', Param('TEST_VAL')[1])
+        analyzer.define('Y', 2*Param('X'))
+        analyzer.get_array('Y')
+        analyzer.define('X', Param('TEST_VAL')[2])
+        ok_(np.allclose(analyzer.get_array('Y')[:,0], 2*self.val[:,1]))
+
+    def test_query(self):
+        """ Batch queries and summaries should accept defined quantities """
+        analyzer = fom.Analyzer(self.base_dir)
+        analyzer.define('TOTAL', Param('TEST_VAL').sum())
+        analyzer.define('HALF', Param('TOTAL')/2)
+        ans = analyzer.query([('HALF', 1), ('TEST_MAT', (2, 1))])
+        ok_(np.array_equal(ans[('HALF', 1, True, True)],
+                           analyzer.get_data('HALF', 1)))
+        ok_(np.allclose(analyzer.get_array('HALF')[:,0], np.sum(self.val, axis = 1)/2))
+
+        comp = fom.Comparator([self.base_dir, self.base_dir], ['0.1', '0.2'])
+        comp.define('TOTAL', Param('TEST_VAL').sum())
+        df = comp.summary([('TOTAL', 1)], 2)
+        eq_(list(df['label']), ['TOTAL', 'TOTAL'])
+
+    def test_shared_query(self):
+        """ Shared data sets should evaluate defined quantities """
+        import analysis.shared as shared
+        import shutil, tempfile
+        folder = tempfile.mkdtemp()
+        try:
+            s = shared.share(fom.Analyzer(self.base_dir), ['TEST_VAL'], folder)
+            s.define('TOTAL', Param('TEST_VAL').sum())
+            ans = s.query([('TOTAL', 1)])
+            ok_(np.allclose(s.get_array('TOTAL')[:,0], np.sum(self.val, axis = 1)))
+            eq_(list(ans.keys()), [('TOTAL', 1, True, True)])
+        finally:
+            shutil.rmtree(folder)
+
+    def test_replica_query(self):
+        """ Replica data sets should evaluate defined quantities """
+        analyzer = fom.ReplicaAnalyzer('./tests/replica_data/')
+        analyzer.define('TWICE', 2*Param('TEST_VAL'))
+        analyzer.query([('TWICE', 1)])
+        ok_(np.allclose(analyzer.get_array('TWICE'), 2*analyzer.get_array('TEST_VAL')))
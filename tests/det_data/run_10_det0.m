@@ -0,0 +1,16 @@
+
+DETflux = [
+    1    1    1    1    1    1    1    1    1    1  1.00000E+00  0.00200
+    2    2    1    1    1    1    1    1    1    1  2.00000E+00  0.00400
+    3    3    1    1    1    1    1    1    1    1  3.00000E+00  0.00100
+];
+
+DETfluxE = [
+  1.00000E-11  6.25000E-07  3.12500E-07
+  6.25000E-07  1.00000E-01  5.00003E-02
+  1.00000E-01  2.00000E+01  1.00500E+01
+];
+
+DETabs = [
+    1    1    1    1    1    1    1    1    1    1  5.00000E-01  0.01000
+];
@@ -0,0 +1,12 @@
+
+% Increase counter:
+
+if (exist('idx', 'var'));
+  idx = idx + 1;
+else;
+  idx = 1;
+end;
+
+CYCLE_IDX                 (idx, 1)        = 10 ;
+
+TOT_CPU_TIME              (idx, 1)        =  10.5 ;
@@ -0,0 +1,94 @@
+from nose.tools import *
+import analysis.core as core
+import analysis.fom as fom
+import numpy as np
+import os, shutil, tempfile
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.base_dir = './tests/det_data/'
+        cls.data = core.DetectorFile(cls.base_dir + 'run_10_det0.m')
+        cls.test_analyzer = fom.DetectorAnalyzer(cls.base_dir)
+        cls.cpu = np.array([10.5, 20.5])
+        cls.error = np.array([[0.002, 0.004, 0.001], [0.0014, 0.0028, 0.0007]])
+
+    def test_det_file_name(self):
+        """ Detector files should be recognized by their suffix """
+        ok_(core.is_det_file('run1_det0.m'))
+        ok_(not core.is_det_file('run1_res.m'))
+
+    def test_parse_det_projection(self):
+        """ Only the requested detectors and their grids should be read """
+        data = core.parse_det(self.base_dir + 'run_10_det0.m', ['flux'])
+        eq_(sorted(data.keys()), ['flux', 'fluxE'])
+        eq_(np.shape(data['flux']), (3, 12))
+
+    def test_parse_det_similar_names(self):
+        """ Detectors whose name starts with a requested one should be skipped """
+        location = tempfile.mkdtemp()
+        file_name = os.path.join(location, 'run_det0.m')
+        try:
+            with open(file_name, 'w') as f:
+                for name, value in [('1', 1.0), ('1E', 2.0), ('10', 3.0),
+                                    ('10E', 4.0), ('1PHI', 5.0)]:
+                    f.write('DET%s = [\n  1  %.5E  0.01000\n];\n\n' % (name, value))
+            data = core.parse_det(file_name, ['1'])
+            eq_(sorted(data.keys()), ['1', '1E', '1PHI'])
+            data = core.parse_det(file_name, ['10'])
+            eq_(sorted(data.keys()), ['10', '10E'])
+            ok_(np.allclose(data['10'], [[1, 3.0, 0.01]]))
+        finally:
+            shutil.rmtree(location)
+
+    def test_DetectorFile_values(self):
+        """ DetectorFile should return the detector values and errors """
+        ok_(np.allclose(self.data.get_data('flux'), [[1.0, 2.0, 3.0]]))
+        ok_(np.allclose(self.data.get_data('flux', err=True), self.error[0]))
+
+    def test_DetectorFile_bins(self):
+        """ DetectorFile should return the bin indices of each bin """
+        bins = self.data.get_bins('flux')
+        eq_(np.shape(bins), (3, 10))
+        ok_(np.array_equal(bins[:,1], [1, 2, 3]))
+
+    def test_DetectorFile_grid(self):
+        """ DetectorFile should keep the auxiliary arrays """
+        eq_(np.shape(self.data.get_grid('fluxE')), (3, 3))
+
+    def test_DetectorFile_cpu(self):
+        """ DetectorFile should read the CPU time from the result file """
+        eq_(10.5, self.data.get_cpu())
+        eq_(10, self.data.cycles)
+
+    def test_DetectorFile_FOM(self):
+        """ DetectorFile should return the FOM of each bin """
+        ans = np.power(self.cpu[0]*np.power(self.error[0], 2), -1)
+        ok_(np.allclose(self.data.get_fom('flux'), ans))
+
+    @raises(KeyError)
+    def test_DetectorFile_bad_name(self):
+        """ Sending a bad detector name should return a key error """
+        self.data.get_data('WRONG')
+
+    def test_DetectorAnalyzer_files(self):
+        """ DetectorAnalyzer should only upload detector files """
+        eq_(len(self.test_analyzer.get_filenames()), 2)
+
+    def test_Analyzer_skips_detectors(self):
+        """ Analyzer should not upload detector files """
+        analyzer = fom.Analyzer(self.base_dir)
+        ok_(all(f.endswith('_res.m') for f in analyzer.get_filenames()))
+
+    def test_DetectorAnalyzer_fom(self):
+        """ DetectorAnalyzer should return the FOM of a bin for each file """
+        data = self.test_analyzer.get_data('flux', 2)
+        ans = np.power(self.cpu*np.power(self.error[:,1], 2), -1)
+        ok_(np.allclose(data[:,1], ans))
+
+    def test_DetectorComparator_ratio(self):
+        """ DetectorComparator should compare detector FOM between data sets """
+        comp = fom.DetectorComparator([self.base_dir, self.base_dir], ['a', 'b'], detectors=['abs'])
+        names, data, error = comp.ratio('abs', 1, 1)
+        ok_(np.allclose(data, [1, 1]))
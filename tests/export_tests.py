@@ -0,0 +1,62 @@
+from nose.tools import *
+from nose.plugins.skip import SkipTest
+import analysis.fom as fom
+import analysis.export as export
+import numpy as np
+import shutil, tempfile
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.comp = fom.Comparator(['./tests/fom_data/', './tests/fom_data/'], ['0.1', '0.2'])
+        cls.frame = export.to_frame(cls.comp.data[0], ['TEST_VAL', 'TEST_MAT'])
+
+    def test_frame_columns(self):
+        """ The table should have the long-format columns """
+        eq_(list(self.frame.columns), export.COLUMNS)
+
+    def test_frame_rows(self):
+        """ There should be one row per file, parameter and group """
+        eq_(len(self.frame), 3*2 + 3*4)
+
+    def test_frame_fom(self):
+        """ Exported FOM should match the Analyzer """
+        rows = self.frame[(self.frame['label'] == 'TEST_MAT') & (self.frame['group'] == 3)]
+        data = self.comp.data[0].get_data('TEST_MAT', 3)
+        ok_(np.allclose(rows['cycle'], data[:,0]))
+        ok_(np.allclose(rows['fom'], data[:,1]))
+
+    def test_frame_values(self):
+        """ Exported values and errors should match the Analyzer """
+        rows = self.frame[(self.frame['label'] == 'TEST_VAL') & (self.frame['group'] == 2)]
+        ok_(np.allclose(rows['value'], 223.456))
+        ok_(np.allclose(rows['error'], [0.00032, 0.00022, 0.00012]))
+
+    def test_replica_frame(self):
+        """ Replica rows should list the files of each snapshot """
+        frame = export.to_frame(fom.ReplicaAnalyzer('./tests/replica_data/'), 'TEST_VAL')
+        eq_(len(frame), 2*2)
+        files = [sorted(f.split('/')[-1] for f in row.split(';'))
+                 for row in frame['file'][::2]]
+        eq_(files, [['run1_10_res.m', 'run2_10_res.m'],
+                    ['run1_20_res.m', 'run2_20_res.m', 'run3_20_res.m']])
+
+    def test_comparator_frame(self):
+        """ The comparator table should contain every data set """
+        frame = export.comparator_frame(self.comp, 'TEST_VAL')
+        eq_(sorted(frame['threshold'].unique()), ['0.1', '0.2'])
+        eq_(len(frame), 2*3*2)
+
+    def test_parquet(self):
+        """ The Parquet dataset should be partitioned by threshold and label """
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SkipTest('pyarrow is not installed')
+        path = tempfile.mkdtemp()
+        try:
+            export.to_parquet(self.comp, ['TEST_VAL'], path)
+            eq_(len(pq.ParquetDataset(path).read().to_pandas()), 2*3*2)
+        finally:
+            shutil.rmtree(path)
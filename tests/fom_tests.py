@@ -189,3 +189,51 @@ class TestClass:
         ans = np.var(fom[1:3])
         var = self.test_analyzer.get_var('TEST_VAL', 1)
         ok_(np.isclose(ans, var))
+
+    def test_fom_compact_average(self):
+        """ A compact Analyzer should give the same average FOM """
+        compact = fom.Analyzer(self.base_dir, compact=True)
+        ok_(np.isclose(compact.get_avg('TEST_VAL', 1),
+                       self.test_analyzer.get_avg('TEST_VAL', 1), rtol=1e-6))
+
+    def test_collapse_mapping_shape(self):
+        """ Collapsing with a group mapping should return one column per broad group """
+        data = self.test_analyzer.collapse('TEST_MAT', [[1,2], [3,4]])
+        eq_(np.shape(data), (3,3))
+
+    def test_collapse_mapping_values(self):
+        """ Each broad group should match collapsing its groups alone """
+        data = self.test_analyzer.collapse('TEST_MAT', [[1,2], [3,4]])
+        for j, grps in enumerate([[1,2], [3,4]]):
+            single = self.test_analyzer.get_collapse('TEST_MAT', grps)
+            ok_(np.allclose(data[:,[0,j+1]], single))
+
+    def test_collapse_mapping_error(self):
+        """ Collapsed errors should be the sum of the fine group errors """
+        data = self.test_analyzer.collapse('TEST_MAT', [[1,2], [3,4]], fom = False)
+        ok_(np.allclose(data[:,1], self.materror11 + self.materror12))
+        ok_(np.allclose(data[:,2], self.materror21 + self.materror22))
+
+    def test_query_single_traversal(self):
+        """ A batch query should build every parameter at once """
+        analyzer = fom.Analyzer(self.base_dir)
+        ans = analyzer.query([('TEST_VAL', [1, 2]), ('TEST_MAT', (2, 1), False, False)])
+        eq_(sorted(analyzer.cache.keys()), [('TEST_MAT', False), ('TEST_MAT', True),
+                                            ('TEST_VAL', False), ('TEST_VAL', True)])
+        eq_(len(ans), 3)
+        ok_(np.array_equal(ans[('TEST_VAL', 2, True, True)],
+                           self.test_analyzer.get_data('TEST_VAL', 2)))
+        ok_(np.array_equal(ans[('TEST_MAT', (2, 1), False, False)],
+                           self.test_analyzer.get_data('TEST_MAT', (2, 1), fom = False,
+                                                       cycle = False)))
+
+    def test_comparator_summary(self):
+        """ A batch summary should match the averages of each data set """
+        comp = fom.Comparator([self.base_dir, self.base_dir], ['0.1', '0.2'])
+        df = comp.summary([('TEST_VAL', [1, 2]), ('TEST_MAT', (1, 2))], 2)
+        eq_(len(df), 6)
+        row = df[(df['label'] == 'TEST_VAL') & (df['entry'] == 2)].iloc[0]
+        ok_(np.isclose(row['avg'], self.test_analyzer.get_avg('TEST_VAL', 2, 2)))
+        ok_(np.isclose(row['var'], self.test_analyzer.get_var('TEST_VAL', 2)))
+        ok_(np.allclose(df['ratio'], 1.0))
+        eq_(sorted(comp.query([('TEST_VAL', 1)]).keys()), ['0.1', '0.2'])
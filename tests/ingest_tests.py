@@ -0,0 +1,103 @@
+from nose.tools import *
+import analysis.core as core
+import analysis.fom as fom
+import numpy as np
+import os, shutil, tempfile
+
+class CountingAnalyzer(fom.Analyzer):
+    # Records the files read from disk
+    def __read__(self, file_loc):
+        self.reads = getattr(self, 'reads', []) + [os.path.basename(file_loc)]
+        return fom.Analyzer.__read__(self, file_loc)
+
+class TestClass:
+
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+        for name in ['res_10.m', 'res_20.m', 'res_30.m']:
+            shutil.copy(os.path.join('./tests/fom_data/', name), self.dir)
+        self.lines = open(os.path.join(self.dir, 'res_30.m')).readlines()
+
+    def teardown(self):
+        shutil.rmtree(self.dir)
+
+    def __write__(self, name, lines):
+        with open(os.path.join(self.dir, name), 'w') as f:
+            f.writelines(lines)
+
+    def test_is_complete(self):
+        """ Files cut in the middle of a line should be incomplete """
+        ok_(core.is_complete(os.path.join(self.dir, 'res_30.m')))
+        self.__write__('res_40.m', self.lines[:-1] + [self.lines[-1][:40]])
+        ok_(not core.is_complete(os.path.join(self.dir, 'res_40.m')))
+
+    def test_skip_truncated(self):
+        """ Truncated files should be skipped and read again on refresh """
+        self.__write__('res_40.m', self.lines[:-1] + [self.lines[-1][:40]])
+        self.__write__('res_50.m', [l for l in self.lines if 'TEST_MAT' not in l])
+        analyzer = fom.Analyzer(self.dir)
+        eq_(analyzer.n, 3)
+        eq_(sorted(os.path.basename(f) for f in analyzer.skipped), ['res_40.m', 'res_50.m'])
+        ok_('incomplete' in analyzer.skipped[self.dir + '/res_50.m'])
+
+        self.__write__('res_40.m', [l.replace('= 30', '= 40') for l in self.lines])
+        eq_(analyzer.refresh(), 1)
+        eq_(analyzer.n, 4)
+        eq_(sorted(os.path.basename(f) for f in analyzer.skipped), ['res_50.m'])
+
+    @raises(AssertionError)
+    def test_strict(self):
+        """ Strict uploads should raise the error """
+        self.__write__('res_40.m', self.lines[:-1] + [self.lines[-1][:40]])
+        fom.Analyzer(self.dir, strict = True)
+
+    def test_checkpoint(self):
+        """ A checkpoint should be used for the files that have not changed """
+        checkpoint = os.path.join(self.dir, 'load.pkl')
+        first = fom.Analyzer(self.dir, checkpoint = checkpoint, compact = True)
+        ok_(os.path.exists(checkpoint))
+
+        os.utime(os.path.join(self.dir, 'res_30.m'), (1, 1))
+        analyzer = CountingAnalyzer(self.dir, checkpoint = checkpoint, compact = True)
+        eq_(analyzer.n, 3)
+        eq_(analyzer.reads, ['res_30.m'])
+        ok_(analyzer.data[0] is not first.data[0])
+        ok_(analyzer.data[0].index is first.data[0].index)
+        ok_(np.array_equal(analyzer.get_array('TEST_VAL'), first.get_array('TEST_VAL')))
+
+    def test_comparator_checkpoint(self):
+        """ A Comparator should keep one checkpoint per data set """
+        folder = os.path.join(self.dir, 'checkpoints')
+        comp = fom.Comparator([self.dir, self.dir], ['0.1', '0.2'], checkpoint = folder)
+        eq_(sorted(os.listdir(folder)), ['0.1.pkl', '0.2.pkl'])
+
+    def test_truncated_first(self):
+        """ Files with fewer parameters than a later file should be dropped """
+        self.__write__('res_05.m', [l for l in self.lines if 'TEST_MAT' not in l])
+        analyzer = fom.Analyzer(self.dir)
+        eq_(analyzer.n, 3)
+        eq_(list(analyzer.skipped), [self.dir + '/res_05.m'])
+        ok_('incomplete' in analyzer.skipped[self.dir + '/res_05.m'])
+
+    def test_checkpoint_append(self):
+        """ Uploads should only append the new files to the checkpoint """
+        checkpoint = os.path.join(self.dir, 'load.pkl')
+        os.rename(os.path.join(self.dir, 'res_30.m'), os.path.join(self.dir, 'res_30.tmp'))
+        analyzer = fom.Analyzer(self.dir, checkpoint = checkpoint)
+        before = open(checkpoint, 'rb').read()
+
+        os.rename(os.path.join(self.dir, 'res_30.tmp'), os.path.join(self.dir, 'res_30.m'))
+        eq_(analyzer.refresh(), 1)
+        after = open(checkpoint, 'rb').read()
+        ok_(len(after) > len(before))
+        eq_(after[:len(before)], before)
+
+        # A record cut by an interrupted upload is left out and rewritten
+        with open(checkpoint, 'wb') as f:
+            f.write(after[:-10])
+        resumed = CountingAnalyzer(self.dir, checkpoint = checkpoint)
+        eq_(resumed.reads, ['res_30.m'])
+        eq_(resumed.n, 3)
+        again = CountingAnalyzer(self.dir, checkpoint = checkpoint)
+        eq_(getattr(again, 'reads', []), [])
+        ok_(np.array_equal(again.get_array('TEST_VAL'), analyzer.get_array('TEST_VAL')))
@@ -0,0 +1,104 @@
+from nose.tools import *
+import analysis.fom as fom
+import analysis.memory as memory
+import numpy as np
+import os, shutil, tempfile
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.base_dir = './tests/fom_data/'
+        cls.full = fom.Analyzer(cls.base_dir)
+
+    def test_budget_spill(self):
+        """ Arrays over the budget should be spilled, least recent first """
+        budget = memory.Budget(150)
+        cache = budget.cache('a')
+        cache['x'] = np.zeros(8)
+        cache['y'] = np.ones(8)
+        eq_(budget.resident, 128)
+        cache['x']
+        cache['z'] = np.ones(4)
+        eq_(budget.resident, 96)
+        eq_(budget.spilled, 64)
+        eq_(list(budget.report()['spilled']), [True, False, False])
+        ok_(isinstance(cache['y'], np.memmap))
+        ok_(np.array_equal(cache['y'], np.ones(8)))
+        eq_(sorted(cache.keys()), ['x', 'y', 'z'])
+        budget.close()
+        ok_(not os.path.exists(budget.scratch))
+
+    def test_comparator_budget(self):
+        """ A Comparator with a budget should give the same results """
+        comp = fom.Comparator([self.base_dir, self.base_dir], ['0.1', '0.2'],
+                              budget = 100)
+        for d in comp.data:
+            d.load(['TEST_VAL', 'TEST_MAT'])
+        ok_(comp.budget.resident <= 100)
+        ok_(comp.budget.spilled > 0)
+        for d in comp.data:
+            ok_(np.allclose(d.get_data('TEST_MAT', (2, 2)),
+                            self.full.get_data('TEST_MAT', (2, 2))))
+            eq_(d.get_avg('TEST_VAL', 1), self.full.get_avg('TEST_VAL', 1))
+        eq_(set(comp.budget.report()['owner']), set(['0.1', '0.2']))
+        comp.close()
+        ok_(not os.path.exists(comp.budget.scratch))
+
+        # Arrays are built again after closing
+        comp.data[0].load(['TEST_VAL', 'TEST_MAT'])
+        ok_(np.allclose(comp.data[0].get_data('TEST_MAT', (2, 2)),
+                        self.full.get_data('TEST_MAT', (2, 2))))
+        ok_(os.path.exists(comp.budget.scratch))
+        comp.close()
+
+    def test_sweep_budget(self):
+        """ Loaded data should be released from the files and stay in budget """
+        comp = fom.Comparator([self.base_dir, self.base_dir], ['0.1', '0.2'],
+                              budget = 200)
+        held = comp.budget.resident
+        ok_(held > 200)
+        for d in comp.data:
+            d.load(['TEST_VAL', 'TEST_MAT'])
+            ok_(all(f.is_released('TEST_MAT') for f in d.data))
+            eq_(sorted(d.data[0].get_labels()), sorted(self.full.data[0].get_labels()))
+        ok_(comp.budget.resident <= 200)
+        report = comp.budget.report()
+        eq_(report['bytes'].sum(), comp.budget.resident + comp.budget.spilled)
+        files = report[report['key'] == 'files']
+        eq_(sorted(files['owner']), ['0.1', '0.2'])
+        ok_(0 < files['bytes'].sum() < held)
+        for d in comp.data:
+            ok_(np.allclose(d.get_data('TEST_MAT', (2, 2)),
+                            self.full.get_data('TEST_MAT', (2, 2))))
+        comp.close()
+
+    def test_refresh_releases(self):
+        """ Rebuilding the arrays should keep those of released parameters """
+        budget = memory.Budget(10**6)
+        analyzer = fom.Analyzer(self.base_dir, budget = budget)
+        analyzer.get_array('TEST_VAL')
+        eq_(len(budget.entries), 2)
+        analyzer.__reindex__()
+        eq_(len(budget.entries), 2)
+        ok_(np.array_equal(analyzer.get_array('TEST_VAL', err = True),
+                           self.full.get_array('TEST_VAL', err = True)))
+        budget.close()
+
+    def test_refresh_merge(self):
+        """ New files should be merged into the arrays of released parameters """
+        location = tempfile.mkdtemp()
+        try:
+            for name in ['res_10.m', 'res_30.m']:
+                shutil.copy(os.path.join(self.base_dir, name), location)
+            budget = memory.Budget(10**6)
+            analyzer = fom.Analyzer(location, budget = budget)
+            analyzer.load(['TEST_MAT'])
+            shutil.copy(os.path.join(self.base_dir, 'res_20.m'), location)
+            eq_(analyzer.refresh(), 1)
+            ok_(all(f.is_released('TEST_MAT') for f in analyzer.data))
+            ok_(np.array_equal(analyzer.get_array('TEST_MAT'),
+                               self.full.get_array('TEST_MAT')))
+            budget.close()
+        finally:
+            shutil.rmtree(location)
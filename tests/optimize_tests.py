@@ -0,0 +1,49 @@
+from nose.tools import *
+import analysis.fom as fom
+import analysis.optimize as optimize
+import numpy as np
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.comp = fom.Comparator(['./tests/fom_data/', './tests/fom_data/'], ['0.2', '0.1'])
+        cls.x = np.arange(0.1, 1.05, 0.1)
+        cls.fom = 2 - np.power(cls.x - 0.42, 2)
+        cls.err = 0.01*np.ones_like(cls.x)
+
+    def test_combined_fom_normalized(self):
+        """ Identical data sets should have a normalized FOM of 1 """
+        x, y, err = optimize.combined_fom(self.comp, [('TEST_VAL', 1), ('TEST_MAT', 3)])
+        ok_(np.allclose(x, [0.1, 0.2]))
+        ok_(np.allclose(y, 1))
+
+    def test_fit_optimum_vertex(self):
+        """ The optimum should be the maximum of the fitted quadratic """
+        ans = optimize.fit_optimum(self.x, self.fom, self.err)
+        ok_(np.isclose(ans['optimum'], 0.42))
+        ok_(ans['optimum_err'] < 0.01)
+        ok_(np.isclose(ans['best'], 0.4))
+
+    def test_fit_optimum_suggest(self):
+        """ Suggested thresholds should be new and near the optimum """
+        ans = optimize.fit_optimum(self.x, self.fom, self.err)
+        ok_(len(ans['suggest']) > 0)
+        for s in ans['suggest']:
+            ok_(abs(s - 0.42) < 0.1)
+            ok_(np.min(np.abs(self.x - s)) > 1e-4)
+
+    def test_fit_optimum_edge(self):
+        """ A monotonic FOM should give the best simulated threshold """
+        ans = optimize.fit_optimum(self.x, self.x, self.err)
+        ok_(np.isclose(ans['optimum'], 1.0))
+        ok_(np.isnan(ans['optimum_err']))
+        ok_(all(0.9 < s < 1.0 for s in ans['suggest']))
+
+    def test_fit_optimum_exact(self):
+        """ An exact optimum should still suggest distinct thresholds """
+        ans = optimize.fit_optimum(self.x, self.fom, np.zeros_like(self.x), n_new = 3)
+        ok_(ans['optimum_err'] < 1e-6)
+        eq_(len(ans['suggest']), 3)
+        eq_(len(np.unique(np.round(ans['suggest'], 6))), 3)
+        ok_(all(0.3 < s < 0.5 for s in ans['suggest']))
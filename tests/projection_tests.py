@@ -0,0 +1,33 @@
+from nose.tools import *
+import analysis.fom as fom
+import analysis.projection as projection
+import numpy as np
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.comp = fom.Comparator(['./tests/fom_data/', './tests/fom_data/'], ['0.1', '0.2'])
+        cls.table = projection.project(cls.comp, ['TEST_VAL', 'TEST_MAT'], 1e-4)
+
+    def test_cycle_fit(self):
+        """ The fit of CPU time against cycles should recover the test data """
+        intercept, slope = projection.cycle_fit(self.comp.data[0])
+        ok_(np.isclose(intercept, 0.5))
+        ok_(np.isclose(slope, 1.0))
+
+    def test_project_rows(self):
+        """ There should be one row per data set, parameter and group """
+        eq_(len(self.table), 2*(2 + 4))
+
+    def test_project_cpu(self):
+        """ Projected CPU time should follow from the average FOM """
+        row = self.table[(self.table['label'] == 'TEST_VAL') & (self.table['group'] == 1)].iloc[0]
+        ok_(np.isclose(row['cpu'], 1/(row['fom']*1e-8)))
+        ok_(row['cpu_lo'] <= row['cpu'] <= row['cpu_hi'])
+        ok_(np.isclose(row['cycles'], row['cpu'] - 0.5))
+
+    def test_project_groups(self):
+        """ Only the requested groups should be projected """
+        table = projection.project(self.comp, 'TEST_MAT', 1e-4, grps=[2, 3])
+        ok_(np.array_equal(table['group'].unique(), [2, 3]))
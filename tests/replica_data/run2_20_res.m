@@ -0,0 +1,14 @@
+
+% Increase counter:
+
+if (exist('idx', 'var'));
+  idx = idx + 1;
+else;
+  idx = 1;
+end;
+
+CYCLE_IDX                 (idx, 1)        = 20 ;
+
+TOT_CPU_TIME              (idx, 1)        =  22.0 ;
+
+TEST_VAL                  (idx, [1:   4]) = [  1.06000E+02 0.01000  1.98000E+02 0.00500 ];
@@ -0,0 +1,63 @@
+from nose.tools import *
+import analysis.fom as fom
+import numpy as np
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.base_dir = './tests/replica_data/'
+        cls.analyzer = fom.ReplicaAnalyzer(cls.base_dir)
+        cls.values = np.array([[100, 200], [110, 190], [102, 200],
+                               [106, 198], [104, 202]], dtype = float)
+        cls.errors = np.array([[0.02, 0.01], [0.01, 0.01], [0.01, 0.005],
+                               [0.01, 0.005], [0.005, 0.01]])
+
+    def __combined__(self, rows):
+        # Inverse variance weighting of the given files
+        w = 1/(self.values[rows]*self.errors[rows])**2
+        mean = np.sum(w*self.values[rows], axis = 0)/np.sum(w, axis = 0)
+        return mean, 1/np.sqrt(np.sum(w, axis = 0))/mean
+
+    def test_snapshots(self):
+        """ Replicas should be grouped by cycle with summed time """
+        eq_(self.analyzer.n, 2)
+        ok_(np.array_equal(self.analyzer.snapshots, [10, 20]))
+        ok_(np.array_equal(self.analyzer.replicas, [2, 3]))
+        ok_(np.allclose(self.analyzer.get_x(cycle = False), [22.0, 63.0]))
+        ok_(np.allclose(self.analyzer.get_x(cycle = True), [20, 60]))
+
+    def test_combined(self):
+        """ Values and errors should be inverse variance weighted """
+        for i, rows in enumerate([[0, 1], [2, 3, 4]]):
+            mean, err = self.__combined__(rows)
+            ok_(np.allclose(self.analyzer.get_array('TEST_VAL')[i], mean))
+            ok_(np.allclose(self.analyzer.get_array('TEST_VAL', err = True)[i], err))
+
+    def test_fom(self):
+        """ The FOM should use the combined error and total CPU time """
+        mean, err = self.__combined__([2, 3, 4])
+        ok_(np.allclose(self.analyzer.get_fom_array('TEST_VAL')[1],
+                        1/(err**2*63.0)))
+        ok_(np.allclose(self.analyzer.get_data('TEST_VAL', 1)[:,0], [20, 60]))
+
+    def test_constant(self):
+        """ Parameters without error should be averaged """
+        ok_(np.allclose(self.analyzer.get_array('CYCLE_IDX')[:,0], [10, 20]))
+        ok_(np.array_equal(self.analyzer.get_array('CYCLE_IDX', err = True), [[0], [0]]))
+
+    def test_spread(self):
+        """ The spread should be the standard deviation of the replicas """
+        spread = self.analyzer.get_spread('TEST_VAL', fom = False)
+        ok_(np.allclose(spread[0], np.std(self.values[:2], axis = 0, ddof = 1)))
+        ok_(np.allclose(spread[1], np.std(self.values[2:], axis = 0, ddof = 1)))
+        fom_spread = self.analyzer.get_spread('TEST_VAL')
+        cpu = np.array([10.0, 12.0, 20.0, 22.0, 21.0])[:,np.newaxis]
+        ok_(np.allclose(fom_spread[1], np.std((1/(self.errors**2*cpu))[2:],
+                                              axis = 0, ddof = 1)))
+
+    def test_comparator(self):
+        """ ReplicaComparator should hold ReplicaAnalyzer objects """
+        comp = fom.ReplicaComparator([self.base_dir], ['0.1'])
+        ok_(isinstance(comp.data[0], fom.ReplicaAnalyzer))
+        eq_(comp.data[0].n, 2)
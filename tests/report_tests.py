@@ -0,0 +1,104 @@
+from nose.tools import *
+import analysis.report as report
+import analysis.plot_tools as plot_tools
+import os, shutil, tempfile, time
+
+BUILT = []
+
+def count_builder(comp, path, label):
+    # Writes the names of the data sets, and records the build
+    BUILT.append(os.path.basename(path))
+    with open(path, 'w') as f:
+        f.write(label + ' ' + ' '.join(d.name for d in comp.data))
+
+def failing_builder(comp, path):
+    raise ValueError("no figure")
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        report.BUILDERS['count'] = count_builder
+        report.BUILDERS['fail'] = failing_builder
+
+    @classmethod
+    def teardown_class(cls):
+        del report.BUILDERS['count']
+        del report.BUILDERS['fail']
+
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+        self.data = [os.path.join(self.dir, n) for n in ['a', 'b']]
+        for d in self.data:
+            shutil.copytree('./tests/fom_data/', d)
+        self.out = os.path.join(self.dir, 'out')
+        del BUILT[:]
+
+    def teardown(self):
+        shutil.rmtree(self.dir)
+
+    def declare(self, processes = 1):
+        rep = report.Report(self.out, processes)
+        rep.add('a.txt', 'count', [self.data[0]], ['0.1'], label = 'TEST_VAL')
+        rep.add('ab.txt', 'count', self.data, ['0.1', '0.2'], label = 'TEST_VAL')
+        rep.add('b.tex', 'table', [self.data[1], self.data[1]], ['0.1', '0.2'],
+                label = 'TEST_VAL', grp = 1, fom_p = 2)
+        return rep
+
+    def test_incremental(self):
+        """ Only outputs whose inputs changed should be rebuilt """
+        eq_(self.declare().build(), ['a.txt', 'ab.txt', 'b.tex'])
+        eq_(self.declare().build(), [])
+
+        # Touch a file of the second data set
+        name = sorted(os.listdir(self.data[1]))[0]
+        st = os.stat(os.path.join(self.data[1], name))
+        os.utime(os.path.join(self.data[1], name), (st.st_atime, st.st_mtime + 10))
+        eq_(self.declare().build(), ['ab.txt', 'b.tex'])
+
+        # Remove an output and change the arguments of another
+        os.remove(os.path.join(self.out, 'b.tex'))
+        rep = self.declare()
+        rep.add('a.txt', 'count', [self.data[0]], ['0.1'], label = 'TEST_MAT')
+        eq_(rep.build(), ['a.txt', 'b.tex'])
+        with open(os.path.join(self.out, 'a.txt')) as f:
+            eq_(f.read(), 'TEST_MAT 0.1')
+        eq_(rep.build(force = True), ['a.txt', 'ab.txt', 'b.tex'])
+
+    def test_parallel(self):
+        """ Outputs should be built by worker processes """
+        eq_(self.declare(processes = 2).build(), ['a.txt', 'ab.txt', 'b.tex'])
+        # Counted in the workers only
+        eq_(BUILT, [])
+        eq_(sorted(self.declare().manifest()), ['a.txt', 'ab.txt', 'b.tex'])
+
+    def test_failed(self):
+        """ Failed outputs should be rebuilt on the next build """
+        rep = self.declare()
+        rep.add('bad.pdf', 'fail', [self.data[0]], ['0.1'])
+        eq_(rep.build(), ['a.txt', 'ab.txt', 'b.tex'])
+        eq_(rep.failed, {'bad.pdf' : 'ValueError: no figure'})
+        eq_(sorted(rep.stale()), ['bad.pdf'])
+        eq_(BUILT, ['a.txt', 'ab.txt'])
+
+    def test_figures(self):
+        """ Figures should be saved in the format of their name """
+        # LaTeX is not needed to check the builds
+        plot_tools.USETEX = False
+        try:
+            rep = report.Report(self.out, 1)
+            for name, kind in [('ratios.png', 'ratios'), ('fom.pdf', 'fom')]:
+                rep.add(name, kind, self.data, ['0.1', '0.2'], casename = 'Test',
+                        label = 'TEST_VAL', grp = 1)
+            eq_(rep.build(), ['fom.pdf', 'ratios.png'])
+            eq_(rep.failed, {})
+            ok_(os.path.exists(os.path.join(self.out, 'ratios.png')))
+            eq_(rep.build(), [])
+        finally:
+            plot_tools.USETEX = True
+            plot_tools.plt.rc('text', usetex = False)
+
+    @raises(AssertionError)
+    def test_figure_extension(self):
+        """ Figures without an extension should raise an error """
+        report.Report(self.out).add('ratios', 'ratios', self.data, ['0.1', '0.2'])
@@ -0,0 +1,91 @@
+from nose.tools import *
+import analysis.fom as fom
+import analysis.server as server
+import numpy as np
+import os, shutil, tempfile
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.base_dir = './tests/fom_data/'
+        cls.server = server.AnalysisServer(0, max_sweeps = 1, compact = False)
+        cls.server.start()
+        cls.analyzer = fom.Analyzer(cls.base_dir)
+        cls.remote = server.RemoteAnalyzer(cls.base_dir, 'test', cls.server.url())
+
+    @classmethod
+    def teardown_class(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_encode(self):
+        """ Arrays and tuples should be unchanged by encoding """
+        obj = {'a' : np.arange(3.0), 'b' : [(1, 2)], 'c' : np.float32(1.5)}
+        ans = server.decode(server.json.dumps(server.encode(obj)))
+        ok_(np.array_equal(ans['a'], obj['a']))
+        eq_(ans['b'], [(1, 2)])
+        eq_(ans['c'], 1.5)
+
+    def test_get_data(self):
+        """ Remote queries should match the Analyzer """
+        ok_(np.array_equal(self.remote.get_data('TEST_VAL', [1, 2]),
+                           self.analyzer.get_data('TEST_VAL', [1, 2])))
+        eq_(self.remote.get_avg('TEST_VAL', 1), self.analyzer.get_avg('TEST_VAL', 1))
+
+    def test_matrix_entries(self):
+        """ Matrix entries should be passed as tuples """
+        ok_(np.array_equal(self.remote.get_data('TEST_MAT', (1, 2), fom = False),
+                           self.analyzer.get_data('TEST_MAT', (1, 2), fom = False)))
+
+    def test_comparator(self):
+        """ Remote comparisons should match the Comparator """
+        comp = fom.Comparator([self.base_dir, self.base_dir], ['0.1', '0.2'])
+        remote = server.RemoteComparator([self.base_dir, self.base_dir],
+                                         ['0.1', '0.2'], self.server.url())
+        names, data, error = remote.ratio('TEST_VAL', 1, 2)
+        eq_(names, ['0.1', '0.2'])
+        ok_(np.allclose(data, comp.ratio('TEST_VAL', 1, 2)[1]))
+        eq_(remote.make_table('TEST_VAL', 1, 2),
+            server.plot_tools.make_table(comp, 'TEST_VAL', 1, 2))
+
+    def test_cache(self):
+        """ Data sets should be loaded once and the cache bounded """
+        self.remote.get_x()
+        status = server.query(self.server.url(), '/status', {})
+        eq_(len(status), 1)
+        eq_(status[0][1], 3)
+        a = self.server.cache.get(self.base_dir, 'a')
+        b = self.server.cache.get(self.base_dir, 'b')
+        ok_(a.data is b.data)
+        eq_((a.name, b.name), ('a', 'b'))
+
+    @raises(KeyError)
+    def test_remote_error(self):
+        """ Errors should be raised again by the client """
+        self.remote.get_data('NOT_A_LABEL', 1)
+
+    @raises(AttributeError)
+    def test_unknown_method(self):
+        """ Only query methods should be available """
+        self.remote.get_bins
+
+    def test_refresh_copy(self):
+        """ Refreshing should not change the data sets already handed out """
+        folder = tempfile.mkdtemp()
+        try:
+            for name in ['res_10.m', 'res_20.m']:
+                shutil.copy(os.path.join(self.base_dir, name), folder)
+            cache = server.SweepCache(compact = False)
+            old = cache.get(folder, 'old')
+            old.get_array('TEST_VAL')
+            shutil.copy(os.path.join(self.base_dir, 'res_30.m'), folder)
+            eq_(cache.refresh(folder), 1)
+            eq_((old.n, len(old.data)), (2, 2))
+            eq_(old.get_array('TEST_VAL').shape[0], 2)
+            new = cache.get(folder, 'new')
+            eq_((new.n, len(new.data)), (3, 3))
+            eq_(new.get_array('TEST_VAL').shape[0], 3)
+            eq_(cache.refresh(folder), 0)
+        finally:
+            shutil.rmtree(folder)
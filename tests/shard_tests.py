@@ -0,0 +1,79 @@
+from nose.tools import *
+import analysis.fom as fom
+import analysis.shard as shard
+import numpy as np
+import os, shutil, socket, subprocess, tempfile
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.dir = tempfile.mkdtemp()
+        cls.dirs = ['./tests/fom_data/', './tests/fom_data/', './tests/fom_data/']
+        cls.names = ['0.1', '0.2', '0.3']
+        cls.comp = fom.Comparator(cls.dirs, cls.names)
+
+    @classmethod
+    def teardown_class(cls):
+        shutil.rmtree(cls.dir)
+
+    def test_shards(self):
+        """ Shards should divide the data sets between them """
+        output = os.path.join(self.dir, 'shards')
+        shard.plan(self.dirs, self.names, ['TEST_VAL'], output, 2)
+        eq_(shard.members(output, 0), [0, 2])
+        eq_(shard.members(output, 1), [1])
+        eq_(shard.run(output, 1), ['0.2'])
+        eq_(shard.missing(output), ['0.1', '0.3'])
+
+    def test_incomplete(self):
+        """ Merging before every shard is done should raise an error """
+        output = os.path.join(self.dir, 'incomplete')
+        shard.plan(self.dirs, self.names, 'TEST_VAL', output, 3)
+        shard.run(output, 0)
+        eq_([d.name for d in shard.merge(output, partial = True).data], ['0.1'])
+        assert_raises(AssertionError, shard.merge, output)
+
+    def test_interrupted(self):
+        """ Only temporary subfolders of dead local workers should be removed """
+        output = os.path.join(self.dir, 'interrupted')
+        shard.plan(self.dirs, self.names, 'TEST_VAL', output, 3)
+        host = socket.gethostname()
+        worker = subprocess.Popen(['true'])
+        worker.wait()
+        dead, alive = str(worker.pid), str(os.getppid())
+        kept = ['.0.' + host + '.' + dead, '.1.' + host + '.' + alive,
+                '.1.other.' + dead, '.10.' + host + '.' + dead]
+        removed = ['.1.' + host + '.' + dead, '.1.' + host + '.' + dead + '.old']
+        for name in kept + removed:
+            os.makedirs(os.path.join(output, name, 'part'))
+        shard.run(output, 1)
+        eq_(sorted(f for f in os.listdir(output) if f.startswith('.')),
+            sorted(kept))
+        eq_(shard.missing(output), ['0.1', '0.3'])
+        # Publishing again replaces the complete subfolder
+        shard.run(output, 1)
+        eq_(sorted(f for f in os.listdir(output) if f.startswith('.')),
+            sorted(kept))
+        eq_(shard.missing(output), ['0.1', '0.3'])
+
+    def test_merge(self):
+        """ Merged shards should match a Comparator of the data sets """
+        output = os.path.join(self.dir, 'merge')
+        shard.plan(self.dirs, self.names, ['TEST_VAL', 'TEST_MAT'], output, 2)
+        for s in [1, 0, 1]:
+            shard.run(output, s)
+        merged = shard.merge(output)
+        eq_([d.name for d in merged.data], self.names)
+        names, data, error = merged.ratio('TEST_VAL', 2, 2)
+        eq_(names, self.names)
+        ok_(np.allclose(data, self.comp.ratio('TEST_VAL', 2, 2)[1]))
+        eq_(sorted(f for f in os.listdir(output) if f.startswith('.')), [])
+
+    def test_local(self):
+        """ Shards run by local processes should match the Comparator """
+        output = os.path.join(self.dir, 'local')
+        shard.plan(self.dirs, self.names, ['TEST_VAL'], output, 2)
+        merged = shard.run_local(output, 2)
+        ok_(np.array_equal(merged.data[2].get_fom_array('TEST_VAL'),
+                           self.comp.data[2].get_fom_array('TEST_VAL')))
@@ -0,0 +1,56 @@
+from nose.tools import *
+import analysis.fom as fom
+import analysis.shared as shared
+import numpy as np
+import pickle, shutil, tempfile
+
+def avg_task(task):
+    # Average FOM of one data set and group, run by the workers
+    analyzer, label, grp = task
+    return analyzer.get_avg(label, grp)
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.dir = tempfile.mkdtemp()
+        cls.comp = fom.Comparator(['./tests/fom_data/', './tests/fom_data/'],
+                                  ['0.1', '0.2'])
+        cls.shared = shared.share_comparator(cls.comp, ['TEST_VAL', 'TEST_MAT'],
+                                             cls.dir)
+
+    @classmethod
+    def teardown_class(cls):
+        shutil.rmtree(cls.dir)
+
+    def test_arrays(self):
+        """ Shared arrays should match the Analyzer """
+        a, s = self.comp.data[0], self.shared.data[0]
+        eq_(s.name, '0.1')
+        eq_(s.n, 3)
+        ok_(isinstance(s.get_array('TEST_VAL'), np.memmap))
+        ok_(np.array_equal(s.get_fom_array('TEST_MAT'), a.get_fom_array('TEST_MAT')))
+        ok_(np.array_equal(s.get_data('TEST_MAT', (2, 1)), a.get_data('TEST_MAT', (2, 1))))
+        eq_(s.get_filenames(), a.get_filenames())
+
+    def test_pickle(self):
+        """ Pickles should hold the folder, not the arrays """
+        s = self.shared.data[1]
+        s.get_array('TEST_VAL')
+        text = pickle.dumps(s)
+        ok_(len(text) < 500)
+        t = pickle.loads(text)
+        eq_(t.name, '0.2')
+        ok_(np.array_equal(t.get_array('TEST_VAL'), s.get_array('TEST_VAL')))
+
+    def test_fan_out(self):
+        """ Workers should attach to the shared arrays """
+        tasks = [(d, 'TEST_VAL', g) for d in self.shared.data for g in [1, 2]]
+        ans = shared.fan_out(avg_task, tasks, 2)
+        ok_(np.allclose(ans, [d.get_avg('TEST_VAL', g) for d in self.comp.data
+                              for g in [1, 2]]))
+
+    @raises(KeyError)
+    def test_not_shared(self):
+        """ Parameters that were not shared should raise an error """
+        self.shared.data[0].get_array('TEST_VAL2')
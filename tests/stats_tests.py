@@ -0,0 +1,86 @@
+from nose.tools import *
+import analysis.fom as fom
+import analysis.stats as stats
+import numpy as np
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.test_analyzer = fom.Analyzer('./tests/fom_data/')
+        rng = np.random.RandomState(42)
+        # Two AR(1) series with known autocorrelation times
+        cls.phi = np.array([0.0, 0.8])
+        n = 20000
+        noise = rng.normal(size=(n, 2))
+        cls.series = np.zeros((n, 2))
+        for i in range(1, n):
+            cls.series[i] = cls.phi*cls.series[i-1] + noise[i]
+
+    def test_autocorr_direct(self):
+        """ FFT autocorrelation should match the direct calculation """
+        x = self.series[:200,1]
+        y = x - np.mean(x)
+        direct = np.array([np.sum(y[:len(y)-t]*y[t:]) for t in range(len(y))])
+        ok_(np.allclose(stats.autocorr(x)[:,0], direct/direct[0]))
+
+    def test_autocorr_constant(self):
+        """ A constant series should have no correlation beyond lag 0 """
+        acf = stats.autocorr(np.ones(10))
+        eq_(acf[0,0], 1)
+        ok_(np.all(acf[1:,0] == 0))
+
+    def test_int_time_ar1(self):
+        """ Integrated autocorrelation time should match the AR(1) value """
+        tau = stats.int_time(self.series)
+        ans = (1 + self.phi)/(1 - self.phi)
+        ok_(np.allclose(tau, ans, rtol=0.15))
+
+    def test_series_stats_err(self):
+        """ Standard error should include the autocorrelation time """
+        s = stats.series_stats(self.series)
+        n = np.shape(self.series)[0]
+        ok_(np.allclose(s['err'], np.sqrt(s['var']*s['tau']/n)))
+        ok_(np.allclose(s['ess'], n/s['tau']))
+
+    def test_analyzer_stats_shape(self):
+        """ Analyzer statistics should have one value per group """
+        s = stats.analyzer_stats(self.test_analyzer, 'TEST_VAL')
+        eq_(np.shape(s['mean']), (2,))
+
+    def test_analyzer_stats_mean(self):
+        """ Analyzer mean should be the mean of the second half of the FOM """
+        s = stats.analyzer_stats(self.test_analyzer, 'TEST_VAL')
+        ok_(np.isclose(s['mean'][0],
+                       np.mean(self.test_analyzer.get_data('TEST_VAL', 1)[1:,1])))
+        ok_(np.isclose(s['var'][0], self.test_analyzer.get_var('TEST_VAL', 1)))
+
+    def test_comparator_stats(self):
+        """ Comparator statistics should match each data set analyzed alone """
+        comp = fom.Comparator(['./tests/fom_data/', './tests/fom_data/'], ['0.1', '0.2'])
+        ans = stats.comparator_stats(comp, 'TEST_MAT')
+        single = stats.analyzer_stats(self.test_analyzer, 'TEST_MAT')
+        eq_(len(ans), 2)
+        for s in ans:
+            ok_(np.allclose(s['mean'], single['mean']))
+            ok_(np.allclose(s['tau'], single['tau']))
+
+    def test_window_scan(self):
+        """ Every window of the scan should match a direct average """
+        x = self.series[:500] + 1e5
+        scan = stats.window_scan(x)
+        for w in [1, 7, 250, 500]:
+            ok_(np.allclose(scan['mean'][w-1], np.mean(x[-w:], axis = 0)))
+            ok_(np.allclose(scan['var'][w-1], np.var(x[-w:], axis = 0)))
+            ok_(np.allclose(scan['err'][w-1], np.sqrt(np.var(x[-w:], axis = 0)/w)))
+        eq_(scan['n'][-1], 500)
+
+    def test_analyzer_scan(self):
+        """ The scan should match the Analyzer averages """
+        scan = stats.analyzer_scan(self.test_analyzer, 'TEST_VAL')
+        for n in [1, 2, 3]:
+            ok_(np.isclose(scan['mean'][n-1,1], self.test_analyzer.get_avg('TEST_VAL', 2, n)))
+        ok_(np.isclose(scan['var'][1,0], self.test_analyzer.get_var('TEST_VAL', 1)))
+        collapse = stats.analyzer_scan(self.test_analyzer, 'TEST_MAT', [[1, 2]])
+        ok_(np.isclose(collapse['mean'][1,0],
+                       self.test_analyzer.get_collapse_avg('TEST_MAT', [1, 2], 2)))
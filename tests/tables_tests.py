@@ -0,0 +1,64 @@
+from nose.tools import *
+import analysis.fom as fom
+import analysis.plot_tools as plot_tools
+import analysis.tables as tables
+import numpy as np
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.comp = fom.Comparator(['./tests/fom_data/', './tests/fom_data/'],
+                                  ['0.2', '0.1'])
+        cls.df = tables.compute(cls.comp, ['TEST_VAL', 'TEST_MAT'], [1, 2])
+
+    def test_compute(self):
+        """ Tables should match get_fom and get_ratios """
+        eq_(len(self.df), 8)
+        for label in ['TEST_VAL', 'TEST_MAT']:
+            for grp in [1, 2]:
+                part = self.df[(self.df['label'] == label) & (self.df['grp'] == grp)]
+                x, y, yerr = plot_tools.get_fom(self.comp, label, grp)
+                x, r, rerr = plot_tools.get_ratios(self.comp, label, grp)
+                eq_(list(part['twdt']), x)
+                ok_(np.allclose(part['fom'], y))
+                ok_(np.allclose(part['fom_err'], yerr))
+                ok_(np.allclose(part['r'], r))
+                ok_(np.allclose(part['r_err'], rerr))
+
+    def test_cycle_caps(self):
+        """ Cycle caps should select the last FOM before the cap """
+        cycles = np.sort(self.comp.data[0].get_x(cycle = True))
+        caps = [('0.2', cycles[-1])]
+        df = tables.compute(self.comp, 'TEST_VAL', 2, caps)
+        x, y, yerr = plot_tools.get_fom(self.comp, 'TEST_VAL', 2, caps)
+        ok_(np.allclose(df['fom'], y))
+        ok_(df['fom'][0] != df['fom'][1])
+
+    def test_format(self):
+        """ Columns should be formatted as by the previous make_table """
+        df = tables.format_columns(self.df, 2, 4)
+        for i in range(len(df)):
+            eq_(df['fom'][i], '{:.0f}'.format(np.around(self.df['fom'][i]/100.0)))
+            eq_(df['r_err'][i], '{:.4f}'.format(self.df['r_err'][i]))
+
+    def test_render(self):
+        """ Tables should be rendered in LaTeX, CSV and Markdown """
+        text = tables.make_tables(self.comp, ['TEST_VAL', 'TEST_MAT'], [1, 2], 2)
+        eq_(sorted(text), [('TEST_MAT', 1), ('TEST_MAT', 2),
+                           ('TEST_VAL', 1), ('TEST_VAL', 2)])
+        eq_(text[('TEST_VAL', 2)], plot_tools.make_table(self.comp, 'TEST_VAL', 2, 2))
+
+        part = self.df[:2]
+        csv = tables.render(part, 2, fmt = 'csv').splitlines()
+        eq_(csv[0], 'twdt,fom,fom_err,r,r_err')
+        eq_(csv[2].split(',')[3], '1.000')
+        md = tables.render(part, 2, fmt = 'markdown').splitlines()
+        eq_(md[0], '| twdt | fom | fom_err | r | r_err |')
+        eq_(md[3].split(' | ')[0], '| 0.1')
+        eq_(len(md), 4)
+
+    @raises(ValueError)
+    def test_unknown_format(self):
+        """ Unknown formats should raise an error """
+        tables.render(self.df, 2, fmt = 'html')
@@ -0,0 +1,55 @@
+from nose.tools import *
+import analysis.fom as fom
+import analysis.throughput as throughput
+import numpy as np
+import os, shutil, tempfile
+
+class TestClass:
+
+    @classmethod
+    def setup_class(cls):
+        cls.comp = fom.Comparator(['./tests/fom_data/', './tests/fom_data/'], ['0.1', '0.2'])
+
+    def test_rates(self):
+        """ Rates should be the cycles per CPU time between snapshots """
+        ok_(np.allclose(throughput.rates(self.comp.get(0.1)), [1.0, 1.0]))
+
+    def test_rolling(self):
+        """ Rolling rates should span the window """
+        rate = throughput.rolling(self.comp.get('0.1'), 2)
+        ok_(np.allclose(rate, [1.0]))
+
+    def test_outliers(self):
+        """ Outliers should be found with the modified z-score """
+        rate = np.array([40.0, 41.0, 39.5, 40.5, 40.2, 12.0, 39.8])
+        ok_(np.array_equal(np.nonzero(throughput.outliers(rate))[0], [5]))
+
+    def test_throughput_keys(self):
+        """ Throughput should be calculated for every data set """
+        ans = throughput.throughput(self.comp, window=1)
+        eq_(sorted(ans.keys()), ['0.1', '0.2'])
+        ok_(np.isclose(ans['0.2']['average'], 1.0))
+        eq_(len(ans['0.2']['outliers']), 0)
+
+    @raises(AssertionError)
+    def test_get_bad_name(self):
+        """ Requesting a missing data set should fail """
+        self.comp.get('0.3')
+
+    def test_corrected_fom_idle_interval(self):
+        """ Intervals with no CPU time should not make corrected FOM nan """
+        import analysis.plot_tools as plot_tools
+        folder = tempfile.mkdtemp()
+        try:
+            for name in ['res_10.m', 'res_20.m', 'res_30.m']:
+                shutil.copy(os.path.join('./tests/fom_data/', name), folder)
+            text = open(os.path.join(folder, 'res_20.m')).read()
+            with open(os.path.join(folder, 'res_25.m'), 'w') as f:
+                f.write(text.replace('= 20 ;', '= 25 ;'))
+            comp = fom.Comparator([folder, folder], ['0.1', '0.2'])
+            ok_(np.isnan(throughput.rates(comp.get('0.1'))).any())
+            x, y, yerr = plot_tools.get_fom(comp, 'TEST_VAL', 1, corr = True)
+            ok_(np.all(np.isfinite(y)))
+            ok_(np.all(np.isfinite(yerr)))
+        finally:
+            shutil.rmtree(folder)